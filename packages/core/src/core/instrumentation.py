@@ -0,0 +1,388 @@
+"""Instrumentación de latencias sin bloqueo en el camino caliente.
+
+:class:`LatencyRecorder` agrupa las duraciones de una familia de métricas por
+una etiqueta (ruta, nombre de span...). Medir una sección es::
+
+    with recorder.time("GET /v1/health"):
+        ...
+
+El camino caliente sólo lee ``perf_counter_ns`` dos veces y añade los
+nanosegundos al ``deque`` de la serie: ``append`` es atómico, así que no hay
+locks ni E/S. Cada serie tiene su propia subclase de :class:`Timer` con ese
+``append`` como atributo de clase, de modo que ``time()`` es una búsqueda en
+diccionario y una instancia de un solo slot, sin ``__init__``. Un hilo de
+fondo (:func:`start_flusher`, que se arranca solo al crear la primera serie)
+vacía periódicamente los ``deque`` de todos los recorders con ``popleft`` y
+acumula las duraciones en histogramas log-lineales. Si el flusher no da
+abasto, cada ``deque`` acotado descarta las mediciones más antiguas en lugar
+de frenar al llamante.
+
+:class:`LogLinearHistogram` es un histograma tipo HDR: ``2**sub_bits``
+buckets lineales por cada potencia de dos de nanosegundos, con un error
+relativo máximo de ``2**-sub_bits`` (12,5 % con el valor por defecto) en
+cualquier rango. :meth:`LatencyRecorder.to_prometheus` lo expone en formato
+texto de Prometheus sobre los límites ``le`` de ``buckets``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from time import perf_counter_ns
+from typing import Callable, Deque, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class LogLinearHistogram:
+    """Conteos por bucket log-lineal de valores enteros no negativos (ns)."""
+
+    __slots__ = ("sub_bits", "counts", "count", "total", "maximum")
+
+    def __init__(self, sub_bits: int = 3) -> None:
+        if not 0 <= sub_bits <= 16:
+            raise ValueError("sub_bits must be between 0 and 16")
+        self.sub_bits = sub_bits
+        # Cubre cualquier entero de 64 bits sin tener que redimensionar.
+        self.counts: List[int] = [0] * ((65 - sub_bits) << sub_bits)
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def index(self, value: int) -> int:
+        sub = 1 << self.sub_bits
+        if value < sub:
+            return value
+        shift = value.bit_length() - self.sub_bits - 1
+        return (shift + 1) * sub + (value >> shift) - sub
+
+    def bounds(self, index: int) -> Tuple[int, int]:
+        """Rango ``[inferior, superior)`` de valores del bucket ``index``."""
+
+        sub = 1 << self.sub_bits
+        if index < sub:
+            return index, index + 1
+        shift = index // sub - 1
+        lower = (sub + index % sub) << shift
+        return lower, lower + (1 << shift)
+
+    def record(self, value: int) -> None:
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def quantile(self, q: float) -> int:
+        """Cota superior del bucket que contiene el cuantil ``q``."""
+
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.999999))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.bounds(index)[1] - 1, self.maximum)
+        return self.maximum
+
+    def cumulative(self, limits: Sequence[int]) -> List[int]:
+        """Cuántos valores caen por debajo de cada límite (ascendente).
+
+        Un bucket cuenta para un límite si su cota superior no lo supera, así
+        que el error es como mucho el de un bucket.
+        """
+
+        result: List[int] = []
+        seen = 0
+        position = 0
+        for limit in limits:
+            while position < len(self.counts) and self.bounds(position)[1] - 1 <= limit:
+                seen += self.counts[position]
+                position += 1
+            result.append(seen)
+        return result
+
+
+@dataclass(frozen=True)
+class SeriesSnapshot:
+    label: str
+    count: int
+    sum_seconds: float
+    p50_seconds: float
+    p99_seconds: float
+    max_seconds: float
+
+
+class Timer:
+    """Context manager de :meth:`LatencyRecorder.time`.
+
+    Las subclases por serie fijan ``_append``; cada ``with`` usa una
+    instancia nueva, así que los bloques anidados o concurrentes con la misma
+    etiqueta no se mezclan.
+    """
+
+    __slots__ = ("_start",)
+    _append: Callable[[int], None]
+
+    def __enter__(self) -> "Timer":
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, traceback: object) -> None:
+        self._append(perf_counter_ns() - self._start)
+
+
+class LatencyRecorder:
+    """Histogramas de duración por etiqueta, alimentados sin bloqueo."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str = "",
+        *,
+        label: str = "name",
+        sub_bits: int = 3,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        max_pending: int = 1 << 20,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._sub_bits = sub_bits
+        self._max_pending = max_pending
+        self._pending: List[Deque[int]] = []
+        self._series: Dict[str, int] = {}
+        self._timers: Dict[str, type[Timer]] = {}
+        self._labels: List[str] = []
+        self._histograms: List[LogLinearHistogram] = []
+        self._lock = threading.Lock()
+        _register(self)
+
+    def _series_id(self, label: str) -> int:
+        series = self._series.get(label)
+        if series is None:
+            with self._lock:
+                series = self._series.get(label)
+                if series is None:
+                    series = len(self._labels)
+                    self._labels.append(label)
+                    self._histograms.append(LogLinearHistogram(self._sub_bits))
+                    pending: Deque[int] = deque(maxlen=self._max_pending)
+                    self._pending.append(pending)
+                    # ``deque.append`` es un builtin: no se enlaza a la instancia.
+                    attributes = {"__slots__": (), "_append": pending.append}
+                    self._timers[label] = type("Timer", (Timer,), attributes)
+                    self._series[label] = series
+        if _autostart:
+            start_flusher()
+        return series
+
+    def time(self, label: str) -> Timer:
+        """Context manager que registra la duración del bloque bajo ``label``."""
+
+        try:
+            return self._timers[label]()
+        except KeyError:
+            self._series_id(label)
+            return self._timers[label]()
+
+    def record(self, label: str, seconds: float) -> None:
+        series = self._series.get(label)
+        if series is None:
+            series = self._series_id(label)
+        self._pending[series].append(int(seconds * 1e9))
+
+    def flush(self) -> int:
+        """Pasa las mediciones pendientes a los histogramas; devuelve cuántas."""
+
+        sub_bits = self._sub_bits
+        sub = 1 << sub_bits
+        offset = sub_bits + 1
+        flushed = 0
+        with self._lock:
+            for pending, histogram in zip(self._pending, self._histograms):
+                popleft = pending.popleft
+                items: List[int] = []
+                take = items.append
+                try:
+                    for _ in range(len(pending)):
+                        take(popleft())
+                except IndexError:  # el deque lleno descartó entradas mientras tanto
+                    pass
+                if not items:
+                    continue
+                counts = histogram.counts
+                total = 0
+                maximum = histogram.maximum
+                # Equivale a ``LogLinearHistogram.record`` sin una llamada por valor.
+                for nanoseconds in items:
+                    if nanoseconds < sub:
+                        if nanoseconds < 0:
+                            nanoseconds = 0
+                        index = nanoseconds
+                    else:
+                        shift = nanoseconds.bit_length() - offset
+                        index = ((shift + 1) << sub_bits) + (nanoseconds >> shift) - sub
+                    counts[index] += 1
+                    total += nanoseconds
+                    if nanoseconds > maximum:
+                        maximum = nanoseconds
+                histogram.total += total
+                histogram.count += len(items)
+                histogram.maximum = maximum
+                flushed += len(items)
+        return flushed
+
+    def snapshot(self) -> List[SeriesSnapshot]:
+        self.flush()
+        with self._lock:
+            return [
+                SeriesSnapshot(
+                    label,
+                    histogram.count,
+                    histogram.total / 1e9,
+                    histogram.quantile(0.5) / 1e9,
+                    histogram.quantile(0.99) / 1e9,
+                    histogram.maximum / 1e9,
+                )
+                for label, histogram in zip(self._labels, self._histograms)
+            ]
+
+    def to_prometheus(self) -> str:
+        """Exposición en formato texto de Prometheus (tipo ``histogram``)."""
+
+        self.flush()
+        limits = [int(bucket * 1e9) for bucket in self.buckets]
+        lines = []
+        if self.help_text:
+            lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        with self._lock:
+            for label, histogram in zip(self._labels, self._histograms):
+                value = _escape(label)
+                for bucket, cumulative in zip(
+                    self.buckets, histogram.cumulative(limits)
+                ):
+                    lines.append(
+                        f'{self.name}_bucket{{{self.label}="{value}",le="{bucket:g}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{{self.label}="{value}",le="+Inf"}} {histogram.count}'
+                )
+                lines.append(
+                    f'{self.name}_sum{{{self.label}="{value}"}} {histogram.total / 1e9:.9g}'
+                )
+                lines.append(
+                    f'{self.name}_count{{{self.label}="{value}"}} {histogram.count}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for pending in self._pending:
+                pending.clear()
+            for index in range(len(self._histograms)):
+                self._histograms[index] = LogLinearHistogram(self._sub_bits)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_recorders: List[LatencyRecorder] = []
+_registry_lock = threading.Lock()
+# La primera medición arranca el flusher; tras ``stop_flusher`` sólo vuelve
+# a arrancar con una llamada explícita a ``start_flusher``.
+_autostart = True
+_flusher_running = False
+_flusher_stop = threading.Event()
+_flusher: threading.Thread | None = None
+
+
+def _register(recorder: LatencyRecorder) -> None:
+    with _registry_lock:
+        _recorders.append(recorder)
+
+
+def recorders() -> Iterator[LatencyRecorder]:
+    return iter(tuple(_recorders))
+
+
+def flush_all() -> int:
+    return sum(recorder.flush() for recorder in recorders())
+
+
+def render_prometheus() -> str:
+    """Exposición de todos los recorders registrados."""
+
+    return "".join(recorder.to_prometheus() for recorder in recorders())
+
+
+def start_flusher(interval: float = 1.0) -> None:
+    """Arranca (una vez) el hilo que vuelca las mediciones cada ``interval`` s."""
+
+    global _autostart, _flusher, _flusher_running
+    with _registry_lock:
+        _autostart = False
+        if _flusher_running:
+            return
+        _flusher_stop.clear()
+        _flusher = threading.Thread(
+            target=_flush_loop, args=(interval,), name="latency-flusher", daemon=True
+        )
+        _flusher_running = True
+        _flusher.start()
+
+
+def stop_flusher() -> None:
+    global _autostart, _flusher, _flusher_running
+    with _registry_lock:
+        _autostart = False
+        thread, _flusher = _flusher, None
+        _flusher_stop.set()
+    if thread is not None:
+        thread.join()
+    _flusher_running = False
+    flush_all()
+
+
+def _flush_loop(interval: float) -> None:
+    while not _flusher_stop.wait(interval):
+        try:
+            flush_all()
+        except Exception:  # pragma: no cover - se registra y se reintenta
+            logger.exception("Error al volcar histogramas de latencia")
+
+
+__all__ = [
+    "DEFAULT_BUCKETS",
+    "LatencyRecorder",
+    "LogLinearHistogram",
+    "SeriesSnapshot",
+    "Timer",
+    "flush_all",
+    "render_prometheus",
+    "start_flusher",
+    "stop_flusher",
+]
@@ -1,17 +1,463 @@
-"""Cliente de métricas placeholder."""
+"""Registro de métricas con exposición en formato Prometheus.
+
+:class:`Registry` crea familias :class:`Counter`, :class:`Gauge` y
+:class:`Histogram`. Cada combinación de valores de etiquetas se enlaza una vez
+con ``family.labels(...)``; el objeto devuelto se guarda y se usa en el camino
+caliente sin construir claves por llamada::
+
+    requests = REGISTRY.counter("gateway_requests_total", "Peticiones", ["route"])
+    health = requests.labels(route="/v1/health")
+    health.inc()
+
+Contadores e histogramas acumulan en una celda por hilo: sólo el hilo dueño
+escribe en ella, así que ``inc``/``observe`` no toman locks ni pierden
+incrementos, y la lectura suma todas las celdas. Cuando un hilo termina (y se
+recoge su objeto ``Thread``), su celda se suma a un acumulado de hilos
+retirados y se libera, de modo que los hilos de vida corta no hacen crecer ni
+la memoria ni el coste de leer. Los gauges guardan un único valor (``set`` es
+una asignación; ``inc``/``dec`` usan un lock).
+
+:meth:`Registry.exposition` genera el texto con ``# HELP``/``# TYPE`` y una
+línea por muestra con el mismo formato que
+``observability.exporters.format_prometheus``.
+"""
 
 from __future__ import annotations
 
-from typing import Mapping
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Generic, Iterator, List, Mapping, Sequence, Tuple, TypeVar
 
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Sample = Tuple[str, Mapping[str, str], float]
+
+
+class _Cells:
+    """Celdas por hilo: cada hilo escribe sólo en la suya.
+
+    La celda de un hilo terminado se suma a ``_retired`` y se descarta.
+    """
+
+    __slots__ = ("_cells", "_retired", "_size", "_lock", "_local", "__weakref__")
+
+    def __init__(self, size: int) -> None:
+        # Indexadas por ``id``: dos celdas con los mismos valores son iguales.
+        self._cells: Dict[int, List[float]] = {}
+        self._retired = [0.0] * size
+        self._size = size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._cells[id(cell)] = cell
+            self._local.cell = cell
+            finalizer = weakref.finalize(
+                threading.current_thread(), _retire_cell, weakref.ref(self), id(cell)
+            )
+            finalizer.atexit = False
+            return cell
+
+    def _retire(self, key: int) -> None:
+        with self._lock:
+            cell = self._cells.pop(key, None)
+            if cell is not None:
+                for index, value in enumerate(cell):
+                    self._retired[index] += value
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._cells.values())
+            result = list(self._retired)
+        for cell in cells:
+            for index, value in enumerate(cell):
+                result[index] += value
+        return result
+
+
+def _retire_cell(owner: weakref.ref[_Cells], key: int) -> None:
+    # Referencia débil: un hilo vivo no debe mantener las celdas de una
+    # métrica ya descartada.
+    cells = owner()
+    if cells is not None:
+        cells._retire(key)
+
+
+class BoundCounter:
+    __slots__ = ("_cells",)
+
+    def __init__(self) -> None:
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class BoundGauge:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class BoundHistogram:
+    """Celdas ``[bucket_0, ..., bucket_n, +Inf, suma]`` por hilo."""
+
+    __slots__ = ("_cells", "_buckets", "_sum_index")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._buckets = buckets
+        self._sum_index = len(buckets) + 1
+        self._cells = _Cells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[bisect_left(self._buckets, value)] += 1
+        cell[self._sum_index] += value
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Conteos acumulados por ``le`` (sin ``+Inf``), suma y total."""
+
+        totals = self._cells.totals()
+        cumulative: List[int] = []
+        running = 0
+        for count in totals[: len(self._buckets)]:
+            running += int(count)
+            cumulative.append(running)
+        count = running + int(totals[len(self._buckets)])
+        return cumulative, totals[self._sum_index], count
+
+
+Child = TypeVar("Child", BoundCounter, BoundGauge, BoundHistogram)
+
+
+class _Family(ABC, Generic[Child]):
+    kind = ""
+    _default: Child
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Child] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    @abstractmethod
+    def _new_child(self) -> Child: ...
+
+    def labels(self, *values: str, **named: str) -> Child:
+        """Hijo enlazado a estos valores de etiqueta (se crea una sola vez)."""
+
+        if named:
+            if values:
+                raise ValueError("Use either positional or keyword label values")
+            try:
+                key = tuple([str(named[label]) for label in self.labelnames])
+            except KeyError as exc:
+                raise ValueError(
+                    f"Missing label {exc.args[0]!r} for {self.name}"
+                ) from None
+            if len(named) != len(self.labelnames):
+                raise ValueError(
+                    f"Unexpected labels for {self.name}: {sorted(set(named) - set(self.labelnames))}"
+                )
+        elif len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        else:
+            key = tuple([str(value) for value in values])
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> Iterator[Tuple[Dict[str, str], Child]]:
+        with self._lock:
+            items = list(self._children.items())
+        for values, child in items:
+            yield dict(zip(self.labelnames, values)), child
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]: ...
+
+
+class Counter(_Family[BoundCounter]):
+    kind = "counter"
+
+    def _new_child(self) -> BoundCounter:
+        return BoundCounter()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self.children():
+            yield self.name, labels, child.value
+
+
+class Gauge(_Family[BoundGauge]):
+    kind = "gauge"
+
+    def _new_child(self) -> BoundGauge:
+        return BoundGauge()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self.children():
+            yield self.name, labels, child.value
+
+
+class Histogram(_Family[BoundHistogram]):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        bounds = tuple(
+            sorted(float(bucket) for bucket in buckets if bucket != float("inf"))
+        )
+        if not bounds:
+            raise ValueError("Histogram needs at least one finite bucket")
+        self.buckets = bounds
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self) -> BoundHistogram:
+        return BoundHistogram(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self.children():
+            cumulative, total, count = child.snapshot()
+            for bound, running in zip(self.buckets, cumulative):
+                yield f"{self.name}_bucket", {**labels, "le": f"{bound:g}"}, running
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_sample(
+    metric: str, value: float, labels: Mapping[str, str] | None = None
+) -> str:
+    """Línea de exposición; mismo formato que ``observability.exporters.format_prometheus``."""
+
+    if labels:
+        label_str = ",".join(
+            f'{key}="{_escape(str(label))}"' for key, label in labels.items()
+        )
+        return f"{metric}{{{label_str}}} {value}"
+    return f"{metric} {value}"
+
+
+class Registry:
+    """Conjunto de familias de métricas con nombres únicos."""
 
-class MetricsClient:
     def __init__(self) -> None:
-        self._values: dict[str, float] = {}
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: _Family) -> _Family:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                if (
+                    type(existing) is not type(family)
+                    or existing.labelnames != family.labelnames
+                ):
+                    raise ValueError(
+                        f"Metric {family.name} already registered with a different shape"
+                    )
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(
+        self, name: str, help_text: str = "", labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
 
-    def observe(self, name: str, value: float, labels: Mapping[str, str] | None = None) -> None:
-        key = name if not labels else f"{name}:{tuple(sorted(labels.items()))}"
-        self._values[key] = value
+    def gauge(
+        self, name: str, help_text: str = "", labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def families(self) -> List[_Family]:
+        with self._lock:
+            return list(self._families.values())
+
+    def collect(self) -> Iterator[Sample]:
+        for family in self.families():
+            yield from family.samples()
+
+    def exposition(self) -> str:
+        lines: List[str] = []
+        for family in self.families():
+            if family.help_text:
+                lines.append(f"# HELP {family.name} {family.help_text}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(
+                format_sample(metric, value, labels)
+                for metric, labels, value in family.samples()
+            )
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+REGISTRY = Registry()
+
+
+class _LabelSetGauge(_Family[BoundGauge]):
+    """Gauge sin etiquetas fijas: cada hijo lleva su propio conjunto.
+
+    Es lo que necesita :class:`MetricsClient`, cuyo ``observe`` siempre ha
+    aceptado etiquetas distintas (o ninguna) para el mismo nombre.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str = "") -> None:
+        super().__init__(name, help_text, ())
+        # Indexado por los pares ``(etiqueta, valor)`` ordenados; el hijo por
+        # defecto de la familia no se expone.
+        self._sets: Dict[Tuple[Tuple[str, str], ...], BoundGauge] = {}
+
+    def _new_child(self) -> BoundGauge:
+        return BoundGauge()
+
+    def bind(self, labels: Mapping[str, str] | None) -> BoundGauge:
+        key = (
+            tuple(sorted((str(k), str(v)) for k, v in labels.items())) if labels else ()
+        )
+        child = self._sets.get(key)
+        if child is None:
+            with self._lock:
+                child = self._sets.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> Iterator[Tuple[Dict[str, str], BoundGauge]]:
+        with self._lock:
+            items = list(self._sets.items())
+        for values, child in items:
+            yield dict(values), child
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self.children():
+            yield self.name, labels, child.value
+
+
+class MetricsClient:
+    """Interfaz anterior: ``observe`` fija el último valor de un gauge.
+
+    Cada combinación de etiquetas se enlaza una vez y se reutiliza; las
+    métricas viven en un :class:`Registry` propio (o el indicado). Un mismo
+    nombre admite conjuntos de etiquetas distintos, y también ninguno.
+    """
+
+    def __init__(self, registry: Registry | None = None) -> None:
+        self._registry = registry or Registry()
+        self._bound: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], BoundGauge] = {}
+
+    def observe(
+        self, name: str, value: float, labels: Mapping[str, str] | None = None
+    ) -> None:
+        key = (name, tuple(labels.items()) if labels else ())
+        gauge = self._bound.get(key)
+        if gauge is None:
+            family = self._registry._register(_LabelSetGauge(name))
+            assert isinstance(family, _LabelSetGauge)
+            gauge = family.bind(labels)
+            self._bound[key] = gauge
+        gauge.set(value)
 
     def snapshot(self) -> dict[str, float]:
-        return dict(self._values)
+        values: dict[str, float] = {}
+        for (name, labels), gauge in self._bound.items():
+            key = name if not labels else f"{name}:{tuple(sorted(labels))}"
+            values[key] = gauge.value
+        return values
+
+    @property
+    def registry(self) -> Registry:
+        return self._registry
+
+
+__all__ = [
+    "BoundCounter",
+    "BoundGauge",
+    "BoundHistogram",
+    "Counter",
+    "DEFAULT_BUCKETS",
+    "Gauge",
+    "Histogram",
+    "MetricsClient",
+    "REGISTRY",
+    "Registry",
+    "format_sample",
+]
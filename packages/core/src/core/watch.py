@@ -0,0 +1,75 @@
+"""Recarga de ficheros por sondeo del ``mtime``.
+
+:class:`FileWatcher` llama a ``on_change(path)`` cuando el ``mtime`` del
+fichero difiere del de la última carga aplicada. :meth:`FileWatcher.check`
+puede invocarse explícitamente; :meth:`FileWatcher.start` lanza además un
+hilo que la repite cada ``interval`` segundos. Si ``on_change`` falla, el
+``mtime`` no se da por visto (se reintenta en la siguiente comprobación) y el
+hilo sólo lo registra: quien lo usa conserva su último estado bueno.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class FileWatcher(Generic[T]):
+    def __init__(
+        self,
+        path: str | Path,
+        on_change: Callable[[Path], T],
+        *,
+        interval: float = 5.0,
+        name: str = "file-watcher",
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be > 0")
+        self.path = Path(path)
+        self._on_change = on_change
+        self._interval = interval
+        self._name = name
+        self._last_mtime: float | None = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def check(self, *, force: bool = False) -> T | None:
+        """Aplica el fichero si cambió (o si ``force``); ``None`` si no hizo nada."""
+
+        with self._lock:
+            mtime = self.path.stat().st_mtime
+            if not force and mtime == self._last_mtime:
+                return None
+            result = self._on_change(self.path)
+            self._last_mtime = mtime
+        return result
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.check()
+            except Exception:  # pragma: no cover - se registra y se reintenta
+                logger.exception("Failed to reload %s", self.path)
+
+
+__all__ = ["FileWatcher"]
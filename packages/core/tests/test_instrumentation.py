@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+
+import pytest
+from core import instrumentation, tracing
+from core.instrumentation import LatencyRecorder, LogLinearHistogram
+
+
+def test_buckets_are_contiguous_with_bounded_relative_error() -> None:
+    histogram = LogLinearHistogram(sub_bits=3)
+    previous_upper = 0
+    for index in range(200):
+        lower, upper = histogram.bounds(index)
+        assert lower == previous_upper
+        assert histogram.index(lower) == index and histogram.index(upper - 1) == index
+        assert (upper - lower) / max(lower, 1) <= 1 / 8 or upper - lower == 1
+        previous_upper = upper
+
+
+def test_quantiles_are_within_bucket_precision() -> None:
+    rng = random.Random(0)
+    values = sorted(int(rng.lognormvariate(13, 1.0)) for _ in range(20_000))
+    histogram = LogLinearHistogram()
+    for value in values:
+        histogram.record(value)
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert histogram.quantile(q) == pytest.approx(exact, rel=0.125)
+    assert histogram.quantile(1.0) == values[-1]
+    assert histogram.count == len(values) and histogram.total == sum(values)
+
+
+def test_recorder_exposes_prometheus_histograms() -> None:
+    recorder = LatencyRecorder(
+        "test_duration_seconds", "Duraciones de prueba", label="route"
+    )
+    for seconds in (0.0002, 0.003, 0.003, 0.2, 20.0):
+        recorder.record('GET /a"b', seconds)
+    with recorder.time("GET /fast"):
+        pass
+    text = recorder.to_prometheus()
+    assert "# TYPE test_duration_seconds histogram" in text
+    assert 'test_duration_seconds_bucket{route="GET /a\\"b",le="0.0005"} 1' in text
+    assert 'test_duration_seconds_bucket{route="GET /a\\"b",le="0.005"} 3' in text
+    assert 'test_duration_seconds_bucket{route="GET /a\\"b",le="10"} 4' in text
+    assert 'test_duration_seconds_bucket{route="GET /a\\"b",le="+Inf"} 5' in text
+    assert 'test_duration_seconds_count{route="GET /fast"} 1' in text
+    summary = {snapshot.label: snapshot for snapshot in recorder.snapshot()}
+    assert summary['GET /a"b'].sum_seconds == pytest.approx(20.2062)
+    assert summary['GET /a"b'].p50_seconds == pytest.approx(0.003, rel=0.125)
+
+
+def test_concurrent_recording_loses_nothing() -> None:
+    recorder = LatencyRecorder("concurrent_seconds", label="span")
+
+    def work(name: str) -> None:
+        for _ in range(5_000):
+            with recorder.time(name):
+                pass
+
+    threads = [
+        threading.Thread(target=work, args=(f"t{index % 2}",)) for index in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts = {snapshot.label: snapshot.count for snapshot in recorder.snapshot()}
+    assert counts == {"t0": 20_000, "t1": 20_000}
+
+
+def test_nested_timers_with_the_same_label_do_not_mix() -> None:
+    recorder = LatencyRecorder("nested_seconds")
+    instrumentation.stop_flusher()
+    with recorder.time("x"):
+        with recorder.time("x"):
+            pass
+        time.sleep(0.002)
+    (snapshot,) = recorder.snapshot()
+    assert snapshot.count == 2
+    assert snapshot.max_seconds >= 0.002 * 0.875
+
+
+def test_pending_buffer_drops_oldest_when_full() -> None:
+    recorder = LatencyRecorder("bounded_seconds", max_pending=10)
+    instrumentation.stop_flusher()
+    for _ in range(25):
+        recorder.record("x", 0.001)
+    assert recorder.flush() == 10
+
+
+def test_background_flusher_and_spans_do_not_print(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    instrumentation.stop_flusher()
+    instrumentation.start_flusher(interval=0.01)
+    try:
+        with tracing.span("load-config"):
+            pass
+        deadline = time.monotonic() + 2
+        while any(tracing.SPANS._pending) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not any(tracing.SPANS._pending)
+    finally:
+        instrumentation.stop_flusher()
+    assert capsys.readouterr().out == ""
+    assert (
+        'span_duration_seconds_count{span="load-config"}'
+        in instrumentation.render_prometheus()
+    )
@@ -0,0 +1,125 @@
+import gc
+import threading
+
+import pytest
+from core.metrics import MetricsClient, Registry, format_sample
+from observability.exporters import format_prometheus
+
+
+def test_bound_labels_are_reused_and_validated() -> None:
+    registry = Registry()
+    requests = registry.counter("requests_total", "Peticiones", ["route", "method"])
+    bound = requests.labels(route="/v1/health", method="GET")
+    assert requests.labels("/v1/health", "GET") is bound
+    bound.inc()
+    bound.inc(2)
+    assert bound.value == 3
+    with pytest.raises(ValueError):
+        requests.labels(route="/v1/health")
+    with pytest.raises(ValueError):
+        requests.labels("/v1/health", "GET", "extra")
+    with pytest.raises(ValueError):
+        bound.inc(-1)
+
+
+def test_counter_is_exact_under_threads() -> None:
+    registry = Registry()
+    counter = registry.counter("hits_total").labels()
+    histogram = registry.histogram("latency_seconds", buckets=[0.1, 1.0]).labels()
+
+    def work() -> None:
+        for _ in range(10_000):
+            counter.inc()
+            histogram.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value == 80_000
+    cumulative, total, count = histogram.snapshot()
+    assert cumulative == [0, 80_000] and count == 80_000
+    assert total == pytest.approx(40_000)
+
+
+def test_cells_of_finished_threads_are_folded_and_freed() -> None:
+    registry = Registry()
+    counter = registry.counter("short_lived_total").labels()
+    for _ in range(3):
+        threads = [threading.Thread(target=counter.inc) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del threads, thread
+        gc.collect()
+    assert counter.value == 150
+    assert len(counter._cells._cells) <= 1
+
+
+def test_histogram_buckets_are_inclusive_upper_bounds() -> None:
+    registry = Registry()
+    histogram = registry.histogram("size", buckets=[1, 5])
+    for value in (0.5, 1, 3, 5, 7):
+        histogram.observe(value)
+    lines = registry.exposition().splitlines()
+    assert lines == [
+        "# TYPE size histogram",
+        'size_bucket{le="1"} 2',
+        'size_bucket{le="5"} 4',
+        'size_bucket{le="+Inf"} 5',
+        "size_sum 16.5",
+        "size_count 5",
+    ]
+
+
+def test_exposition_matches_observability_exporter() -> None:
+    registry = Registry()
+    registry.gauge("queue_depth", "Tareas en cola", ["queue"]).labels(queue="eval").set(
+        4
+    )
+    registry.counter("jobs_total", "Trabajos").inc(2)
+    text = registry.exposition()
+    assert text.startswith(
+        "# HELP queue_depth Tareas en cola\n# TYPE queue_depth gauge\n"
+    )
+    for metric, labels, value in registry.collect():
+        assert format_sample(metric, value, labels) == format_prometheus(
+            metric, value, labels
+        )
+        assert format_prometheus(metric, value, labels) in text.splitlines()
+
+
+def test_registry_returns_existing_family_or_rejects_conflicts() -> None:
+    registry = Registry()
+    family = registry.counter("events_total", labelnames=["kind"])
+    assert registry.counter("events_total", labelnames=["kind"]) is family
+    with pytest.raises(ValueError):
+        registry.gauge("events_total", labelnames=["kind"])
+
+
+def test_metrics_client_keeps_last_value_interface() -> None:
+    client = MetricsClient()
+    client.observe("gpu_util", 0.5, {"gpu": "0", "node": "a"})
+    client.observe("gpu_util", 0.7, {"node": "a", "gpu": "0"})
+    client.observe("queue", 3)
+    assert client.snapshot() == {
+        "gpu_util:(('gpu', '0'), ('node', 'a'))": 0.7,
+        "queue": 3.0,
+    }
+    assert 'gpu_util{gpu="0",node="a"} 0.7' in client.registry.exposition()
+
+
+def test_metrics_client_accepts_different_label_sets_for_one_name() -> None:
+    client = MetricsClient()
+    client.observe("temp", 40)
+    client.observe("temp", 61, {"gpu": "0"})
+    client.observe("temp", 62, {"gpu": "1", "node": "b"})
+    lines = client.registry.exposition().splitlines()
+    assert lines == [
+        "# TYPE temp gauge",
+        "temp 40.0",
+        'temp{gpu="0"} 61.0',
+        'temp{gpu="1",node="b"} 62.0',
+    ]
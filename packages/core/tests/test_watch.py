@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from core.watch import FileWatcher
+
+
+def test_check_applies_only_changed_files(tmp_path: Path) -> None:
+    path = tmp_path / "settings.txt"
+    path.write_text("a")
+    seen: list[str] = []
+
+    def load(p: Path) -> int:
+        seen.append(p.read_text())
+        return len(seen)
+
+    watcher = FileWatcher(path, load)
+    assert watcher.check() == 1
+    assert watcher.check() is None
+    assert watcher.check(force=True) == 2
+
+    path.write_text("b")
+    os.utime(path, (1, 1))
+    assert watcher.check() == 3
+    assert seen == ["a", "a", "b"]
+
+
+def test_failed_load_is_retried_on_next_check(tmp_path: Path) -> None:
+    path = tmp_path / "settings.txt"
+    path.write_text("broken")
+
+    def load(p: Path) -> str:
+        text = p.read_text()
+        if text == "broken":
+            raise ValueError(text)
+        return text
+
+    watcher = FileWatcher(path, load)
+    with pytest.raises(ValueError):
+        watcher.check()
+    path.write_text("ok")
+    assert watcher.check() == "ok"
+    with pytest.raises(ValueError):
+        FileWatcher(path, load, interval=0)
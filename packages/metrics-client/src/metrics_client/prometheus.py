@@ -1,26 +1,482 @@
-"""Cliente mínimo para realizar peticiones a Prometheus."""
+"""Cliente de la API HTTP de Prometheus.
+
+* Las conexiones HTTP/1.1 se reutilizan (keep-alive) desde un pool acotado;
+  una conexión que el servidor cerró mientras estaba ociosa se detecta al
+  usarla y la petición se repite una vez con otra nueva.
+* :meth:`PrometheusClient.query_many` lanza varias expresiones a la vez sobre
+  ese pool y devuelve los resultados en el orden pedido; las expresiones
+  repetidas se piden una sola vez.
+* :meth:`PrometheusClient.query_range` decodifica la respuesta a medida que
+  llega, serie a serie, a arrays ``array('d')`` de timestamps y valores, sin
+  construir antes el árbol JSON completo.
+* Los resultados se guardan en una caché LRU con TTL corto indexada por
+  ``(expresión, tiempo alineado)``: las consultas instantáneas sin ``time``
+  se evalúan en el instante actual redondeado a ``resolution`` segundos y las
+  de rango alinean ``start``/``end`` a ``step``, de modo que paneles que
+  piden lo mismo casi a la vez comparten la respuesta.
+
+Los resultados cacheados se comparten entre llamantes y no deben modificarse.
+"""
 
 from __future__ import annotations
 
+import codecs
+import http.client
 import json
-import urllib.error
-import urllib.parse
-import urllib.request
+import math
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Tuple,
+)
+from urllib.parse import urlencode, urlsplit
+
+
+class PrometheusError(RuntimeError):
+    """Fallo de red o error devuelto por la API de Prometheus."""
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True, slots=True)
+class RangeSeries:
+    metric: Mapping[str, str]
+    timestamps: array = field(repr=False)
+    values: array = field(repr=False)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    valid_until: float
+
+
+# Errores de una conexión keep-alive que el servidor ya había cerrado.
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class _ConnectionPool:
+    """Conexiones HTTP/1.1 ociosas a un único host, reutilizadas en LIFO."""
+
+    def __init__(
+        self, scheme: str, host: str, port: int | None, *, size: int, timeout: float
+    ) -> None:
+        self._factory = (
+            http.client.HTTPSConnection
+            if scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Conexión libre y si ya se había usado antes."""
+
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        return self._factory(self._host, self._port, timeout=self._timeout), False
+
+    def release(
+        self, connection: http.client.HTTPConnection, *, reusable: bool
+    ) -> None:
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class _ResultStream:
+    """Recorre los elementos de ``data.result`` según llegan los bytes.
+
+    El final de cada elemento se busca de forma incremental: se sigue la
+    profundidad de llaves y corchetes (y si se está dentro de una cadena o
+    tras un ``\\``) desde donde terminó el trozo anterior, y el elemento se
+    decodifica una sola vez, cuando está completo. Así el coste es lineal en
+    el tamaño de la respuesta aunque un elemento ocupe muchos trozos.
+    """
+
+    _START = re.compile(r'"result"\s*:\s*\[')
+    _ELEMENT = re.compile(r"[^\s,]")
+    _STRUCTURE = re.compile(r'[{}\[\]"]')
+    _STRING_STOP = re.compile(r'["\\]')
+    _SCALAR_END = re.compile(r"[\s,\]]")
+
+    def __init__(self, read: Callable[[int], bytes], chunk_size: int) -> None:
+        self._read = read
+        self._chunk_size = chunk_size
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self._decoder = json.JSONDecoder()
+        self._eof = False
+
+    def _chunk(self) -> str | None:
+        """Siguiente trozo de texto; ``None`` al final del cuerpo."""
+
+        if self._eof:
+            return None
+        data = self._read(self._chunk_size)
+        if not data:
+            self._eof = True
+            return self._decode(b"", final=True) or None
+        return self._decode(data)
+
+    def _more(self) -> str:
+        text = self._chunk()
+        if text is None:
+            raise PrometheusError("Respuesta de Prometheus truncada")
+        return text
+
+    def _parse(self, text: str) -> Any:
+        try:
+            return self._decoder.decode(text)
+        except ValueError as exc:
+            raise PrometheusError(
+                f"Respuesta de Prometheus mal formada: {exc}"
+            ) from exc
+
+    def __iter__(self) -> Iterator[Any]:
+        text = ""
+        match = None
+        while match is None:
+            chunk = self._chunk()
+            if chunk is None:
+                break
+            text += chunk
+            match = self._START.search(text)
+        if match is None:
+            # Sin array de resultados: respuesta de error u otro formato.
+            payload = self._parse(text)
+            if payload.get("status") == "error":
+                raise PrometheusError(
+                    f"{payload.get('errorType', 'error')}: {payload.get('error', '')}"
+                )
+            yield from payload.get("data", {}).get("result", ())
+            return
+        position = match.end()
+        # Trozos ya leídos del elemento en curso y estado del escaneo.
+        parts: List[str] = []
+        in_element = in_string = escaped = scalar = False
+        depth = start = 0
+        while True:
+            if not in_element:
+                found = self._ELEMENT.search(text, position)
+                if found is None:
+                    text, position = self._more(), 0
+                    continue
+                position = found.start()
+                if text[position] == "]":
+                    # El cuerpo se lee entero para poder reutilizar la conexión.
+                    while self._chunk() is not None:
+                        pass
+                    return
+                in_element, start = True, position
+                scalar = text[position] not in '{["'
+            end = -1
+            while end < 0:
+                if escaped:
+                    if position == len(text):
+                        break
+                    position, escaped = position + 1, False
+                if in_string:
+                    found = self._STRING_STOP.search(text, position)
+                    if found is None:
+                        break
+                    position = found.end()
+                    if found.group() == "\\":
+                        escaped = True
+                    else:
+                        in_string = False
+                        if depth == 0:
+                            end = position
+                elif scalar:
+                    found = self._SCALAR_END.search(text, position)
+                    if found is None:
+                        break
+                    end = found.start()
+                else:
+                    found = self._STRUCTURE.search(text, position)
+                    if found is None:
+                        break
+                    position = found.end()
+                    token = found.group()
+                    if token == '"':
+                        in_string = True
+                    elif token in "{[":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            end = position
+            if end < 0:
+                # Elemento incompleto: se guarda lo leído y se sigue escaneando.
+                parts.append(text[start:])
+                text, position, start = self._more(), 0, 0
+                continue
+            parts.append(text[start:end])
+            item = self._parse("".join(parts))
+            parts.clear()
+            in_element = False
+            position = end
+            yield item
+
+
+def _to_series(item: Mapping[str, Any]) -> RangeSeries:
+    points = item.get("values", ())
+    return RangeSeries(
+        metric=item.get("metric", {}),
+        timestamps=array("d", [point[0] for point in points]),
+        values=array("d", [float(point[1]) for point in points]),
+    )
+
+
+def _align(timestamp: float, step: float) -> float:
+    return math.floor(timestamp / step) * step
+
+
+def _format_time(timestamp: float) -> str:
+    return f"{timestamp:.3f}".rstrip("0").rstrip(".")
 
 
 class PrometheusClient:
-    def __init__(self, base_url: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 5.0,
+        pool_size: int = 8,
+        cache_ttl: float = 5.0,
+        cache_size: int = 1024,
+        resolution: float = 1.0,
+        chunk_size: int = 64 * 1024,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        if pool_size <= 0:
+            raise ValueError("pool_size must be > 0")
+        if resolution <= 0:
+            raise ValueError("resolution must be > 0")
         self._base_url = base_url.rstrip("/")
+        parts = urlsplit(self._base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"URL de Prometheus no válida: {base_url}")
+        self._prefix = parts.path
+        self._pool = _ConnectionPool(
+            parts.scheme, parts.hostname, parts.port, size=pool_size, timeout=timeout
+        )
+        self._pool_size = pool_size
+        self._executor: ThreadPoolExecutor | None = None
+        self._cache: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._cache_ttl = cache_ttl
+        self._cache_size = cache_size
+        self._resolution = resolution
+        self._chunk_size = chunk_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
 
-    def query(self, expr: str) -> dict:
-        url = f"{self._base_url}/api/v1/query?{urllib.parse.urlencode({'query': expr})}"
-        request = urllib.request.Request(url)
-        try:
-            with urllib.request.urlopen(request, timeout=5.0) as response:
-                payload = response.read().decode("utf-8")
-        except urllib.error.URLError as exc:  # pragma: no cover - entorno sin red
-            raise RuntimeError(f"No se pudo contactar con Prometheus: {exc}") from exc
-        return json.loads(payload)
-
-    def close(self) -> None:  # pragma: no cover - no se mantiene estado
-        return None
+    # -- API pública -----------------------------------------------------
+
+    def query(self, expr: str, time: float | None = None) -> dict:
+        """Consulta instantánea; devuelve el JSON completo de la respuesta."""
+
+        at = _align(self._clock() if time is None else time, self._resolution)
+        return self._cached(("query", expr, at), lambda: self._query(expr, at))
+
+    def query_many(self, exprs: Iterable[str], time: float | None = None) -> List[dict]:
+        """Varias consultas instantáneas en paralelo, evaluadas en el mismo instante."""
+
+        exprs = list(exprs)
+        at = _align(self._clock() if time is None else time, self._resolution)
+        unique = list(dict.fromkeys(exprs))
+        if len(unique) <= 1:
+            results = {expr: self.query(expr, at) for expr in unique}
+        else:
+            futures = {
+                expr: self._fan_out().submit(self.query, expr, at) for expr in unique
+            }
+            results = {expr: future.result() for expr, future in futures.items()}
+        return [results[expr] for expr in exprs]
+
+    def query_range(
+        self, expr: str, start: float, end: float, step: float
+    ) -> List[RangeSeries]:
+        """Consulta de rango con ``start``/``end`` alineados a ``step``."""
+
+        if step <= 0:
+            raise ValueError("step must be > 0")
+        start, end = _align(start, step), _align(end, step)
+        return self._cached(
+            ("query_range", expr, start, end, step),
+            lambda: self._query_range(expr, start, end, step),
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    @property
+    def connections_opened(self) -> int:
+        return self._pool.opened
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pool.close()
+
+    def __enter__(self) -> "PrometheusClient":
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, traceback: object) -> None:
+        self.close()
+
+    # -- internos --------------------------------------------------------
+
+    def _fan_out(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._pool_size, thread_name_prefix="prometheus"
+                )
+            return self._executor
+
+    def _cached(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry.valid_until > self._clock():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                del self._cache[key]
+            self.misses += 1
+        value = fetch()
+        if self._cache_ttl > 0:
+            with self._lock:
+                self._cache[key] = _Entry(value, self._clock() + self._cache_ttl)
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return value
+
+    def _query(self, expr: str, at: float) -> dict:
+        return self._get(
+            "/api/v1/query",
+            {"query": expr, "time": _format_time(at)},
+            lambda r: json.loads(r.read()),
+        )
+
+    def _query_range(
+        self, expr: str, start: float, end: float, step: float
+    ) -> List[RangeSeries]:
+        params = {
+            "query": expr,
+            "start": _format_time(start),
+            "end": _format_time(end),
+            "step": _format_time(step),
+        }
+        return self._get(
+            "/api/v1/query_range",
+            params,
+            lambda response: [
+                _to_series(item)
+                for item in _ResultStream(response.read, self._chunk_size)
+            ],
+        )
+
+    def _get(
+        self,
+        path: str,
+        params: Mapping[str, str],
+        consume: Callable[[http.client.HTTPResponse], Any],
+    ) -> Any:
+        target = f"{self._prefix}{path}?{urlencode(params)}"
+        headers = {"Accept": "application/json"}
+        for attempt in range(2):
+            connection, reused = self._pool.acquire()
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+            except _STALE_ERRORS as exc:
+                self._pool.release(connection, reusable=False)
+                if reused and attempt == 0:
+                    continue
+                raise PrometheusError(
+                    f"No se pudo contactar con Prometheus: {exc}"
+                ) from exc
+            except (OSError, http.client.HTTPException) as exc:
+                # ``BadStatusLine``, ``LineTooLong``... no son ``OSError``.
+                self._pool.release(connection, reusable=False)
+                raise PrometheusError(
+                    f"No se pudo contactar con Prometheus: {exc}"
+                ) from exc
+            except BaseException:
+                self._pool.release(connection, reusable=False)
+                raise
+            try:
+                if response.status != 200:
+                    raise _api_error(response.status, response.read())
+                result = consume(response)
+            except PrometheusError:
+                self._pool.release(
+                    connection, reusable=response.isclosed() and not response.will_close
+                )
+                raise
+            except (OSError, http.client.HTTPException, ValueError) as exc:
+                # Cuerpo cortado (``IncompleteRead``) o JSON inválido.
+                self._pool.release(connection, reusable=False)
+                raise PrometheusError(
+                    f"Respuesta de Prometheus no válida: {exc}"
+                ) from exc
+            except BaseException:
+                self._pool.release(connection, reusable=False)
+                raise
+            self._pool.release(connection, reusable=not response.will_close)
+            return result
+        raise AssertionError("unreachable")  # pragma: no cover
+
+
+def _api_error(status: int, body: bytes) -> PrometheusError:
+    try:
+        payload: Dict[str, Any] = json.loads(body)
+        detail = f"{payload.get('errorType', 'error')}: {payload.get('error', '')}"
+    except (ValueError, AttributeError):
+        detail = body.decode("utf-8", errors="replace")[:200]
+    return PrometheusError(
+        f"Prometheus respondió {status}: {detail}", status_code=status
+    )
+
+
+__all__ = ["PrometheusClient", "PrometheusError", "RangeSeries"]
@@ -1,6 +1,243 @@
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Set, Tuple, cast
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
 from metrics_client import prometheus
+from metrics_client.prometheus import PrometheusClient, PrometheusError
 
 
 def test_client_has_query_method():
     client = prometheus.PrometheusClient.__new__(prometheus.PrometheusClient)
     assert hasattr(client, "query")
+
+
+# Comillas, corchetes y barras dentro de cadenas no cierran el elemento.
+_EXPR = 'rate(x{path="/a]}"}[5m]) \\'
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    lock: threading.Lock
+    requests: List[Tuple[str, dict]]
+    clients: Set[Tuple[str, int]]
+    delay: float
+
+
+class _StubPrometheus(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    timeout = 5.0
+
+    def log_message(self, format: str, *args: object) -> None:
+        return None
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        server = cast(_StubServer, self.server)
+        with server.lock:
+            server.requests.append((parts.path, params))
+            server.clients.add(self.client_address)
+        time.sleep(server.delay)
+        expr = params.get("query", "")
+        if expr == "bad(":
+            self._send(
+                400,
+                {"status": "error", "errorType": "bad_data", "error": "parse error"},
+            )
+        elif expr == "bad-status":
+            self.close_connection = True
+            self.wfile.write(b"garbage\r\n\r\n")
+        elif expr == "bad-json":
+            body = b'{"status": "success", "data": '
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parts.path == "/api/v1/query":
+            result = [
+                {"metric": {"__name__": expr}, "value": [float(params["time"]), "1"]}
+            ]
+            self._send(
+                200,
+                {
+                    "status": "success",
+                    "data": {"resultType": "vector", "result": result},
+                },
+            )
+        elif parts.path == "/api/v1/query_range":
+            self._send_chunked(self._matrix(params))
+        else:
+            self._send(
+                404, {"status": "error", "errorType": "not_found", "error": parts.path}
+            )
+
+    @staticmethod
+    def _matrix(params: dict) -> bytes:
+        start, end, step = (
+            float(params["start"]),
+            float(params["end"]),
+            float(params["step"]),
+        )
+        timestamps = [start + i * step for i in range(int((end - start) / step) + 1)]
+        result = [
+            {
+                "metric": {"gpu": str(gpu), "nodo": "ñ", "expr": _EXPR},
+                "values": [
+                    [ts, "NaN" if gpu == 2 else str(gpu * ts)] for ts in timestamps
+                ],
+            }
+            for gpu in range(3)
+        ]
+        payload = {
+            "status": "success",
+            "data": {"resultType": "matrix", "result": result},
+        }
+        return json.dumps(payload, ensure_ascii=False, indent=1).encode("utf-8")
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(self, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for offset in range(0, len(body), 5):
+            chunk = body[offset : offset + 5]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def stub() -> Iterator[_StubServer]:
+    server = _StubServer(("127.0.0.1", 0), _StubPrometheus)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.clients = set()
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(server: _StubServer, **kwargs: Any) -> PrometheusClient:
+    return PrometheusClient(f"http://127.0.0.1:{server.server_port}", **kwargs)
+
+
+def test_sequential_queries_reuse_one_connection(stub) -> None:
+    with _client(stub, cache_ttl=0) as client:
+        for index in range(5):
+            payload = client.query(f"up{index}", time=1000.0)
+            assert payload["data"]["result"][0]["metric"]["__name__"] == f"up{index}"
+        assert client.connections_opened == 1
+    assert len(stub.requests) == 5 and len(stub.clients) == 1
+
+
+def test_cache_is_keyed_by_aligned_time_and_expires(stub) -> None:
+    now = [1000.2]
+    with _client(stub, cache_ttl=5.0, resolution=1.0, clock=lambda: now[0]) as client:
+        first = client.query("up")
+        now[0] = 1000.9
+        assert client.query("up") is first
+        assert client.query("up", time=1000.5) is first
+        assert stub.requests == [("/api/v1/query", {"query": "up", "time": "1000"})]
+        now[0] = 1001.1
+        client.query("up")
+        now[0] = 1007.0
+        client.query("up", time=1001.0)
+        assert [params["time"] for _, params in stub.requests] == [
+            "1000",
+            "1001",
+            "1001",
+        ]
+        assert (client.hits, client.misses) == (2, 3)
+
+
+def test_query_many_fans_out_and_deduplicates(stub) -> None:
+    stub.delay = 0.2
+    exprs = ["a", "b", "c", "a", "d"]
+    with _client(stub, pool_size=4, cache_ttl=0) as client:
+        started = time.perf_counter()
+        results = client.query_many(exprs, time=50.0)
+        elapsed = time.perf_counter() - started
+    assert [r["data"]["result"][0]["metric"]["__name__"] for r in results] == exprs
+    assert len(stub.requests) == 4
+    assert elapsed < 0.6
+
+
+def test_query_range_streams_into_arrays(stub) -> None:
+    with _client(stub, chunk_size=7) as client:
+        series = client.query_range("gpu_util", start=1003.0, end=1031.0, step=10.0)
+        assert stub.requests[-1][1] == {
+            "query": "gpu_util",
+            "start": "1000",
+            "end": "1030",
+            "step": "10",
+        }
+        assert [s.metric for s in series] == [
+            {"gpu": str(g), "nodo": "ñ", "expr": _EXPR} for g in range(3)
+        ]
+        assert list(series[1].timestamps) == [1000.0, 1010.0, 1020.0, 1030.0]
+        assert list(series[1].values) == [1000.0, 1010.0, 1020.0, 1030.0]
+        assert all(math.isnan(value) for value in series[2].values)
+        assert (
+            client.query_range("gpu_util", start=1000.0, end=1039.0, step=10.0)
+            is series
+        )
+        client.query("up", time=1.0)
+        assert client.connections_opened == 1
+
+
+def test_api_errors_raise_and_keep_connection(stub) -> None:
+    with _client(stub) as client:
+        with pytest.raises(PrometheusError) as excinfo:
+            client.query("bad(", time=1.0)
+        assert excinfo.value.status_code == 400
+        assert "parse error" in str(excinfo.value)
+        client.query("up", time=1.0)
+        assert client.connections_opened == 1
+
+
+def test_malformed_responses_raise_and_free_the_slot(stub) -> None:
+    with _client(stub, pool_size=1, cache_ttl=0, timeout=2.0) as client:
+        for expr in ("bad-status", "bad-json", "bad-status"):
+            with pytest.raises(PrometheusError):
+                client.query(expr, time=1.0)
+        # Con el único hueco del pool perdido, esta consulta se bloquearía.
+        worker = threading.Thread(
+            target=client.query, args=("up",), kwargs={"time": 1.0}, daemon=True
+        )
+        worker.start()
+        worker.join(5.0)
+        assert not worker.is_alive()
+
+
+def test_stale_keep_alive_connection_is_retried(stub) -> None:
+    _StubPrometheus.timeout = 0.2
+    try:
+        with _client(stub, cache_ttl=0) as client:
+            client.query("up", time=1.0)
+            time.sleep(0.5)  # el servidor cierra la conexión ociosa
+            assert client.query("up", time=2.0)["status"] == "success"
+            assert client.connections_opened == 2
+    finally:
+        _StubPrometheus.timeout = 5.0
+
+
+def test_unreachable_server_raises() -> None:
+    with PrometheusClient("http://127.0.0.1:9", timeout=1.0) as client:
+        with pytest.raises(PrometheusError):
+            client.query("up")
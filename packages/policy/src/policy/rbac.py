@@ -1,8 +1,44 @@
-"""RBAC básico."""
+"""RBAC compilado a máscaras de bits.
+
+Una política se compila una vez (:meth:`Policy.compile`): cada acción se
+interna a un bit y cada rol a la máscara de sus permisos, con la herencia ya
+aplanada. Comprobar un permiso son dos búsquedas en diccionario y un ``&``;
+:meth:`Policy.can_many` resuelve el rol una sola vez para todo el lote.
+
+Formato de configuración (JSON, TOML o YAML)::
+
+    actions: [query, eval:read, eval:write, admin]
+    roles:
+      user: [query]
+      analyst:
+        inherits: [user]
+        permissions: ["eval:*"]
+      admin:
+        inherits: [analyst]
+        permissions: ["*"]
+
+Un rol puede ser directamente la lista de permisos; cualquier otro valor
+(por ejemplo una cadena suelta) se rechaza con ``ValueError``. ``"*"`` concede todas las
+acciones conocidas y ``"recurso:*"`` todas las de ese recurso; las acciones
+conocidas son las declaradas en ``actions`` más las citadas en algún rol. Una
+acción o un rol desconocidos nunca tienen permiso.
+
+:class:`PolicyStore` recarga el fichero cuando cambia su ``mtime`` (con
+:class:`core.watch.FileWatcher`) y cambia la política de forma atómica; las
+comprobaciones en curso usan la anterior.
+"""
 
 from __future__ import annotations
 
-from typing import Mapping
+import json
+import logging
+import tomllib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping
+
+from core.watch import FileWatcher
+
+logger = logging.getLogger(__name__)
 
 ROLE_PERMISSIONS: Mapping[str, set[str]] = {
     "admin": {"query", "admin", "eval"},
@@ -10,6 +46,231 @@ ROLE_PERMISSIONS: Mapping[str, set[str]] = {
     "user": {"query"},
 }
 
+_ALL = "*"
+
+
+class Policy:
+    """Roles y acciones internados a enteros; inmutable una vez compilada."""
+
+    __slots__ = ("_actions", "_roles")
+
+    def __init__(self, actions: Mapping[str, int], roles: Mapping[str, int]) -> None:
+        # acción -> bit (potencia de dos); rol -> máscara de acciones permitidas.
+        self._actions = dict(actions)
+        self._roles = dict(roles)
+
+    @classmethod
+    def compile(cls, config: Mapping[str, Any]) -> "Policy":
+        if "roles" in config:
+            raw_roles = config["roles"]
+        else:
+            # Un mapa rol -> permisos sin envolver; ``actions`` sigue siendo
+            # la lista de acciones, no un rol.
+            raw_roles = {
+                key: value for key, value in config.items() if key != "actions"
+            }
+        if not isinstance(raw_roles, Mapping):
+            raise TypeError("roles must be a mapping of role -> permissions")
+        grants: Dict[str, List[str]] = {}
+        parents: Dict[str, List[str]] = {}
+        for role, spec in raw_roles.items():
+            if isinstance(spec, Mapping):
+                grants[role] = _names(
+                    spec.get("permissions", ()), f"permissions of role {role!r}"
+                )
+                parents[role] = _names(
+                    spec.get("inherits", ()), f"inherits of role {role!r}"
+                )
+            else:
+                grants[role] = _names(spec, f"role {role!r}")
+                parents[role] = []
+            for parent in parents[role]:
+                if parent not in raw_roles:
+                    raise ValueError(f"Role {role!r} inherits unknown role {parent!r}")
+
+        names = list(
+            dict.fromkeys(
+                [
+                    *_names(config.get("actions", ()), "actions"),
+                    *(p for perms in grants.values() for p in perms),
+                ]
+            )
+        )
+        names = [name for name in names if name != _ALL and not name.endswith(":*")]
+        actions = {name: 1 << index for index, name in enumerate(names)}
+
+        def expand(permission: str) -> int:
+            if permission == _ALL:
+                return (1 << len(actions)) - 1
+            if permission.endswith(":*"):
+                prefix = permission[:-1]
+                return sum(
+                    bit for name, bit in actions.items() if name.startswith(prefix)
+                )
+            return actions[permission]
+
+        own = {
+            role: _or(expand(permission) for permission in perms)
+            for role, perms in grants.items()
+        }
+        flattened: Dict[str, int] = {}
+
+        def resolve(role: str, path: tuple[str, ...]) -> int:
+            if role in path:
+                raise ValueError(f"Inheritance cycle: {' -> '.join((*path, role))}")
+            if role not in flattened:
+                flattened[role] = own[role] | _or(
+                    resolve(parent, (*path, role)) for parent in parents[role]
+                )
+            return flattened[role]
+
+        for role in grants:
+            resolve(role, ())
+        return cls(actions, flattened)
+
+    def can(self, role: str, action: str) -> bool:
+        return bool(self._roles.get(role, 0) & self._actions.get(action, 0))
+
+    def can_many(self, role: str, actions: Iterable[str]) -> List[bool]:
+        mask = self._roles.get(role, 0)
+        lookup = self._actions.get
+        return [bool(mask & lookup(action, 0)) for action in actions]
+
+    def mask(self, actions: Iterable[str]) -> int:
+        """Máscara de un conjunto de acciones, para comprobarlo con :meth:`allows`.
+
+        Una acción desconocida hace la máscara imposible de satisfacer.
+        """
+
+        result = 0
+        for action in actions:
+            bit = self._actions.get(action)
+            if bit is None:
+                return -1
+            result |= bit
+        return result
+
+    def allows(self, role: str, mask: int) -> bool:
+        """``True`` si ``role`` tiene todas las acciones de ``mask``."""
+
+        return mask >= 0 and self._roles.get(role, 0) & mask == mask
+
+    def permissions(self, role: str) -> frozenset[str]:
+        mask = self._roles.get(role, 0)
+        return frozenset(name for name, bit in self._actions.items() if mask & bit)
+
+    @property
+    def roles(self) -> frozenset[str]:
+        return frozenset(self._roles)
+
+    @property
+    def actions(self) -> frozenset[str]:
+        return frozenset(self._actions)
+
+
+def _names(value: Any, what: str) -> List[str]:
+    # Una cadena también es iterable: sin esto "query" serían cinco permisos.
+    if not isinstance(value, (list, tuple, set, frozenset)) or not all(
+        isinstance(item, str) for item in value
+    ):
+        raise ValueError(f"{what} must be a list of names, got {value!r}")
+    return list(value)
+
+
+def _or(masks: Iterable[int]) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+
+def load_policy_file(path: str | Path) -> Policy:
+    """Compila una política desde ``.json``, ``.toml`` o ``.yaml``/``.yml``."""
+
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+    elif suffix == ".toml":
+        with path.open("rb") as fh:
+            data = tomllib.load(fh)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml  # type: ignore[import-untyped]
+        except ImportError as exc:  # pragma: no cover - dependencia opcional
+            raise RuntimeError("PyYAML is required to load YAML policies") from exc
+        data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    else:
+        raise ValueError(f"Unsupported policy format: {path.suffix}")
+    if not isinstance(data, Mapping):
+        raise TypeError(f"Policy file {path} must contain a mapping")
+    return Policy.compile(data)
+
+
+class PolicyStore:
+    """Política activa cargada desde fichero, recargable sin reiniciar.
+
+    ``reload()`` puede invocarse explícitamente; ``start()`` lanza un hilo que
+    compara el ``mtime`` cada ``interval`` segundos. Un fichero inválido se
+    registra y se ignora: se conserva la última política buena.
+    """
+
+    def __init__(self, path: str | Path, *, interval: float = 5.0) -> None:
+        self._watcher = FileWatcher(
+            path, self._apply, interval=interval, name="rbac-policy-watcher"
+        )
+        self.policy: Policy
+        self._watcher.check(force=True)
+
+    def _apply(self, path: Path) -> Policy:
+        self.policy = load_policy_file(path)
+        logger.info(
+            "RBAC policy loaded from %s: %s roles", path, len(self.policy.roles)
+        )
+        return self.policy
+
+    def reload(self, *, force: bool = False) -> bool:
+        """Recompila el fichero si cambió (o si ``force``); devuelve si se aplicó."""
+
+        return self._watcher.check(force=force) is not None
+
+    def can(self, role: str, action: str) -> bool:
+        return self.policy.can(role, action)
+
+    def can_many(self, role: str, actions: Iterable[str]) -> List[bool]:
+        return self.policy.can_many(role, actions)
+
+    def start(self) -> None:
+        self._watcher.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._watcher.stop(timeout)
+
+
+_active: Policy | PolicyStore = Policy.compile({"roles": ROLE_PERMISSIONS})
+
+
+def use(policy: Policy | PolicyStore) -> None:
+    """Sustituye la política que consultan :func:`can` y :func:`can_many`."""
+
+    global _active
+    _active = policy
+
 
 def can(role: str, action: str) -> bool:
-    return action in ROLE_PERMISSIONS.get(role, set())
+    return _active.can(role, action)
+
+
+def can_many(role: str, actions: Iterable[str]) -> List[bool]:
+    return _active.can_many(role, actions)
+
+
+__all__ = [
+    "ROLE_PERMISSIONS",
+    "Policy",
+    "PolicyStore",
+    "can",
+    "can_many",
+    "load_policy_file",
+    "use",
+]
@@ -1,3 +1,7 @@
+import json
+import os
+
+import pytest
 from policy import rbac
 
 
@@ -7,3 +11,117 @@ def test_admin_can_eval():
 
 def test_user_cannot_admin():
     assert not rbac.can("user", "admin")
+
+
+_CONFIG = {
+    "actions": ["query", "eval:read", "eval:write", "admin", "billing:read"],
+    "roles": {
+        "user": ["query"],
+        "analyst": {"inherits": ["user"], "permissions": ["eval:*"]},
+        "auditor": {"permissions": ["eval:read", "billing:read"]},
+        "admin": {"inherits": ["analyst", "auditor"], "permissions": ["*"]},
+    },
+}
+
+
+def test_compiled_policy_flattens_inheritance_and_wildcards():
+    policy = rbac.Policy.compile(_CONFIG)
+    assert policy.permissions("analyst") == {"query", "eval:read", "eval:write"}
+    assert policy.permissions("admin") == policy.actions
+    assert policy.can("analyst", "eval:write")
+    assert not policy.can("auditor", "query")
+    assert not policy.can("ghost", "query")
+    assert not policy.can("admin", "unknown")
+
+
+def test_can_many_and_masks():
+    policy = rbac.Policy.compile(_CONFIG)
+    assert policy.can_many(
+        "auditor", ["query", "eval:read", "billing:read", "nope"]
+    ) == [False, True, True, False]
+    required = policy.mask(["query", "eval:read"])
+    assert policy.allows("analyst", required)
+    assert not policy.allows("auditor", required)
+    assert not policy.allows("admin", policy.mask(["query", "nope"]))
+
+
+def test_invalid_policies_are_rejected():
+    with pytest.raises(ValueError):
+        rbac.Policy.compile(
+            {"roles": {"a": {"inherits": ["b"]}, "b": {"inherits": ["a"]}}}
+        )
+    with pytest.raises(ValueError):
+        rbac.Policy.compile({"roles": {"a": {"inherits": ["missing"]}}})
+
+
+def test_actions_must_be_a_list_of_names():
+    with pytest.raises(ValueError):
+        rbac.Policy.compile({"actions": "query", "roles": {"user": ["query"]}})
+
+
+def test_bare_role_map_does_not_treat_actions_as_a_role():
+    policy = rbac.Policy.compile({"actions": ["query", "eval"], "r": ["query"]})
+    assert policy.roles == {"r"}
+    assert policy.actions == {"query", "eval"}
+
+
+def test_role_specs_must_be_lists_of_names():
+    for spec in (
+        "query",
+        3,
+        {"permissions": "query"},
+        {"inherits": "user"},
+        ["query", 1],
+    ):
+        with pytest.raises(ValueError):
+            rbac.Policy.compile({"roles": {"user": ["query"], "odd": spec}})
+
+
+def test_policy_store_reloads_changed_files(tmp_path):
+    path = tmp_path / "rbac.json"
+    path.write_text(json.dumps(_CONFIG))
+    store = rbac.PolicyStore(path)
+    assert not store.can("user", "eval:read")
+    assert not store.reload()
+
+    updated = dict(_CONFIG, roles={**_CONFIG["roles"], "user": ["query", "eval:read"]})
+    path.write_text(json.dumps(updated))
+    os.utime(path, (1, 1))
+    assert store.reload()
+    assert store.can("user", "eval:read")
+
+    rbac.use(store)
+    try:
+        assert rbac.can_many("user", ["query", "eval:read", "admin"]) == [
+            True,
+            True,
+            False,
+        ]
+    finally:
+        rbac.use(rbac.Policy.compile({"roles": rbac.ROLE_PERMISSIONS}))
+
+
+def test_toml_and_yaml_files_load(tmp_path):
+    toml_path = tmp_path / "rbac.toml"
+    toml_path.write_text(
+        '[roles]\nuser = ["query"]\n[roles.admin]\ninherits = ["user"]\npermissions = ["admin"]\n'
+    )
+    assert rbac.load_policy_file(toml_path).permissions("admin") == {"query", "admin"}
+    yaml_path = tmp_path / "rbac.yaml"
+    yaml_path.write_text("roles:\n  user: [query]\n")
+    assert rbac.load_policy_file(yaml_path).can("user", "query")
+
+
+def test_shipped_policy_matches_builtin_roles():
+    path = os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "..",
+        "..",
+        "configs",
+        "policies",
+        "rbac.policy.yaml",
+    )
+    policy = rbac.load_policy_file(path)
+    for role, permissions in rbac.ROLE_PERMISSIONS.items():
+        assert policy.permissions(role) == permissions
@@ -0,0 +1,161 @@
+"""Benchmark multihilo del AdmissionController.
+
+Compara el controlador actual (un lock por bucket) con el esquema anterior,
+emulado serializando todas las llamadas tras un único lock global. Cada hilo
+trabaja sobre su propio tenant para medir la contención entre buckets que no
+comparten estado.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass
+from threading import Barrier, Lock, Thread
+from time import perf_counter
+from typing import Callable, List, Sequence
+
+from core.logging import setup as setup_logging
+from orchestrator import AdmissionController, AdmissionDecision, Quota
+
+logger = logging.getLogger(__name__)
+
+_QUEUES = ("fast", "batch")
+_QUOTA = Quota(rate=1e9, burst=10**9, max_inflight=10**9)
+
+
+class _GlobalLockController:
+    """Emula el controlador previo: todas las llamadas bajo un mismo lock."""
+
+    def __init__(self, inner: AdmissionController) -> None:
+        self._inner = inner
+        self._lock = Lock()
+
+    def allow(
+        self, tenant: str, queue: str, *, weight: int = 1, now: float | None = None
+    ) -> AdmissionDecision:
+        with self._lock:
+            return self._inner.allow(tenant, queue, weight=weight, now=now)
+
+    def release(self, tenant: str, queue: str, *, weight: int = 1) -> None:
+        with self._lock:
+            self._inner.release(tenant, queue, weight=weight)
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    mode: str
+    threads: int
+    operations: int
+    seconds: float
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.operations / self.seconds if self.seconds else 0.0
+
+
+def _build_controller(tenants: int) -> AdmissionController:
+    return AdmissionController(
+        {
+            f"tenant-{index}": {queue: _QUOTA for queue in _QUEUES}
+            for index in range(tenants)
+        }
+    )
+
+
+def _worker_single(
+    controller: AdmissionController | _GlobalLockController, tenant: str, requests: int
+) -> None:
+    for index in range(requests):
+        queue = _QUEUES[index & 1]
+        controller.allow(tenant, queue)
+        controller.release(tenant, queue)
+
+
+def _worker_batch(
+    controller: AdmissionController, tenant: str, requests: int, batch: int
+) -> None:
+    payload = [(tenant, _QUEUES[index & 1], 1) for index in range(batch)]
+    for _ in range(max(1, requests // batch)):
+        controller.allow_many(payload)
+        for _, queue, weight in payload:
+            controller.release(tenant, queue, weight=weight)
+
+
+def _make_target(
+    mode: str, tenants: int, requests: int, batch: int
+) -> Callable[[int], None]:
+    controller = _build_controller(tenants)
+    if mode == "allow_many":
+        return lambda index: _worker_batch(
+            controller, f"tenant-{index}", requests, batch
+        )
+    if mode == "global-lock":
+        legacy = _GlobalLockController(controller)
+        return lambda index: _worker_single(legacy, f"tenant-{index}", requests)
+    return lambda index: _worker_single(controller, f"tenant-{index}", requests)
+
+
+def _run(threads: int, target: Callable[[int], None]) -> float:
+    barrier = Barrier(threads + 1)
+
+    def runner(index: int) -> None:
+        barrier.wait()
+        target(index)
+
+    workers = [Thread(target=runner, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = perf_counter()
+    for worker in workers:
+        worker.join()
+    return perf_counter() - start
+
+
+def run_benchmark(
+    *,
+    threads: Sequence[int] = (1, 2, 4, 8),
+    requests: int = 20_000,
+    batch: int = 32,
+) -> List[BenchmarkResult]:
+    """Ejecuta los tres modos (global, sharded, batch) para cada nº de hilos."""
+
+    results: List[BenchmarkResult] = []
+    for count in threads:
+        for mode in ("global-lock", "sharded", "allow_many"):
+            target = _make_target(mode, count, requests, batch)
+            seconds = _run(count, target)
+            result = BenchmarkResult(mode, count, count * requests, seconds)
+            logger.debug(
+                "%s threads=%s -> %.0f ops/s", mode, count, result.ops_per_second
+            )
+            results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark de escalado del AdmissionController"
+    )
+    parser.add_argument("--threads", type=str, default="1,2,4,8")
+    parser.add_argument(
+        "--requests", type=int, default=20_000, help="solicitudes por hilo"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=32, help="tamaño de lote para allow_many"
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    thread_counts = [int(chunk) for chunk in args.threads.split(",") if chunk.strip()]
+    results = run_benchmark(
+        threads=thread_counts, requests=args.requests, batch=args.batch
+    )
+    print(f"{'mode':<12} {'threads':>7} {'ops/s':>12}")
+    for result in results:
+        print(f"{result.mode:<12} {result.threads:>7} {result.ops_per_second:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark de verificación de tokens del api-gateway.
+
+Compara el coste de verificar ``--tokens`` JWT HS256 distintos por primera vez
+(decodificación y HMAC) con el de volver a presentarlos cuando sus claims ya
+están en la caché de :class:`~api_gateway.deps.auth.TokenVerifier`, incluida
+la comprobación de rol con :func:`policy.rbac.can`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass
+from time import perf_counter, time
+from typing import List
+
+from api_gateway.deps.auth import TokenVerifier, encode_token
+from core.logging import setup as setup_logging
+
+logger = logging.getLogger(__name__)
+
+_KEYS = {"bench": b"bench-secret-key"}
+
+
+@dataclass(frozen=True)
+class VerifyResult:
+    mode: str
+    verifications: int
+    microseconds: float
+    speedup: float
+
+
+def run_benchmark(*, tokens: int = 20_000, rounds: int = 5) -> List[VerifyResult]:
+    expires = time() + 3600
+    issued = [
+        encode_token(
+            {"sub": f"user-{index}", "role": "analyst", "exp": expires},
+            _KEYS["bench"],
+            kid="bench",
+        )
+        for index in range(tokens)
+    ]
+    verifier = TokenVerifier(lambda: _KEYS, cache_size=tokens, cache_ttl=3600)
+
+    start = perf_counter()
+    for token in issued:
+        verifier.verify(token).can("query")
+    cold = (perf_counter() - start) / tokens
+
+    start = perf_counter()
+    for _ in range(rounds):
+        for token in issued:
+            verifier.verify(token).can("query")
+    warm = (perf_counter() - start) / (tokens * rounds)
+    logger.debug("hits=%s misses=%s", verifier.hits, verifier.misses)
+    return [
+        VerifyResult("decode+hmac", tokens, cold * 1e6, 1.0),
+        VerifyResult("cached", tokens * rounds, warm * 1e6, cold / max(warm, 1e-12)),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de verificación de tokens")
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="pasadas sobre los tokens ya cacheados"
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"{'mode':<12} {'verifications':>14} {'us/verify':>10} {'speedup':>8}")
+    for result in run_benchmark(tokens=args.tokens, rounds=args.rounds):
+        print(
+            f"{result.mode:<12} {result.verifications:>14} {result.microseconds:>10.2f} {result.speedup:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
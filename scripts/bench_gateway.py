@@ -0,0 +1,226 @@
+"""Benchmark de carga local del servidor HTTP del api-gateway.
+
+Arranca :class:`~api_gateway.server.HttpServer` en un puerto efímero y lanza
+``--connections`` clientes keep-alive contra ``GET /v1/health`` y
+``POST /v1/query``, cada uno con hasta ``--pipeline`` peticiones en vuelo.
+Informa de peticiones por segundo y latencias p50/p99 por ruta; para
+``POST /v1/query?stream=true`` también del tiempo hasta el primer token (TTFT).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from time import perf_counter
+from typing import List
+
+from api_gateway.main import app
+from api_gateway.server import HttpServer
+from core.logging import setup as setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RouteResult:
+    route: str
+    requests: int
+    requests_per_second: float
+    p50_ms: float
+    p99_ms: float
+    ttft_p50_ms: float | None = None
+    ttft_p99_ms: float | None = None
+
+
+def _request(method: str, path: str, body: dict | None) -> bytes:
+    raw = json.dumps(body).encode() if body is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(raw)}\r\n\r\n"
+    )
+    return head.encode() + raw
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return int(head.split(b" ", 2)[1])
+
+
+async def _read_stream(
+    reader: asyncio.StreamReader, sent: float, ttft: List[float]
+) -> None:
+    await reader.readuntil(b"\r\n\r\n")
+    first = True
+    while True:
+        size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+        await reader.readexactly(size + 2)
+        if first:
+            ttft.append(perf_counter() - sent)
+            first = False
+        if size == 0:
+            return
+
+
+async def _stream_client(
+    port: int, payload: bytes, count: int, latencies: List[float], ttft: List[float]
+) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for _ in range(count):
+            sent = perf_counter()
+            writer.write(payload)
+            await _read_stream(reader, sent, ttft)
+            latencies.append(perf_counter() - sent)
+    finally:
+        writer.close()
+
+
+async def _client(
+    port: int, payload: bytes, count: int, pipeline: int, latencies: List[float]
+) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    sent: List[float] = []
+    try:
+        done = 0
+        while done < count:
+            burst = min(pipeline, count - done)
+            for _ in range(burst):
+                sent.append(perf_counter())
+                writer.write(payload)
+            await writer.drain()
+            for index in range(burst):
+                status = await _read_response(reader)
+                if status != 200:
+                    logger.warning("Respuesta %s inesperada", status)
+                latencies.append(perf_counter() - sent[done + index])
+            done += burst
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return (
+        ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+        if ordered
+        else 0.0
+    )
+
+
+async def _run(
+    requests: int, connections: int, pipeline: int, max_concurrency: int
+) -> List[RouteResult]:
+    routes = (
+        ("GET /v1/health", _request("GET", "/v1/health", None)),
+        (
+            "POST /v1/query",
+            _request("POST", "/v1/query", {"payload": {"query": "latencia p99"}}),
+        ),
+    )
+    results: List[RouteResult] = []
+    async with HttpServer(
+        app, port=0, max_concurrency=max_concurrency, pipeline_depth=pipeline
+    ) as server:
+        per_client = max(1, requests // connections)
+        for name, payload in routes:
+            latencies: List[float] = []
+            start = perf_counter()
+            await asyncio.gather(
+                *(
+                    _client(server.port, payload, per_client, pipeline, latencies)
+                    for _ in range(connections)
+                )
+            )
+            elapsed = perf_counter() - start
+            results.append(
+                RouteResult(
+                    name,
+                    len(latencies),
+                    len(latencies) / max(elapsed, 1e-9),
+                    _percentile(latencies, 0.50),
+                    _percentile(latencies, 0.99),
+                )
+            )
+
+        # Streaming: sin pipelining, cada cliente espera al evento final.
+        payload = _request(
+            "POST", "/v1/query?stream=true", {"payload": {"query": "latencia p99"}}
+        )
+        latencies, ttft = [], []
+        start = perf_counter()
+        await asyncio.gather(
+            *(
+                _stream_client(server.port, payload, per_client, latencies, ttft)
+                for _ in range(connections)
+            )
+        )
+        elapsed = perf_counter() - start
+        results.append(
+            RouteResult(
+                "POST /v1/query (sse)",
+                len(latencies),
+                len(latencies) / max(elapsed, 1e-9),
+                _percentile(latencies, 0.50),
+                _percentile(latencies, 0.99),
+                _percentile(ttft, 0.50),
+                _percentile(ttft, 0.99),
+            )
+        )
+    return results
+
+
+def run_benchmark(
+    *,
+    requests: int = 20_000,
+    connections: int = 32,
+    pipeline: int = 4,
+    max_concurrency: int = 256,
+) -> List[RouteResult]:
+    return asyncio.run(_run(requests, connections, pipeline, max_concurrency))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark de carga del servidor HTTP del api-gateway"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=20_000, help="peticiones por ruta"
+    )
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument(
+        "--pipeline", type=int, default=4, help="peticiones en vuelo por conexión"
+    )
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    args = parser.parse_args()
+
+    setup_logging()
+    results = run_benchmark(
+        requests=args.requests,
+        connections=args.connections,
+        pipeline=args.pipeline,
+        max_concurrency=args.max_concurrency,
+    )
+    print(
+        f"{'route':<22} {'requests':>9} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'ttft p50':>9} {'ttft p99':>9}"
+    )
+    for result in results:
+        ttft = (
+            f"{result.ttft_p50_ms:>9.2f} {result.ttft_p99_ms:>9.2f}"
+            if result.ttft_p50_ms is not None and result.ttft_p99_ms is not None
+            else f"{'-':>9} {'-':>9}"
+        )
+        print(
+            f"{result.route:<22} {result.requests:>9} {result.requests_per_second:>10.0f} "
+            f"{result.p50_ms:>8.2f} {result.p99_ms:>8.2f} {ttft}"
+        )
+
+
+if __name__ == "__main__":
+    main()
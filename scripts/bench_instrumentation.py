@@ -0,0 +1,132 @@
+"""Micro-benchmark del coste por span de la instrumentación de latencias.
+
+Mide los nanosegundos que añade ``with span(...)`` (``core.tracing``) y
+``with track_latency(...)`` (api-gateway) respecto a un bucle vacío, y los
+compara con la implementación anterior basada en ``print`` (redirigida a
+``/dev/null`` para no medir la terminal) y con un ``with`` sobre un context
+manager vacío, que es el suelo de cualquier API basada en ``with`` en la
+máquina. El volcado a histogramas se mide aparte: en producción lo hace el
+hilo de fondo, fuera del camino caliente, pero compite por el GIL.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import os
+from dataclasses import dataclass
+from time import perf_counter, perf_counter_ns
+from typing import Callable, ContextManager, Iterator, List
+
+from api_gateway.infra.observability import ROUTE_LATENCY, track_latency
+from core import instrumentation
+from core.logging import setup as setup_logging
+from core.tracing import SPANS, span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OverheadResult:
+    mode: str
+    iterations: int
+    overhead_ns: float
+
+
+@contextlib.contextmanager
+def _print_span(name: str) -> Iterator[None]:
+    """Implementación anterior de ``core.tracing.span``."""
+
+    start = perf_counter()
+    print(f"Span {name} started")
+    try:
+        yield
+    finally:
+        duration = perf_counter() - start
+        print(f"Span {name} finished in {duration:.3f}s")
+
+
+def _loop(
+    factory: Callable[[str], ContextManager[object]] | None, name: str, iterations: int
+) -> float:
+    start = perf_counter_ns()
+    if factory is None:
+        for _ in range(iterations):
+            pass
+    else:
+        for _ in range(iterations):
+            with factory(name):
+                pass
+    return (perf_counter_ns() - start) / iterations
+
+
+class _Empty:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type: object, exc: object, traceback: object) -> None:
+        return None
+
+
+def run_benchmark(
+    *, iterations: int = 1_000_000, repeats: int = 5
+) -> List[OverheadResult]:
+    # Sin flusher, para medir sólo el camino caliente; se vuelca entre pasadas.
+    instrumentation.stop_flusher()
+    empty = _Empty()
+    baseline = min(_loop(None, "", iterations) for _ in range(repeats))
+    results = [
+        OverheadResult(
+            "empty with (floor)",
+            iterations,
+            _loop(lambda _: empty, "", iterations) - baseline,
+        )
+    ]
+    for mode, factory, name in (
+        ("core.tracing.span", span, "bench"),
+        ("track_latency", track_latency, "GET /v1/health"),
+    ):
+        timings = []
+        for _ in range(repeats):
+            timings.append(_loop(factory, name, iterations))
+            instrumentation.flush_all()
+        results.append(OverheadResult(mode, iterations, min(timings) - baseline))
+
+    legacy_iterations = max(1, iterations // 10)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        legacy = min(
+            _loop(_print_span, "bench", legacy_iterations) for _ in range(repeats)
+        )
+    results.append(
+        OverheadResult("print span (before)", legacy_iterations, legacy - baseline)
+    )
+
+    _loop(span, "flush", iterations)
+    start = perf_counter_ns()
+    flushed = SPANS.flush() + ROUTE_LATENCY.flush()
+    results.append(
+        OverheadResult(
+            "flush (background)", flushed, (perf_counter_ns() - start) / max(flushed, 1)
+        )
+    )
+    logger.debug("Volcadas %s mediciones", flushed)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark de la instrumentación de latencias"
+    )
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"{'mode':<22} {'iterations':>11} {'ns/span':>9}")
+    for result in run_benchmark(iterations=args.iterations, repeats=args.repeats):
+        print(f"{result.mode:<22} {result.iterations:>11} {result.overhead_ns:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
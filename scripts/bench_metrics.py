@@ -0,0 +1,166 @@
+"""Micro-benchmark del coste de registrar métricas con varios hilos.
+
+Lanza ``--threads`` hilos que registran a la vez y mide los nanosegundos por
+operación (tiempo de pared total entre operaciones totales) de:
+
+* ``MetricsClient.observe`` con la implementación anterior (clave ordenada y
+  formateada en cada llamada);
+* ``MetricsClient.observe`` sobre el registro;
+* ``Counter.inc`` e ``Histogram.observe`` sobre hijos pre-enlazados;
+* ``Histogram.labels(...).observe``, que resuelve las etiquetas en cada
+  llamada.
+
+Al final comprueba que los contadores no han perdido incrementos.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+from dataclasses import dataclass
+from time import perf_counter_ns
+from typing import Callable, List, Mapping
+
+from core.logging import setup as setup_logging
+from core.metrics import MetricsClient, Registry
+
+logger = logging.getLogger(__name__)
+
+LABELS = {"route": "/v1/query", "method": "POST"}
+
+
+@dataclass(frozen=True)
+class ObserveResult:
+    mode: str
+    threads: int
+    operations: int
+    ns_per_op: float
+
+
+class _LegacyMetricsClient:
+    """Implementación anterior de ``core.metrics.MetricsClient``."""
+
+    def __init__(self) -> None:
+        self._values: dict[str, float] = {}
+
+    def observe(
+        self, name: str, value: float, labels: Mapping[str, str] | None = None
+    ) -> None:
+        key = name if not labels else f"{name}:{tuple(sorted(labels.items()))}"
+        self._values[key] = value
+
+
+def _run_threads(
+    threads: int, iterations: int, make_worker: Callable[[], Callable[[int], None]]
+) -> float:
+    barrier = threading.Barrier(threads + 1)
+    workers = [make_worker() for _ in range(threads)]
+
+    def run(worker: Callable[[int], None]) -> None:
+        barrier.wait()
+        worker(iterations)
+
+    pool = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = perf_counter_ns()
+    for thread in pool:
+        thread.join()
+    return (perf_counter_ns() - start) / (threads * iterations)
+
+
+def run_benchmark(
+    *, threads: int = 8, iterations: int = 200_000
+) -> List[ObserveResult]:
+    registry = Registry()
+    counter = registry.counter("bench_requests_total", "Peticiones", list(LABELS))
+    histogram = registry.histogram("bench_latency_seconds", "Latencia", list(LABELS))
+    legacy = _LegacyMetricsClient()
+    client = MetricsClient(registry)
+
+    def legacy_worker() -> Callable[[int], None]:
+        def work(n: int) -> None:
+            observe = legacy.observe
+            for _ in range(n):
+                observe("bench_queue_depth", 1.0, LABELS)
+
+        return work
+
+    def client_worker() -> Callable[[int], None]:
+        def work(n: int) -> None:
+            observe = client.observe
+            for _ in range(n):
+                observe("bench_queue_depth", 1.0, LABELS)
+
+        return work
+
+    def counter_worker() -> Callable[[int], None]:
+        inc = counter.labels(**LABELS).inc
+
+        def work(n: int) -> None:
+            for _ in range(n):
+                inc()
+
+        return work
+
+    def histogram_worker() -> Callable[[int], None]:
+        observe = histogram.labels(**LABELS).observe
+
+        def work(n: int) -> None:
+            for _ in range(n):
+                observe(0.042)
+
+        return work
+
+    def lookup_worker() -> Callable[[int], None]:
+        def work(n: int) -> None:
+            labels = histogram.labels
+            for _ in range(n):
+                labels(**LABELS).observe(0.042)
+
+        return work
+
+    results = []
+    for mode, make_worker in (
+        ("legacy observe (before)", legacy_worker),
+        ("MetricsClient.observe", client_worker),
+        ("bound Counter.inc", counter_worker),
+        ("bound Histogram.observe", histogram_worker),
+        ("labels() per call", lookup_worker),
+    ):
+        ns_per_op = _run_threads(threads, iterations, make_worker)
+        results.append(ObserveResult(mode, threads, threads * iterations, ns_per_op))
+
+    expected = threads * iterations
+    if counter.labels(**LABELS).value != expected:
+        raise RuntimeError(
+            f"Counter lost increments: {counter.labels(**LABELS).value} != {expected}"
+        )
+    if histogram.labels(**LABELS).snapshot()[2] != 2 * expected:
+        raise RuntimeError("Histogram lost observations")
+    logger.debug("Exposición de %s bytes", len(registry.exposition()))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark del registro de métricas con varios hilos"
+    )
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument(
+        "--iterations", type=int, default=200_000, help="operaciones por hilo"
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"{'mode':<24} {'threads':>7} {'operations':>11} {'ns/op':>7}")
+    for result in run_benchmark(threads=args.threads, iterations=args.iterations):
+        print(
+            f"{result.mode:<24} {result.threads:>7} {result.operations:>11} {result.ns_per_op:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Benchmark del cliente Prometheus contra un servidor local simulado.
+
+Levanta un servidor HTTP/1.1 en ``127.0.0.1`` que responde a
+``/api/v1/query`` y ``/api/v1/query_range`` con una latencia fija
+(``--latency``) y compara, para un lote de ``--queries`` expresiones como el
+que dispara un dashboard:
+
+* la implementación anterior (``urllib``, una conexión por consulta, en serie);
+* :class:`PrometheusClient` en serie, reutilizando la conexión;
+* :meth:`PrometheusClient.query_many` en paralelo;
+* el mismo lote repetido, servido desde la caché;
+* :meth:`PrometheusClient.query_range` con ``--series`` series.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Callable, List
+from urllib.parse import parse_qs, urlsplit
+
+from core.logging import setup as setup_logging
+from metrics_client.prometheus import PrometheusClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ClientResult:
+    mode: str
+    queries: int
+    total_ms: float
+    connections: int
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: object) -> None:
+        return None
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            server.clients.add(self.client_address)
+        time.sleep(server.latency)
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if parts.path == "/api/v1/query_range":
+            start, end, step = (
+                float(params["start"]),
+                float(params["end"]),
+                float(params["step"]),
+            )
+            points = [
+                [start + i * step, "0.5"] for i in range(int((end - start) / step) + 1)
+            ]
+            result = [
+                {"metric": {"gpu": str(gpu)}, "values": points}
+                for gpu in range(server.series)
+            ]
+            payload = {
+                "status": "success",
+                "data": {"resultType": "matrix", "result": result},
+            }
+        else:
+            result = [{"metric": {}, "value": [float(params.get("time", 0)), "1"]}]
+            payload = {
+                "status": "success",
+                "data": {"resultType": "vector", "result": result},
+            }
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _legacy_query(base_url: str, expr: str) -> dict:
+    """Implementación anterior de ``PrometheusClient.query``."""
+
+    url = f"{base_url}/api/v1/query?{urllib.parse.urlencode({'query': expr})}"
+    with urllib.request.urlopen(urllib.request.Request(url), timeout=5.0) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _measure(
+    server: ThreadingHTTPServer, mode: str, queries: int, run: Callable[[], object]
+) -> ClientResult:
+    server.clients.clear()
+    start = perf_counter()
+    run()
+    return ClientResult(
+        mode, queries, (perf_counter() - start) * 1000, len(server.clients)
+    )
+
+
+def run_benchmark(
+    *, queries: int = 32, latency: float = 0.005, series: int = 64, pool_size: int = 8
+) -> List[ClientResult]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.clients = set()
+    server.latency = latency
+    server.series = series
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+    exprs = [
+        f'rate(gateway_requests_total{{route="/r{i}"}}[5m])' for i in range(queries)
+    ]
+    results = []
+    try:
+        legacy = lambda: [_legacy_query(base_url, expr) for expr in exprs]  # noqa: E731
+        results.append(_measure(server, "urllib serial (before)", queries, legacy))
+        with PrometheusClient(base_url, pool_size=pool_size, cache_ttl=0) as client:
+            results.append(
+                _measure(
+                    server,
+                    "pooled serial",
+                    queries,
+                    lambda: [client.query(e) for e in exprs],
+                )
+            )
+            results.append(
+                _measure(
+                    server, "query_many", queries, lambda: client.query_many(exprs)
+                )
+            )
+        with PrometheusClient(
+            base_url, pool_size=pool_size, cache_ttl=30.0, resolution=60.0
+        ) as client:
+            client.query_many(exprs)
+            results.append(
+                _measure(
+                    server,
+                    "query_many (cached)",
+                    queries,
+                    lambda: client.query_many(exprs),
+                )
+            )
+            now = time.time()
+            results.append(
+                _measure(
+                    server,
+                    "query_range",
+                    1,
+                    lambda: client.query_range(exprs[0], now - 3600, now, 15),
+                )
+            )
+        logger.debug("Servidor simulado en %s", base_url)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark del cliente Prometheus contra un servidor simulado"
+    )
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.005,
+        help="latencia simulada por consulta (s)",
+    )
+    parser.add_argument(
+        "--series", type=int, default=64, help="series por respuesta de query_range"
+    )
+    parser.add_argument("--pool-size", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"{'mode':<24} {'queries':>7} {'total ms':>9} {'connections':>11}")
+    for result in run_benchmark(
+        queries=args.queries,
+        latency=args.latency,
+        series=args.series,
+        pool_size=args.pool_size,
+    ):
+        print(
+            f"{result.mode:<24} {result.queries:>7} {result.total_ms:>9.1f} {result.connections:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmark del rate limiter por clave del api-gateway.
+
+Para cada algoritmo y backend reparte ``--requests`` peticiones entre
+``--keys`` claves (la mitad del tráfico sobre el 1% de claves más activas) y
+mide decisiones por segundo, memoria por clave y el tiempo de expulsar todas
+las claves inactivas. El backend ``shared`` usa ``shared_memory`` con una
+tabla de ``2 * keys`` huecos.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import tracemalloc
+from dataclasses import dataclass
+from time import perf_counter
+from typing import List
+
+from api_gateway.deps.rate_limit import (
+    MemoryBackend,
+    RateLimit,
+    RateLimiter,
+    SharedMemoryBackend,
+)
+from core.logging import setup as setup_logging
+
+logger = logging.getLogger(__name__)
+
+_ALGORITHMS = ("gcra", "token_bucket", "sliding_window")
+
+
+@dataclass(frozen=True)
+class LimiterResult:
+    algorithm: str
+    backend: str
+    keys: int
+    decisions_per_second: float
+    denied_ratio: float
+    bytes_per_key: float
+    evict_ms: float
+
+
+def _workload(keys: int, requests: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    names = [f"tenant-{index}" for index in range(keys)]
+    hot = names[: max(1, keys // 100)]
+    # Primero todas las claves una vez, para medir la memoria con la tabla llena.
+    return names + [
+        rng.choice(hot) if rng.random() < 0.5 else rng.choice(names)
+        for _ in range(requests)
+    ]
+
+
+def _measure(
+    limiter: RateLimiter, workload: List[str], keys: int, track_memory: bool
+) -> tuple[float, float, float]:
+    now = 0.0
+    step = 1.0 / len(workload)
+    if track_memory:
+        tracemalloc.start()
+    for key in workload[:keys]:
+        limiter.hit(key, now=now)
+    memory = tracemalloc.get_traced_memory()[0] / keys if track_memory else 0.0
+    if track_memory:
+        tracemalloc.stop()
+    denied = 0
+    start = perf_counter()
+    for key in workload[keys:]:
+        now += step
+        if not limiter.hit(key, now=now).allowed:
+            denied += 1
+    elapsed = perf_counter() - start
+    return (
+        (len(workload) - keys) / max(elapsed, 1e-9),
+        denied / max(1, len(workload) - keys),
+        memory,
+    )
+
+
+def run_benchmark(
+    *, keys: int = 100_000, requests: int = 500_000, rate: float = 10.0, seed: int = 0
+) -> List[LimiterResult]:
+    workload = _workload(keys, requests, seed)
+    limit = RateLimit(rate=rate, period=1.0)
+    results: List[LimiterResult] = []
+    for algorithm in _ALGORITHMS:
+        for backend_name in ("memory", "shared"):
+            if backend_name == "memory":
+                backend = MemoryBackend()
+                bytes_per_key = None
+            else:
+                backend = SharedMemoryBackend(slots=2 * keys)
+                bytes_per_key = 40.0 * 2
+            try:
+                limiter = RateLimiter(limit, algorithm=algorithm, backend=backend)
+                throughput, denied, memory = _measure(
+                    limiter, workload, keys, bytes_per_key is None
+                )
+                start = perf_counter()
+                evicted = limiter.evict_idle(now=1.0 + limiter.idle_ttl + 1.0)
+                evict_ms = (perf_counter() - start) * 1000
+                logger.debug(
+                    "%s/%s expulsó %s claves", algorithm, backend_name, evicted
+                )
+            finally:
+                if isinstance(backend, SharedMemoryBackend):
+                    backend.close()
+            results.append(
+                LimiterResult(
+                    algorithm,
+                    backend_name,
+                    keys,
+                    throughput,
+                    denied,
+                    memory if bytes_per_key is None else bytes_per_key,
+                    evict_ms,
+                )
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del rate limiter por clave")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument(
+        "--rate", type=float, default=10.0, help="peticiones por segundo y clave"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_logging()
+    print(
+        f"{'algorithm':<15} {'backend':<8} {'keys':>8} {'decisions/s':>12} {'denied':>7} {'B/key':>7} {'evict ms':>9}"
+    )
+    for result in run_benchmark(
+        keys=args.keys, requests=args.requests, rate=args.rate, seed=args.seed
+    ):
+        print(
+            f"{result.algorithm:<15} {result.backend:<8} {result.keys:>8} {result.decisions_per_second:>12.0f} "
+            f"{result.denied_ratio:>7.2%} {result.bytes_per_key:>7.0f} {result.evict_ms:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Micro-benchmark del despacho de rutas de :class:`~api_gateway.framework.App`.
+
+Compara el despacho original (recorrido lineal de la lista de rutas e
+``inspect.signature`` en cada llamada) con la tabla compilada: diccionario
+para rutas estáticas, árbol por segmentos para las parametrizadas y plan de
+enlace precalculado. Se registran ``--routes`` rutas estáticas y otras tantas
+con parámetro, y se despachan peticiones repartidas uniformemente entre ellas.
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import logging
+import random
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from api_gateway.framework import App, Route, Router
+from core.logging import setup as setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DispatchResult:
+    mode: str
+    requests: int
+    nanoseconds_per_request: float
+    speedup: float
+
+
+def _handler(name: str = "", limit: int = 10, id: str | None = None) -> dict:
+    return {"name": name, "limit": limit, "id": id}
+
+
+def build_app(routes: int) -> App:
+    router = Router(prefix="/v1")
+    for index in range(routes):
+        router.get(f"/resource{index}/items")(_handler)
+        router.get(f"/resource{index}/items/{{id}}")(_handler)
+    app = App()
+    app.include_router(router)
+    return app
+
+
+def _linear_dispatch(
+    routes: List[Route], method: str, path: str, body: Dict[str, Any] | None
+) -> Any:
+    """Despacho previo a la tabla compilada, conservado como referencia."""
+
+    for route in routes:
+        if route.method != method:
+            continue
+        params = _match_linear(route.path, path)
+        if params is None:
+            continue
+        values = {**(body or {}), **params}
+        kwargs: Dict[str, Any] = {}
+        for name, parameter in inspect.signature(route.handler).parameters.items():
+            if name in values:
+                kwargs[name] = values[name]
+            elif parameter.default is not inspect.Parameter.empty:
+                kwargs[name] = parameter.default
+            else:
+                kwargs[name] = None
+        return route.handler(**kwargs)
+    raise LookupError(path)
+
+
+def _match_linear(pattern: str, path: str) -> Dict[str, str] | None:
+    if "{" not in pattern:
+        return {} if pattern == path else None
+    expected, actual = pattern.split("/"), path.split("/")
+    if len(expected) != len(actual):
+        return None
+    params: Dict[str, str] = {}
+    for segment, value in zip(expected, actual):
+        if segment.startswith("{"):
+            params[segment[1:-1]] = value
+        elif segment != value:
+            return None
+    return params
+
+
+def _time(
+    call: Callable[[str, str, Dict[str, Any] | None], Any],
+    workload: List[Tuple[str, str, Dict[str, Any] | None]],
+) -> float:
+    start = perf_counter()
+    for method, path, body in workload:
+        call(method, path, body)
+    return perf_counter() - start
+
+
+def run_benchmark(
+    *, routes: int = 50, requests: int = 100_000, seed: int = 0
+) -> List[DispatchResult]:
+    rng = random.Random(seed)
+    app = build_app(routes)
+    table = list(app.routes)
+    workload: List[Tuple[str, str, Dict[str, Any] | None]] = []
+    for _ in range(requests):
+        index = rng.randrange(routes)
+        if rng.random() < 0.5:
+            workload.append(("GET", f"/v1/resource{index}/items", {"limit": 5}))
+        else:
+            workload.append(
+                ("GET", f"/v1/resource{index}/items/{rng.randrange(1000)}", None)
+            )
+
+    linear = _time(
+        lambda method, path, body: _linear_dispatch(table, method, path, body), workload
+    )
+    compiled = _time(app.handle, workload)
+    logger.debug("lineal %.3fs, compilado %.3fs", linear, compiled)
+    return [
+        DispatchResult("linear+signature", requests, linear / requests * 1e9, 1.0),
+        DispatchResult(
+            "compiled",
+            requests,
+            compiled / requests * 1e9,
+            linear / max(compiled, 1e-12),
+        ),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark del despacho de rutas del api-gateway"
+    )
+    parser.add_argument(
+        "--routes",
+        type=int,
+        default=50,
+        help="rutas estáticas (y otras tantas parametrizadas)",
+    )
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"{'mode':<18} {'requests':>9} {'ns/req':>10} {'speedup':>8}")
+    for result in run_benchmark(
+        routes=args.routes, requests=args.requests, seed=args.seed
+    ):
+        print(
+            f"{result.mode:<18} {result.requests:>9} {result.nanoseconds_per_request:>10.0f} "
+            f"{result.speedup:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,70 @@
-"""Herramienta de simulación de carga para FERIA Precision Codex."""
+"""Herramienta de simulación de carga para FERIA Precision Codex.
+
+El modo por defecto es un simulador de eventos discretos
+(:func:`run_event_simulation`): las llegadas son Poisson o a ráfagas, cada
+cola tiene su distribución de tiempo de servicio y un número de servidores
+que el ``GpuGovernor`` reescala en cada tick periódico. El resultado incluye
+percentiles de latencia por cola. ``--fixed-step`` conserva el bucle antiguo
+de paso fijo (:func:`run_simulation`).
+
+``--trace`` reproduce llegadas reales (JSONL o CSV, opcionalmente comprimidos
+con gzip, bz2 o xz) leídas en streaming con :func:`iter_trace`; la
+reproducción (:func:`replay_trace`) pasa por ``AdmissionController``,
+``QueueManager`` y ``GpuGovernor`` reales, a velocidad 1x, Nx o tan rápido
+como sea posible.
+
+``--sweep`` reparte una rejilla de escenarios (qps × mezcla × escala de
+cuotas × utilización objetivo) en un ``ProcessPoolExecutor`` y escribe una
+tabla consolidada en CSV (o Parquet si ``pyarrow`` está instalado), con una
+fila por escenario y cola.
+"""
 
 from __future__ import annotations
 
 import argparse
+import bz2
+import csv
+import gzip
+import heapq
 import itertools
+import json
 import logging
+import lzma
+import math
+import time
+import zlib
+from array import array
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, Mapping, MutableSequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableSequence,
+    NamedTuple,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
 
 from core.logging import setup as setup_logging
 from orchestrator import (
     AdmissionController,
+    GovernorDecision,
     GpuGovernor,
     GpuMetrics,
     GovernorConfig,
     QueueManager,
+    Quota,
 )
 
 
@@ -75,21 +124,28 @@ def _expand_mix(weights: Mapping[str, int]) -> Iterable[str]:
     return itertools.cycle(sequence)
 
 
+DEFAULT_QUOTAS: Mapping[str, Mapping[str, float]] = {
+    "fast": {"rate": 30, "burst": 60, "max_inflight": 50},
+    "batch": {"rate": 10, "burst": 20, "max_inflight": 200},
+    "eval": {"rate": 2, "burst": 4, "max_inflight": 20},
+}
+
+
 def create_default_controller() -> AdmissionController:
-    config = [
-        {
-            "tenant": "default",
-            "fast": {"rate": 30, "burst": 60, "max_inflight": 50},
-            "batch": {"rate": 10, "burst": 20, "max_inflight": 200},
-            "eval": {"rate": 2, "burst": 4, "max_inflight": 20},
-        }
-    ]
+    config = [{"tenant": "default", **DEFAULT_QUOTAS}]
     return AdmissionController.from_dict(config)
 
 
+def default_quotas() -> Dict[str, Quota]:
+    return {
+        queue: Quota(rate=float(raw["rate"]), burst=int(raw["burst"]), max_inflight=int(raw["max_inflight"]))
+        for queue, raw in DEFAULT_QUOTAS.items()
+    }
+
+
 def run_simulation(
     *,
-    qps: int,
+    qps: float,
     duration: float,
     mix: Mapping[str, int],
     controller: AdmissionController,
@@ -97,7 +153,7 @@ def run_simulation(
     tenant: str = "default",
     sleep: Callable[[float], None] | None = None,
     governor: GpuGovernor | None = None,
-    metrics_factory: Callable[[dict[str, int], dict[str, int], MutableSequence[float], int, float], GpuMetrics]
+    metrics_factory: Callable[[dict[str, int], dict[str, int], MutableSequence[float], float, float], GpuMetrics]
     | None = None,
 ) -> SimulationResult:
     if qps <= 0:
@@ -121,8 +177,7 @@ def run_simulation(
             stats_enqueued[queue] += 1
         else:
             stats_rejected[queue] += 1
-        backlog = sum(snapshot.depth for snapshot in manager.stats())
-        backlog_history.append(backlog)
+        backlog_history.append(manager.total_backlog())
         now += interval
         if sleep:
             sleep(interval)
@@ -138,7 +193,7 @@ def default_metrics_factory(
     enqueued: Mapping[str, int],
     rejected: Mapping[str, int],
     backlog_history: MutableSequence[float],
-    qps: int,
+    qps: float,
     duration: float,
 ) -> GpuMetrics:
     total_enqueued = sum(enqueued.values())
@@ -162,21 +217,858 @@ def default_metrics_factory(
     )
 
 
+# -- simulador de eventos discretos ------------------------------------------
+
+_PERCENTILES = (50.0, 95.0, 99.0)
+_CHUNK_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class ServiceTime:
+    """Distribución del tiempo de servicio de una cola, en segundos.
+
+    ``kind`` es ``exp`` (exponencial), ``const`` o ``lognormal``; en la
+    lognormal ``mean`` es la media y ``sigma`` la dispersión del logaritmo.
+    """
+
+    kind: str = "exp"
+    mean: float = 0.05
+    sigma: float = 0.5
+
+    def __post_init__(self) -> None:
+        if self.kind not in ("exp", "const", "lognormal"):
+            raise ValueError(f"Unknown service distribution '{self.kind}'")
+        if self.mean <= 0:
+            raise ValueError("Service mean must be positive")
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        if self.kind == "const":
+            return np.full(size, self.mean)
+        if self.kind == "exp":
+            return rng.exponential(self.mean, size)
+        mu = math.log(self.mean) - self.sigma**2 / 2
+        return rng.lognormal(mu, self.sigma, size)
+
+
+def parse_service(spec: str) -> Dict[str, ServiceTime]:
+    """Interpreta ``fast=exp:0.05,batch=lognormal:0.4:0.8,eval=const:1.5``."""
+
+    services: Dict[str, ServiceTime] = {}
+    for chunk in filter(None, (part.strip() for part in spec.split(","))):
+        if "=" not in chunk:
+            raise ValueError(f"Invalid service fragment '{chunk}'")
+        name, raw = (part.strip() for part in chunk.split("=", 1))
+        kind, *params = raw.split(":")
+        try:
+            values = [float(value) for value in params]
+        except ValueError as exc:
+            raise ValueError(f"Invalid service parameters in '{chunk}'") from exc
+        if not values:
+            raise ValueError(f"Service '{chunk}' needs a mean")
+        services[name] = ServiceTime(kind, *values[:2])
+    return services
+
+
+def parse_servers(spec: str) -> Dict[str, int]:
+    return {name: int(value) for name, value in parse_mix(spec).items()}
+
+
+@dataclass(frozen=True)
+class ArrivalProcess:
+    """Llegadas Poisson, o moduladas por una cadena de Markov de dos estados.
+
+    Con ``burst_factor > 1`` el proceso alterna periodos de calma y de ráfaga
+    (duraciones exponenciales de media ``mean_calm`` y ``mean_burst``); en
+    ráfaga la tasa es ``burst_factor`` veces la de calma y la media global
+    sigue siendo ``qps``.
+    """
+
+    qps: float
+    burst_factor: float = 1.0
+    mean_burst: float = 10.0
+    mean_calm: float = 50.0
+
+    def rates(self) -> Tuple[float, float]:
+        if self.burst_factor <= 1.0:
+            return self.qps, self.qps
+        share = self.mean_burst / (self.mean_burst + self.mean_calm)
+        calm = self.qps / (1.0 - share + share * self.burst_factor)
+        return calm, calm * self.burst_factor
+
+    def times(self, duration: float, rng: np.random.Generator) -> Iterator[np.ndarray]:
+        """Devuelve los instantes de llegada en bloques ordenados."""
+
+        calm, burst = self.rates()
+        modulated = self.burst_factor > 1.0
+        start, bursting = 0.0, False
+        while start < duration:
+            if modulated:
+                length = rng.exponential(self.mean_burst if bursting else self.mean_calm)
+            else:
+                length = _CHUNK_SECONDS
+            end = min(duration, start + length)
+            rate = burst if bursting else calm
+            count = rng.poisson(rate * (end - start))
+            if count:
+                yield np.sort(rng.uniform(start, end, count))
+            start, bursting = end, modulated and not bursting
+
+
+@dataclass(frozen=True)
+class EventSimulationResult:
+    admitted: Mapping[str, int]
+    rejected: Mapping[str, int]
+    total_requests: int
+    duration_seconds: float
+    latency: Mapping[str, Mapping[float, float]]
+    governor_ticks: int = 0
+    governor_decision: GovernorDecision | None = None
+    wall_seconds: float = 0.0
+    mean_scale: float = 1.0
+    backlog_mean: float = 0.0
+    backlog_peak: float = 0.0
+
+    def summary(self) -> str:
+        lines = [
+            "total=%s admitted=%s rejected=%s backlog=%.1f/%.0f duration=%.1fs wall=%.2fs"
+            % (
+                self.total_requests,
+                sum(self.admitted.values()),
+                sum(self.rejected.values()),
+                self.backlog_mean,
+                self.backlog_peak,
+                self.duration_seconds,
+                self.wall_seconds,
+            )
+        ]
+        header = " ".join(f"{'p' + format(p, 'g'):>9}" for p in _PERCENTILES)
+        lines.append(f"{'queue':<10} {'admitted':>9} {'rejected':>9} {header}")
+        for queue in self.admitted:
+            values = " ".join(f"{self.latency[queue].get(p, math.nan) * 1000:>7.1f}ms" for p in _PERCENTILES)
+            lines.append(f"{queue:<10} {self.admitted[queue]:>9} {self.rejected[queue]:>9} {values}")
+        if self.governor_decision is not None:
+            lines.append(
+                f"governor ticks={self.governor_ticks} mean_scale={self.mean_scale:.2f} "
+                f"last={self.governor_decision.concurrency_scale:.2f}"
+            )
+        return "\n".join(lines)
+
+
+@dataclass
+class _BacklogStats:
+    samples: int = 0
+    total: float = 0.0
+    peak: float = 0.0
+    last: float = 0.0
+
+    def record(self, value: float) -> None:
+        self.last = value
+        self.samples += 1
+        self.total += value
+        self.peak = max(self.peak, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.samples if self.samples else 0.0
+
+
+@dataclass
+class _QueueState:
+    quota: Quota
+    service: ServiceTime
+    base_servers: int
+    tokens: float
+    servers: List[float] = field(default_factory=list)  # instante en que queda libre cada servidor
+    completions: List[float] = field(default_factory=list)
+    latencies: "array[float]" = field(default_factory=lambda: array("d"))
+    admitted: int = 0
+    rejected: int = 0
+    last_refill: float = 0.0
+    work: float = 0.0
+
+
+def run_event_simulation(
+    *,
+    qps: float,
+    duration: float,
+    mix: Mapping[str, int],
+    quotas: Mapping[str, Quota] | None = None,
+    service: Mapping[str, ServiceTime] | None = None,
+    servers: Mapping[str, int] | None = None,
+    burst_factor: float = 1.0,
+    mean_burst: float = 10.0,
+    mean_calm: float = 50.0,
+    governor: GpuGovernor | None = None,
+    tick: float = 1.0,
+    seed: int = 0,
+) -> EventSimulationResult:
+    """Simula ``duration`` segundos de tráfico con un motor de eventos discretos.
+
+    Cada cola es un sistema multi-servidor FIFO: una petición admitida (token
+    bucket y ``max_inflight`` como en :class:`AdmissionController`) empieza
+    cuando queda libre el primer servidor y libera su inflight al terminar.
+    Con ``governor``, cada ``tick`` segundos se le pasan las métricas del
+    intervalo y ``concurrency_scale`` reescala los servidores de cada cola.
+    """
+
+    if qps <= 0:
+        raise ValueError("qps must be greater than zero")
+    if duration <= 0:
+        raise ValueError("duration must be greater than zero")
+    rng = np.random.default_rng(seed)
+    process = ArrivalProcess(qps, burst_factor, mean_burst, mean_calm)
+    names = list(mix)
+    weights = np.array([mix[name] for name in names], dtype=float)
+    probabilities = weights / weights.sum()
+
+    def chunks() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for times in process.times(duration, rng):
+            yield times, rng.choice(len(names), size=len(times), p=probabilities)
+
+    return _simulate_events(
+        chunks(),
+        names,
+        duration=duration,
+        quotas=quotas,
+        service=service,
+        servers=servers,
+        governor=governor,
+        tick=tick,
+        rng=rng,
+    )
+
+
+def _simulate_events(
+    chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+    names: Sequence[str],
+    *,
+    duration: float,
+    quotas: Mapping[str, Quota] | None,
+    service: Mapping[str, ServiceTime] | None,
+    servers: Mapping[str, int] | None,
+    governor: GpuGovernor | None,
+    tick: float,
+    rng: np.random.Generator,
+) -> EventSimulationResult:
+    if tick <= 0:
+        raise ValueError("tick must be greater than zero")
+    quotas = quotas or default_quotas()
+    service = service or {}
+    servers = servers or {}
+    states: List[_QueueState] = []
+    for name in names:
+        if name not in quotas:
+            raise ValueError(f"No quota configured for queue '{name}'")
+        count = int(servers.get(name, 8))
+        if count <= 0:
+            raise ValueError("Server count must be positive")
+        quota = quotas[name]
+        states.append(
+            _QueueState(quota, service.get(name, ServiceTime()), count, float(quota.burst), [0.0] * count)
+        )
+
+    temperature = 58.0
+    ticks = 0
+    scale_total = 0.0
+    decision: GovernorDecision | None = None
+    backlog = _BacklogStats()
+    next_tick = tick
+    heappush, heappop, heapreplace = heapq.heappush, heapq.heappop, heapq.heapreplace
+    total = 0
+    started = perf_counter()
+
+    def on_tick(now: float) -> None:
+        nonlocal temperature, ticks, scale_total, decision
+        capacity = sum(state.base_servers for state in states) * tick
+        utilisation = min(1.0, sum(state.work for state in states) / capacity)
+        waiting = 0
+        for state in states:
+            done = state.completions
+            while done and done[0] <= now:
+                heappop(done)
+            waiting += max(0, len(done) - len(state.servers))
+            state.work = 0.0
+        backlog.record(waiting)
+        if governor is None:
+            return
+        temperature += (55.0 + 25.0 * utilisation - temperature) * min(1.0, tick / 30.0)
+        metrics = GpuMetrics(
+            utilisation=utilisation,
+            memory_utilisation=0.5 + 0.4 * utilisation,
+            temperature=temperature,
+            backlog=float(waiting),
+            backlog_target=float(sum(state.base_servers for state in states)),
+            concurrency=float(sum(len(state.servers) for state in states)),
+            micro_batch=4,
+            max_new_tokens=1024,
+        )
+        decision = governor.update(metrics, now=now)
+        ticks += 1
+        scale_total += decision.concurrency_scale
+        for state in states:
+            target = max(1, round(state.base_servers * decision.concurrency_scale))
+            pool = state.servers
+            if target > len(pool):
+                pool.extend([now] * (target - len(pool)))
+            elif target < len(pool):
+                # Se retiran los servidores que más tardan en quedar libres.
+                pool.sort()
+                del pool[target:]
+            heapq.heapify(pool)
+
+    # Estado caliente en listas paralelas: el bucle por petición evita
+    # accesos a atributos.
+    rates = [state.quota.rate for state in states]
+    bursts = [float(state.quota.burst) for state in states]
+    limits = [state.quota.max_inflight for state in states]
+    tokens = [state.tokens for state in states]
+    refilled = [0.0] * len(states)
+    pools = [state.servers for state in states]
+    completions = [state.completions for state in states]
+    work = [0.0] * len(states)
+    rejected = [0] * len(states)
+    for times, queue_ids in chunks:
+        service_times = np.empty(len(times))
+        masks = [queue_ids == index for index in range(len(states))]
+        for state, mask in zip(states, masks):
+            hits = int(mask.sum())
+            if hits:
+                service_times[mask] = state.service.sample(rng, hits)
+        total += len(times)
+        finishes = [math.nan] * len(times)
+        position = -1
+        for now, index, cost in zip(times.tolist(), queue_ids.tolist(), service_times.tolist()):
+            position += 1
+            while now >= next_tick:
+                for state, spent in zip(states, work):
+                    state.work = spent
+                on_tick(next_tick)
+                work = [0.0] * len(states)
+                next_tick += tick
+            done = completions[index]
+            while done and done[0] <= now:
+                heappop(done)
+            available = tokens[index] + (now - refilled[index]) * rates[index]
+            if available > bursts[index]:
+                available = bursts[index]
+            refilled[index] = now
+            if available < 1.0 or len(done) >= limits[index]:
+                tokens[index] = available
+                rejected[index] += 1
+                continue
+            tokens[index] = available - 1.0
+            pool = pools[index]
+            free_at = pool[0]
+            finish = (free_at if free_at > now else now) + cost
+            heapreplace(pool, finish)
+            heappush(done, finish)
+            finishes[position] = finish
+            work[index] += cost
+        latencies = np.array(finishes) - times
+        for state, mask in zip(states, masks):
+            served = latencies[mask]
+            served = served[~np.isnan(served)]
+            state.admitted += len(served)
+            state.latencies.frombytes(served.tobytes())
+    for state, spent, dropped in zip(states, work, rejected):
+        state.work = spent
+        state.rejected = dropped
+    while next_tick <= duration:
+        on_tick(next_tick)
+        next_tick += tick
+
+    latency: Dict[str, Dict[float, float]] = {}
+    for name, state in zip(names, states):
+        samples = np.frombuffer(state.latencies, dtype=float) if state.latencies else None
+        latency[name] = (
+            dict(zip(_PERCENTILES, np.percentile(samples, _PERCENTILES).tolist())) if samples is not None else {}
+        )
+    return EventSimulationResult(
+        admitted={name: state.admitted for name, state in zip(names, states)},
+        rejected={name: state.rejected for name, state in zip(names, states)},
+        total_requests=total,
+        duration_seconds=duration,
+        latency=latency,
+        governor_ticks=ticks,
+        governor_decision=decision,
+        wall_seconds=perf_counter() - started,
+        mean_scale=scale_total / ticks if ticks else 1.0,
+        backlog_mean=backlog.mean,
+        backlog_peak=backlog.peak,
+    )
+
+
+# -- reproducción de trazas -------------------------------------------------
+
+_OPENERS: Mapping[str, Callable[..., IO[str]]] = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+class TraceRequest(NamedTuple):
+    """Una llegada de la traza; ``service_time`` es opcional."""
+
+    timestamp: float
+    queue: str
+    tenant: str = "default"
+    service_time: float | None = None
+    priority: int = 0
+
+
+def iter_trace(path: str | Path, *, tenant: str = "default") -> Iterator[TraceRequest]:
+    """Lee una traza línea a línea sin cargarla entera en memoria.
+
+    El formato se deduce de la extensión (``.jsonl``/``.ndjson`` o ``.csv``,
+    con ``.gz``, ``.bz2`` o ``.xz`` opcional). Cada registro necesita
+    ``timestamp`` (segundos epoch o ISO 8601) y ``queue``; ``tenant``,
+    ``service_time`` y ``priority`` son opcionales.
+    """
+
+    path = Path(path)
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    opener = _OPENERS.get(suffixes[-1] if suffixes else "")
+    kind = suffixes[-2] if opener and len(suffixes) > 1 else (suffixes[-1] if suffixes else "")
+    if kind not in (".jsonl", ".ndjson", ".csv"):
+        raise ValueError(f"Unsupported trace format '{path.name}'")
+    with (opener or open)(path, "rt", encoding="utf-8", newline="") as fh:
+        records: Iterable[Mapping[str, object]]
+        if kind == ".csv":
+            records = csv.DictReader(fh)
+        else:
+            records = (json.loads(line) for line in fh if line.strip())
+        for number, record in enumerate(records, 1):
+            try:
+                yield _trace_request(record, tenant)
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"{path.name}:{number}: invalid trace record") from exc
+
+
+def _trace_request(record: Mapping[str, object], tenant: str) -> TraceRequest:
+    raw_time = record["timestamp"]
+    try:
+        timestamp = float(raw_time)  # type: ignore[arg-type]
+    except ValueError:
+        timestamp = datetime.fromisoformat(str(raw_time)).timestamp()
+    service = record.get("service_time")
+    priority = record.get("priority")
+    return TraceRequest(
+        timestamp=timestamp,
+        queue=str(record["queue"]),
+        tenant=str(record.get("tenant") or tenant),
+        service_time=float(service) if service not in (None, "") else None,  # type: ignore[arg-type]
+        priority=int(priority) if priority not in (None, "") else 0,  # type: ignore[call-overload]
+    )
+
+
+def parse_speed(raw: str) -> float | None:
+    """``max`` (o ``0``) reproduce sin pausas; ``10`` o ``10x`` acelera diez veces."""
+
+    value = raw.strip().lower()
+    if value in ("max", "0", ""):
+        return None
+    speed = float(value.removesuffix("x"))
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    return speed
+
+
+_COMPLETION = 0
+_TICK = 1
+
+
+def replay_trace(
+    requests: Iterable[TraceRequest],
+    *,
+    controller: AdmissionController,
+    manager: QueueManager,
+    governor: GpuGovernor | None = None,
+    servers: int = 8,
+    service: Mapping[str, ServiceTime] | None = None,
+    speed: float | None = None,
+    tick: float = 1.0,
+    seed: int = 0,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> EventSimulationResult:
+    """Reproduce una traza contra el controlador, las colas y el governor reales.
+
+    Las llegadas se consumen en streaming y en orden. Cada petición admitida
+    se encola en ``manager``; un pool de ``servers`` servidores la desencola
+    con ``dequeue_next`` (pesos de ``QueueManager``) y, al terminar su
+    servicio, se llama a ``controller.release``. El reloj simulado se ancla a
+    ``monotonic()`` para que los token buckets recarguen de forma coherente.
+    ``speed=None`` reproduce tan rápido como sea posible; si no, cada evento
+    espera a ``t / speed`` segundos de reloj real desde el inicio.
+    """
+
+    if servers <= 0:
+        raise ValueError("servers must be positive")
+    if tick <= 0:
+        raise ValueError("tick must be greater than zero")
+    rng = np.random.default_rng(seed)
+    service = service or {}
+    default_service = ServiceTime()
+    origin = time.monotonic()
+    wall_start = clock()
+    started = perf_counter()
+    events: List[Tuple[float, int, int, object]] = []
+    sequence = itertools.count()
+    admitted: Dict[str, int] = defaultdict(int)
+    rejected: Dict[str, int] = defaultdict(int)
+    latencies: Dict[str, "array[float]"] = defaultdict(lambda: array("d"))
+    unknown: set[Tuple[str, str]] = set()
+    state = {"free": servers, "pool": servers, "work": 0.0, "temperature": 58.0}
+    ticks = 0
+    scale_total = 0.0
+    decision: GovernorDecision | None = None
+    backlog = _BacklogStats()
+    first: float | None = None
+    last_offset = 0.0
+    total = 0
+
+    def pace(offset: float) -> None:
+        if speed is not None:
+            delay = wall_start + offset / speed - clock()
+            if delay > 0:
+                sleep(delay)
+
+    def dispatch(offset: float) -> None:
+        while state["free"] > 0:
+            item = manager.dequeue_next(now=origin + offset)
+            if item is None:
+                return
+            queue, (arrival, tenant, cost) = item
+            state["free"] -= 1
+            state["work"] += cost
+            heapq.heappush(events, (offset + cost, _COMPLETION, next(sequence), (queue, tenant, arrival)))
+
+    def on_tick(offset: float) -> None:
+        nonlocal ticks, scale_total, decision
+        backlog.record(manager.total_backlog())
+        if governor is None:
+            return
+        utilisation = min(1.0, state["work"] / (servers * tick))
+        state["work"] = 0.0
+        state["temperature"] += (55.0 + 25.0 * utilisation - state["temperature"]) * min(1.0, tick / 30.0)
+        decision = governor.update(
+            GpuMetrics(
+                utilisation=utilisation,
+                memory_utilisation=0.5 + 0.4 * utilisation,
+                temperature=state["temperature"],
+                backlog=float(backlog.last),
+                backlog_target=float(servers),
+                concurrency=float(state["pool"]),
+                micro_batch=4,
+                max_new_tokens=1024,
+            ),
+            now=origin + offset,
+        )
+        ticks += 1
+        scale_total += decision.concurrency_scale
+        target = max(1, round(servers * decision.concurrency_scale))
+        state["free"] += target - state["pool"]
+        state["pool"] = target
+        dispatch(offset)
+
+    def advance(until: float) -> None:
+        while events and events[0][0] <= until:
+            offset, kind, _, payload = heapq.heappop(events)
+            pace(offset)
+            if kind == _TICK:
+                on_tick(offset)
+                heapq.heappush(events, (offset + tick, _TICK, next(sequence), None))
+                continue
+            queue, tenant, arrival = payload  # type: ignore[misc]
+            controller.release(tenant, queue)
+            latencies[queue].append(offset - arrival)
+            state["free"] += 1
+            dispatch(offset)
+
+    for request in requests:
+        if first is None:
+            first = request.timestamp
+            heapq.heappush(events, (tick, _TICK, next(sequence), None))
+        # Las trazas desordenadas se reproducen con el reloj sin retroceder.
+        offset = max(last_offset, request.timestamp - first)
+        last_offset = offset
+        advance(offset)
+        pace(offset)
+        total += 1
+        now = origin + offset
+        try:
+            allowed = controller.allow(request.tenant, request.queue, now=now).allowed
+        except KeyError:
+            allowed = False
+            if (request.tenant, request.queue) not in unknown:
+                unknown.add((request.tenant, request.queue))
+                logger.warning("Traza con cola desconocida %s/%s", request.tenant, request.queue)
+        if not allowed:
+            rejected[request.queue] += 1
+            continue
+        cost = request.service_time
+        if cost is None:
+            spec = service.get(request.queue, default_service)
+            cost = float(spec.sample(rng, 1)[0])
+        try:
+            manager.enqueue(request.queue, (offset, request.tenant, cost), now=now, priority=request.priority)
+        except KeyError:
+            controller.release(request.tenant, request.queue)
+            rejected[request.queue] += 1
+            continue
+        admitted[request.queue] += 1
+        dispatch(offset)
+    # Se drenan las colas: los ticks siguen mientras quede trabajo en curso.
+    while events:
+        if all(kind == _TICK for _, kind, _, _ in events) and not manager.total_backlog():
+            break
+        advance(events[0][0])
+
+    for queue in admitted:
+        rejected.setdefault(queue, 0)
+    for queue in rejected:
+        admitted.setdefault(queue, 0)
+    latency = {
+        queue: dict(zip(_PERCENTILES, np.percentile(np.frombuffer(latencies[queue]), _PERCENTILES).tolist()))
+        if latencies.get(queue)
+        else {}
+        for queue in admitted
+    }
+    return EventSimulationResult(
+        admitted=dict(admitted),
+        rejected=dict(rejected),
+        total_requests=total,
+        duration_seconds=last_offset,
+        latency=latency,
+        governor_ticks=ticks,
+        governor_decision=decision,
+        wall_seconds=perf_counter() - started,
+        mean_scale=scale_total / ticks if ticks else 1.0,
+        backlog_mean=backlog.mean,
+        backlog_peak=backlog.peak,
+    )
+
+
+# -- barridos de parámetros -------------------------------------------------
+
+_SWEEP_COLUMNS = (
+    "scenario",
+    "seed",
+    "qps",
+    "mix",
+    "quota_scale",
+    "target_util",
+    "queue",
+    "offered",
+    "admitted",
+    "rejected",
+    "rejection_rate",
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "latency_p99_ms",
+    "backlog_mean",
+    "backlog_peak",
+    "mean_scale",
+)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Un punto de la rejilla; es picklable para enviarlo a otro proceso."""
+
+    qps: float
+    mix: str
+    quota_scale: float = 1.0
+    target_util: float | None = None
+    duration: float = 60.0
+    service: str = ""
+    servers: str = ""
+    burst_factor: float = 1.0
+    base_seed: int = 0
+
+    @property
+    def seed(self) -> int:
+        """Semilla derivada de los parámetros: no depende del orden ni del proceso."""
+
+        key = repr((self.qps, self.mix, self.quota_scale, self.target_util, self.duration, self.burst_factor))
+        return int(np.random.SeedSequence([self.base_seed, zlib.crc32(key.encode())]).generate_state(1)[0])
+
+    @property
+    def label(self) -> str:
+        target = "-" if self.target_util is None else format(self.target_util, "g")
+        return f"qps={self.qps:g} mix={self.mix} quota={self.quota_scale:g} target={target}"
+
+
+def build_scenarios(
+    *,
+    qps: Sequence[float],
+    mixes: Sequence[str],
+    quota_scales: Sequence[float] = (1.0,),
+    target_utils: Sequence[float | None] = (None,),
+    duration: float = 60.0,
+    service: str = "",
+    servers: str = "",
+    burst_factor: float = 1.0,
+    seed: int = 0,
+) -> List[Scenario]:
+    return [
+        Scenario(rate, mix, scale, target, duration, service, servers, burst_factor, seed)
+        for mix, scale, target, rate in itertools.product(mixes, quota_scales, target_utils, qps)
+    ]
+
+
+def scaled_quotas(scale: float) -> Dict[str, Quota]:
+    if scale <= 0:
+        raise ValueError("quota scale must be positive")
+    return {
+        queue: Quota(
+            rate=quota.rate * scale,
+            burst=max(1, round(quota.burst * scale)),
+            max_inflight=max(1, round(quota.max_inflight * scale)),
+        )
+        for queue, quota in default_quotas().items()
+    }
+
+
+def run_scenario(scenario: Scenario) -> List[Dict[str, object]]:
+    """Ejecuta un escenario y devuelve sus filas: una por cola y una ``all``."""
+
+    mix = parse_mix(scenario.mix)
+    quotas = scaled_quotas(scenario.quota_scale)
+    governor = None
+    if scenario.target_util is not None:
+        governor = GpuGovernor(GovernorConfig(target_util=scenario.target_util))
+    result = run_event_simulation(
+        qps=scenario.qps,
+        duration=scenario.duration,
+        mix=mix,
+        quotas=quotas,
+        service=parse_service(scenario.service) if scenario.service else None,
+        servers=parse_servers(scenario.servers) if scenario.servers else None,
+        burst_factor=scenario.burst_factor,
+        governor=governor,
+        seed=scenario.seed,
+    )
+    base = {
+        "scenario": scenario.label,
+        "seed": scenario.seed,
+        "qps": scenario.qps,
+        "mix": scenario.mix,
+        "quota_scale": scenario.quota_scale,
+        "target_util": scenario.target_util,
+        "backlog_mean": result.backlog_mean,
+        "backlog_peak": result.backlog_peak,
+        "mean_scale": result.mean_scale,
+    }
+    rows: List[Dict[str, object]] = []
+    for queue in [*result.admitted, "all"]:
+        if queue == "all":
+            admitted, rejected = sum(result.admitted.values()), sum(result.rejected.values())
+            latency: Mapping[float, float] = {}
+        else:
+            admitted, rejected = result.admitted[queue], result.rejected[queue]
+            latency = result.latency[queue]
+        offered = admitted + rejected
+        row: Dict[str, object] = {
+            **base,
+            "queue": queue,
+            "offered": offered,
+            "admitted": admitted,
+            "rejected": rejected,
+            "rejection_rate": rejected / offered if offered else 0.0,
+        }
+        for percentile in _PERCENTILES:
+            row[f"latency_p{percentile:g}_ms"] = latency.get(percentile, math.nan) * 1000
+        rows.append(row)
+    return rows
+
+
+def run_sweep(scenarios: Sequence[Scenario], *, workers: int | None = None) -> List[Dict[str, object]]:
+    """Ejecuta los escenarios en paralelo; las filas salen en el orden de entrada."""
+
+    if workers == 1 or len(scenarios) <= 1:
+        batches = [run_scenario(scenario) for scenario in scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(run_scenario, scenarios))
+    return [row for batch in batches for row in batch]
+
+
+def write_table(rows: Sequence[Mapping[str, object]], path: str | Path) -> Path:
+    """Escribe la tabla en Parquet (requiere ``pyarrow``) o CSV según la extensión."""
+
+    path = Path(path)
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Writing Parquet requires pyarrow; use a .csv output instead") from exc
+        pq.write_table(pa.Table.from_pylist([dict(row) for row in rows]), path)
+        return path
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=_SWEEP_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def _float_list(raw: str) -> List[float]:
+    return [float(value) for value in raw.split(",") if value.strip()]
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Simula carga sintética para rutas FERIA")
-    parser.add_argument("--qps", type=int, default=10)
+    parser.add_argument("--qps", type=float, default=10)
     parser.add_argument("--mix", type=str, default="fast=80,batch=20")
     parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--requests", type=int, default=None, help="fija la duración a requests/qps")
     parser.add_argument("--tenant", type=str, default="default")
+    parser.add_argument(
+        "--service",
+        type=str,
+        default="fast=exp:0.05,batch=lognormal:0.5:0.8,eval=const:2.0",
+        help="distribución de servicio por cola: exp:media, const:valor o lognormal:media:sigma",
+    )
+    parser.add_argument("--servers", type=str, default="fast=8,batch=4,eval=2", help="servidores por cola")
+    parser.add_argument("--burst-factor", type=float, default=1.0, help=">1 activa llegadas a ráfagas")
+    parser.add_argument("--tick", type=float, default=1.0, help="periodo del governor en segundos")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace", type=Path, default=None, help="traza JSONL o CSV (gz/bz2/xz) a reproducir")
+    parser.add_argument(
+        "--speed",
+        type=parse_speed,
+        default=None,
+        help="velocidad de reproducción de la traza: 1, 10x... o max (por defecto)",
+    )
+    parser.add_argument("--pool", type=int, default=8, help="servidores compartidos al reproducir una traza")
+    parser.add_argument("--sweep", action="store_true", help="barre una rejilla de escenarios en paralelo")
+    parser.add_argument("--sweep-qps", type=_float_list, default=None, help="lista de qps, p.ej. 50,100,200")
+    parser.add_argument("--sweep-mix", type=str, default=None, help="mezclas separadas por ';'")
+    parser.add_argument("--sweep-quota-scale", type=_float_list, default=[1.0], help="multiplicadores de cuota")
+    parser.add_argument(
+        "--sweep-target-util",
+        type=_float_list,
+        default=None,
+        help="utilizaciones objetivo del governor (sin governor si se omite)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="procesos del barrido")
+    parser.add_argument("--output", type=Path, default=Path("sweep.csv"), help="tabla del barrido (.csv o .parquet)")
+    parser.add_argument(
+        "--fixed-step",
+        action="store_true",
+        help="usa el bucle antiguo de paso fijo en lugar del simulador de eventos",
+    )
     parser.add_argument(
         "--sleep",
         action="store_true",
-        help="realiza pausas reales para emular el reloj",
+        help="realiza pausas reales para emular el reloj (sólo con --fixed-step)",
     )
     parser.add_argument(
         "--with-governor",
         action="store_true",
-        help="calcula la decisión del GPU governor tras la simulación",
+        help="ejecuta el GPU governor durante (o tras) la simulación",
     )
     parser.add_argument(
         "--target-util",
@@ -188,19 +1080,79 @@ def main() -> None:
 
     setup_logging()
     mix = parse_mix(args.mix)
-    controller = create_default_controller()
-    manager = QueueManager(list(mix.keys()))
+    duration = args.requests / args.qps if args.requests else args.duration
     logger.debug(
         "Iniciando simulación: qps=%s duration=%s mix=%s tenant=%s",
         args.qps,
-        args.duration,
+        duration,
         args.mix,
         args.tenant,
     )
+    if args.sweep:
+        target_utils: List[float | None] = list(args.sweep_target_util or [])
+        if not target_utils:
+            target_utils = [args.target_util if args.with_governor else None]
+        scenarios = build_scenarios(
+            qps=args.sweep_qps or [args.qps],
+            mixes=[spec for spec in (args.sweep_mix or args.mix).split(";") if spec.strip()],
+            quota_scales=args.sweep_quota_scale,
+            target_utils=target_utils,
+            duration=duration,
+            service=args.service,
+            servers=args.servers,
+            burst_factor=args.burst_factor,
+            seed=args.seed,
+        )
+        started = perf_counter()
+        rows = run_sweep(scenarios, workers=args.workers)
+        path = write_table(rows, args.output)
+        logger.info("Barrido de %s escenarios en %.2fs -> %s", len(scenarios), perf_counter() - started, path)
+        print(f"{'scenario':<56} {'offered':>9} {'rejected':>9} {'backlog':>8}")
+        for row in rows:
+            if row["queue"] == "all":
+                print(
+                    f"{row['scenario']:<56} {row['offered']:>9} "
+                    f"{row['rejection_rate']:>9.1%} {row['backlog_mean']:>8.1f}"
+                )
+        return
     governor = GpuGovernor(GovernorConfig(target_util=args.target_util)) if args.with_governor else None
+    if args.trace:
+        queues = list(dict.fromkeys([*DEFAULT_QUOTAS, *mix]))
+        replay_result = replay_trace(
+            iter_trace(args.trace, tenant=args.tenant),
+            controller=create_default_controller(),
+            manager=QueueManager(queues, weights=mix),
+            governor=governor,
+            servers=args.pool,
+            service=parse_service(args.service),
+            speed=args.speed,
+            tick=args.tick,
+            seed=args.seed,
+        )
+        logger.info("Traza reproducida en %.2fs", replay_result.wall_seconds)
+        print(replay_result.summary())
+        return
+    if not args.fixed_step:
+        event_result = run_event_simulation(
+            qps=args.qps,
+            duration=duration,
+            mix=mix,
+            service=parse_service(args.service),
+            servers=parse_servers(args.servers),
+            burst_factor=args.burst_factor,
+            governor=governor,
+            tick=args.tick,
+            seed=args.seed,
+        )
+        logger.info("Simulación de eventos completada en %.2fs", event_result.wall_seconds)
+        print(event_result.summary())
+        return
+
+    controller = create_default_controller()
+    manager = QueueManager(list(mix.keys()))
     result = run_simulation(
         qps=args.qps,
-        duration=args.duration,
+        duration=duration,
         mix=mix,
         controller=controller,
         manager=manager,
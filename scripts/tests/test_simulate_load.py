@@ -8,6 +8,7 @@ from orchestrator import (
     GpuMetrics,
     GovernorConfig,
     QueueManager,
+    Quota,
 )
 from scripts import simulate_load
 
@@ -66,6 +67,20 @@ def test_run_simulation_respects_qps() -> None:
     assert result.enqueued["fast"] <= result.total_requests
 
 
+def test_run_simulation_accepts_fractional_qps() -> None:
+    controller = AdmissionController.from_dict(
+        [{"tenant": "default", "fast": {"rate": 10, "burst": 10, "max_inflight": 1}}]
+    )
+    result = simulate_load.run_simulation(
+        qps=2.5,
+        duration=2.0,
+        mix={"fast": 1},
+        controller=controller,
+        manager=QueueManager(["fast"]),
+    )
+    assert result.total_requests == 5
+
+
 def test_run_simulation_with_governor_uses_metrics_factory() -> None:
     controller = AdmissionController.from_dict(
         [
@@ -103,3 +118,264 @@ def test_run_simulation_with_governor_uses_metrics_factory() -> None:
         metrics_factory=factory,
     )
     assert result.governor_decision is not None
+
+
+def test_parse_service() -> None:
+    services = simulate_load.parse_service(
+        "fast=exp:0.05,batch=lognormal:0.4:0.8,eval=const:2"
+    )
+    assert services["fast"] == simulate_load.ServiceTime("exp", 0.05)
+    assert services["batch"] == simulate_load.ServiceTime("lognormal", 0.4, 0.8)
+    assert services["eval"].kind == "const"
+    with pytest.raises(ValueError):
+        simulate_load.parse_service("fast=gamma:1")
+
+
+def test_bursty_arrivals_keep_mean_rate() -> None:
+    import numpy as np
+
+    process = simulate_load.ArrivalProcess(
+        qps=20, burst_factor=5.0, mean_burst=5.0, mean_calm=20.0
+    )
+    calm, burst = process.rates()
+    assert burst == pytest.approx(5 * calm)
+    chunks = list(process.times(50_000.0, np.random.default_rng(0)))
+    times = np.concatenate(chunks)
+    assert np.all(np.diff(times) >= 0)
+    assert len(times) / 50_000.0 == pytest.approx(20, rel=0.05)
+
+
+def test_event_simulation_reports_latency_percentiles() -> None:
+    kwargs = dict(
+        qps=200,
+        duration=50.0,
+        mix={"fast": 3, "batch": 1},
+        quotas={"fast": Quota(1000, 1000, 1000), "batch": Quota(1000, 1000, 100_000)},
+        service={
+            "fast": simulate_load.ServiceTime("const", 0.01),
+            "batch": simulate_load.ServiceTime("exp", 0.5),
+        },
+        servers={"fast": 4, "batch": 2},
+        seed=3,
+    )
+    result = simulate_load.run_event_simulation(**kwargs)
+    assert result.latency == simulate_load.run_event_simulation(**kwargs).latency
+    assert sum(result.rejected.values()) == 0
+    assert result.total_requests == sum(result.admitted.values())
+    # Constant 10ms service with spare servers: latency is the service time.
+    assert result.latency["fast"][50.0] == pytest.approx(0.01)
+    # The batch queue is overloaded (50 qps against 4 req/s of capacity).
+    assert result.latency["batch"][99.0] > result.latency["batch"][50.0] > 1.0
+    assert "p99" in result.summary()
+
+
+def test_event_simulation_enforces_quotas() -> None:
+    result = simulate_load.run_event_simulation(
+        qps=100,
+        duration=10.0,
+        mix={"fast": 1},
+        quotas={"fast": Quota(rate=10, burst=10, max_inflight=1000)},
+        service={"fast": simulate_load.ServiceTime("const", 0.001)},
+    )
+    assert result.admitted["fast"] <= 10 + 10 * 10
+    assert result.rejected["fast"] > 0
+
+
+def test_event_simulation_ticks_governor() -> None:
+    governor = GpuGovernor(GovernorConfig(target_util=0.5))
+    result = simulate_load.run_event_simulation(
+        qps=500,
+        duration=20.0,
+        mix={"fast": 1},
+        quotas={"fast": Quota(rate=1000, burst=1000, max_inflight=10_000)},
+        service={"fast": simulate_load.ServiceTime("exp", 0.05)},
+        servers={"fast": 8},
+        governor=governor,
+        tick=0.5,
+    )
+    assert result.governor_ticks == 40
+    assert result.governor_decision is not None
+    # Saturated above target: the governor scales concurrency down.
+    assert result.mean_scale < 1.0
+
+
+def _write_trace(path, rows) -> None:
+    import csv
+    import gzip
+    import json
+
+    if path.suffixes[-2:] == [".csv", ".gz"]:
+        with gzip.open(path, "wt", newline="") as fh:
+            writer = csv.DictWriter(
+                fh, fieldnames=["timestamp", "queue", "tenant", "service_time"]
+            )
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        path.write_text(
+            "".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8"
+        )
+
+
+def test_iter_trace_streams_jsonl_and_compressed_csv(tmp_path) -> None:
+    rows = [
+        {"timestamp": 100.0, "queue": "fast", "tenant": "default", "service_time": 0.5},
+        {"timestamp": 100.5, "queue": "batch", "tenant": "", "service_time": ""},
+    ]
+    jsonl = tmp_path / "trace.jsonl"
+    _write_trace(jsonl, rows)
+    compressed = tmp_path / "trace.csv.gz"
+    _write_trace(compressed, rows)
+
+    expected = [
+        simulate_load.TraceRequest(100.0, "fast", "default", 0.5),
+        simulate_load.TraceRequest(100.5, "batch", "default", None),
+    ]
+    assert list(simulate_load.iter_trace(jsonl)) == expected
+    assert list(simulate_load.iter_trace(compressed)) == expected
+    iso = tmp_path / "iso.jsonl"
+    _write_trace(iso, [{"timestamp": "2026-01-01T00:00:00+00:00", "queue": "fast"}])
+    assert next(simulate_load.iter_trace(iso)).timestamp == 1767225600.0
+    with pytest.raises(ValueError):
+        list(simulate_load.iter_trace(tmp_path / "trace.parquet"))
+
+
+def test_parse_speed() -> None:
+    assert simulate_load.parse_speed("max") is None
+    assert simulate_load.parse_speed("10x") == 10.0
+    assert simulate_load.parse_speed("1") == 1.0
+    with pytest.raises(ValueError):
+        simulate_load.parse_speed("-2")
+
+
+def _replay_controller() -> AdmissionController:
+    return AdmissionController.from_dict(
+        [
+            {
+                "tenant": "default",
+                "fast": {"rate": 1000, "burst": 1000, "max_inflight": 2},
+                "batch": {"rate": 1000, "burst": 1000, "max_inflight": 100},
+            }
+        ]
+    )
+
+
+def test_replay_trace_goes_through_admission_and_queues() -> None:
+    controller = _replay_controller()
+    manager = QueueManager(["fast", "batch"])
+    trace = [
+        simulate_load.TraceRequest(10.0 + index * 0.1, "fast", service_time=1.0)
+        for index in range(4)
+    ]
+    trace.append(simulate_load.TraceRequest(12.0, "fast", service_time=1.0))
+    trace.append(simulate_load.TraceRequest(12.0, "unknown"))
+
+    result = simulate_load.replay_trace(
+        trace, controller=controller, manager=manager, servers=1
+    )
+    # max_inflight=2: two of the first four are rejected while in flight.
+    assert result.admitted["fast"] == 3
+    assert result.rejected == {"fast": 2, "unknown": 1}
+    assert result.total_requests == 6
+    # One server: the second job waits for the first, finishing 1.9s after arrival.
+    assert result.latency["fast"][50.0] == pytest.approx(1.0)
+    assert result.latency["fast"][99.0] > 1.8
+    assert manager.total_backlog() == 0
+    assert controller.snapshot()["default"]["fast"]["inflight"] == 0
+
+
+def test_replay_trace_paces_with_speed_factor() -> None:
+    waits = []
+    clock_now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        waits.append(seconds)
+        clock_now[0] += seconds
+
+    trace = [
+        simulate_load.TraceRequest(float(second), "batch", service_time=0.5)
+        for second in range(0, 20, 5)
+    ]
+    simulate_load.replay_trace(
+        trace,
+        controller=_replay_controller(),
+        manager=QueueManager(["fast", "batch"]),
+        speed=10.0,
+        sleep=sleep,
+        clock=lambda: clock_now[0],
+    )
+    # 15.5s of trace time replayed at 10x.
+    assert clock_now[0] == pytest.approx(1.55)
+
+
+def test_replay_trace_ticks_governor() -> None:
+    governor = GpuGovernor(GovernorConfig(target_util=0.5))
+    trace = [
+        simulate_load.TraceRequest(index * 0.05, "batch", service_time=0.4)
+        for index in range(200)
+    ]
+    result = simulate_load.replay_trace(
+        trace,
+        controller=_replay_controller(),
+        manager=QueueManager(["fast", "batch"]),
+        governor=governor,
+        servers=4,
+        tick=1.0,
+    )
+    assert result.governor_ticks >= 10
+    assert result.governor_decision is not None
+    assert result.admitted["batch"] == 200
+
+
+def test_build_scenarios_uses_stable_seeds() -> None:
+    scenarios = simulate_load.build_scenarios(
+        qps=[10, 20],
+        mixes=["fast=1", "fast=1,batch=1"],
+        target_utils=[None, 0.8],
+        duration=5.0,
+    )
+    assert len(scenarios) == 8
+    assert len({scenario.seed for scenario in scenarios}) == 8
+    again = simulate_load.build_scenarios(
+        qps=[20], mixes=["fast=1"], target_utils=[0.8], duration=5.0
+    )
+    assert again[0].seed in {scenario.seed for scenario in scenarios}
+
+
+def test_run_sweep_is_deterministic_across_processes(tmp_path) -> None:
+    import csv
+
+    scenarios = simulate_load.build_scenarios(
+        qps=[20, 80], mixes=["fast=80,batch=20"], quota_scales=[0.5, 1.0], duration=20.0
+    )
+    serial = simulate_load.run_sweep(scenarios, workers=1)
+    pooled = simulate_load.run_sweep(scenarios, workers=2)
+    assert [row["rejected"] for row in serial] == [row["rejected"] for row in pooled]
+    assert len(serial) == 4 * 3
+    totals = [row for row in serial if row["queue"] == "all"]
+    assert all(row["offered"] == row["admitted"] + row["rejected"] for row in totals)
+    # Rows follow scenario order: quota 0.5 then 1.0, each at qps 20 then 80.
+    assert [(row["quota_scale"], row["qps"]) for row in totals] == [
+        (0.5, 20),
+        (0.5, 80),
+        (1.0, 20),
+        (1.0, 80),
+    ]
+    assert totals[1]["rejection_rate"] >= totals[3]["rejection_rate"]
+
+    path = simulate_load.write_table(serial, tmp_path / "sweep.csv")
+    with path.open(encoding="utf-8") as fh:
+        table = list(csv.DictReader(fh))
+    assert len(table) == len(serial)
+    assert {"qps", "rejection_rate", "backlog_mean", "latency_p99_ms"} <= set(table[0])
+
+
+def test_write_table_parquet_requires_pyarrow(tmp_path) -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError):
+            simulate_load.write_table([], tmp_path / "sweep.parquet")
+    else:
+        path = simulate_load.write_table([{"qps": 1.0}], tmp_path / "sweep.parquet")
+        assert path.exists()
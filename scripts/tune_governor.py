@@ -0,0 +1,73 @@
+"""Auto-ajuste offline de las ganancias del GpuGovernor.
+
+Reproduce una traza de ``GpuMetrics`` (JSONL grabado con ``--trace`` o una
+traza sintética con ráfagas) a través del governor en lazo cerrado, busca
+``kp/ki/kd/kf`` en un pool de procesos y muestra la configuración recomendada
+junto a las mejores candidatas. ``--output`` guarda el informe completo en
+JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from core.logging import setup as setup_logging
+from orchestrator.governor_tuning import load_trace, synthetic_trace, tune
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Auto-ajuste de ganancias del governor"
+    )
+    parser.add_argument(
+        "--trace", type=Path, default=None, help="traza JSONL (por defecto, sintética)"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=600.0, help="duración de la traza sintética"
+    )
+    parser.add_argument(
+        "--method", choices=("grid", "random", "bayes"), default="bayes"
+    )
+    parser.add_argument(
+        "--budget", type=int, default=64, help="número de candidatas a evaluar"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="procesos (por defecto, todas las CPU)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument(
+        "--output", type=Path, default=None, help="ruta del informe JSON"
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    trace = (
+        load_trace(args.trace)
+        if args.trace
+        else synthetic_trace(seconds=args.seconds, seed=args.seed)
+    )
+    logger.info("Traza de %s muestras", len(trace))
+    report = tune(
+        trace,
+        method=args.method,
+        budget=args.budget,
+        workers=args.workers,
+        seed=args.seed,
+    )
+    print(report.to_text(top=args.top))
+    if args.output:
+        args.output.write_text(json.dumps(report.as_dict(), indent=2), encoding="utf-8")
+        logger.info("Informe escrito en %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
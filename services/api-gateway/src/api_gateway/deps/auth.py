@@ -1,7 +1,38 @@
-"""Dependencias de autenticación minimalistas."""
+"""Dependencias de autenticación.
+
+Los tokens son JWT firmados con HMAC-SHA256 (``alg: HS256``) y un ``kid`` en
+la cabecera que elige la clave. :class:`TokenVerifier` comprueba firma,
+``exp`` y ``nbf`` y guarda los claims verificados en una caché LRU acotada con
+TTL, indexada por un digest del token: una petición con un token ya visto no
+decodifica ni recalcula el HMAC, sólo hace una búsqueda O(1). Una entrada
+nunca sobrevive a la expiración del token ni a la retirada de su clave.
+
+Las claves las da un ``KeyProvider`` (``kid -> secreto``). :meth:`start`
+las recarga periódicamente en un hilo de fondo; un ``kid`` desconocido fuerza
+además una recarga inmediata, limitada a una cada ``min_refresh_interval``.
+
+:func:`authorize` enlaza con :func:`policy.rbac.can` usando el rol de los
+claims cacheados.
+"""
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from time import time
+from typing import Any, Callable, Dict, Mapping, NamedTuple
+
+from policy import rbac
+
+logger = logging.getLogger(__name__)
+
 
 class AuthError(RuntimeError):
     def __init__(self, status_code: int, detail: str) -> None:
@@ -11,13 +42,279 @@ class AuthError(RuntimeError):
 
 
 HTTP_401_UNAUTHORIZED = 401
+HTTP_403_FORBIDDEN = 403
+
+KeyProvider = Callable[[], Mapping[str, bytes]]
+
+
+@dataclass(frozen=True, slots=True)
+class Claims:
+    subject: str
+    role: str
+    tenant: str | None = None
+    expires_at: float | None = None
+    key_id: str = ""
+    raw: Mapping[str, Any] = field(default_factory=dict, compare=False)
+
+    def can(self, action: str) -> bool:
+        return rbac.can(self.role, action)
+
+
+class _Entry(NamedTuple):
+    claims: Claims
+    valid_until: float
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def encode_token(claims: Mapping[str, Any], key: bytes, *, kid: str) -> str:
+    """Firma ``claims`` como JWT HS256 (para emisores internos y pruebas)."""
+
+    header = _b64encode(
+        json.dumps(
+            {"alg": "HS256", "typ": "JWT", "kid": kid}, separators=(",", ":")
+        ).encode()
+    )
+    payload = _b64encode(json.dumps(dict(claims), separators=(",", ":")).encode())
+    signing_input = f"{header}.{payload}".encode("ascii")
+    signature = hmac.new(key, signing_input, hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64encode(signature)}"
+
+
+class TokenVerifier:
+    """Verificación HS256 con caché de claims por digest del token."""
+
+    def __init__(
+        self,
+        keys: KeyProvider,
+        *,
+        cache_size: int = 10_000,
+        cache_ttl: float = 60.0,
+        refresh_interval: float = 300.0,
+        min_refresh_interval: float = 5.0,
+        leeway: float = 0.0,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        if cache_size <= 0:
+            raise ValueError("cache_size must be > 0")
+        self._provider = keys
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._refresh_interval = refresh_interval
+        self._min_refresh_interval = min_refresh_interval
+        self._leeway = leeway
+        self._clock = clock
+        self._cache: OrderedDict[bytes, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._keys: Dict[str, bytes] = {}
+        self._last_refresh = float("-inf")
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+
+    # -- claves ------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Recarga las claves y descarta los claims firmados con claves retiradas."""
+
+        keys = dict(self._provider())
+        with self._lock:
+            retired = self._keys.keys() - keys.keys()
+            changed = {
+                kid
+                for kid in keys.keys() & self._keys.keys()
+                if keys[kid] != self._keys[kid]
+            }
+            self._keys = keys
+            self._last_refresh = self._clock()
+            stale = retired | changed
+            if stale:
+                for digest in [
+                    d
+                    for d, entry in self._cache.items()
+                    if entry.claims.key_id in stale
+                ]:
+                    del self._cache[digest]
+        if stale:
+            logger.info("Claves retiradas o rotadas: %s", sorted(stale))
+
+    def start(self) -> None:
+        """Arranca la recarga periódica de claves en un hilo de fondo."""
+
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="token-key-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception:  # noqa: BLE001 - se conservan las claves anteriores
+                logger.exception("No se pudieron recargar las claves de firma")
+
+    def _key(self, kid: str) -> bytes | None:
+        key = self._keys.get(kid)
+        if (
+            key is None
+            and self._clock() - self._last_refresh >= self._min_refresh_interval
+        ):
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    # -- verificación ------------------------------------------------------
+
+    def verify(self, token: str) -> Claims:
+        if not token.isascii():
+            # Un JWT es base64url: cualquier otro carácter lo invalida.
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token mal formado")
+        now = self._clock()
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                if entry.valid_until > now:
+                    self._cache.move_to_end(digest)
+                    self.hits += 1
+                    return entry.claims
+                del self._cache[digest]
+            self.misses += 1
+        claims = self._decode(token, now)
+        valid_until = now + self._cache_ttl
+        if claims.expires_at is not None:
+            valid_until = min(valid_until, claims.expires_at + self._leeway)
+        with self._lock:
+            # Si la clave se retiró mientras se verificaba, no se cachea.
+            if claims.key_id in self._keys:
+                self._cache[digest] = _Entry(claims, valid_until)
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str, now: float) -> Claims:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature_segment)
+        except ValueError as exc:
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token mal formado") from exc
+        if not isinstance(header, dict) or header.get("alg") != "HS256":
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Algoritmo no soportado")
+        kid = str(header.get("kid", ""))
+        key = self._key(kid)
+        if key is None:
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Clave de firma desconocida")
+        expected = hmac.new(
+            key, f"{header_segment}.{payload_segment}".encode("ascii"), hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, signature):
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Firma inválida")
+        try:
+            payload = json.loads(_b64decode(payload_segment))
+        except ValueError as exc:
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token mal formado") from exc
+        if not isinstance(payload, dict):
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token mal formado")
+        expires_at = _numeric_date(payload, "exp")
+        if expires_at is not None and now >= expires_at + self._leeway:
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token expirado")
+        not_before = _numeric_date(payload, "nbf")
+        if not_before is not None and now + self._leeway < not_before:
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token aún no válido")
+        tenant = payload.get("tenant")
+        if tenant is not None and not isinstance(tenant, str):
+            # Acaba en claves de caché y de coalescing: debe ser una cadena.
+            raise AuthError(HTTP_401_UNAUTHORIZED, "Token mal formado")
+        return Claims(
+            subject=str(payload.get("sub", "")),
+            role=str(payload.get("role", "")),
+            tenant=tenant,
+            expires_at=expires_at,
+            key_id=kid,
+            raw=payload,
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _numeric_date(payload: Mapping[str, Any], name: str) -> float | None:
+    """``exp``/``nbf`` como segundos; un valor que no es un número finito es un 401."""
+
+    value = payload.get(name)
+    if value is None:
+        return None
+    if (
+        isinstance(value, bool)
+        or not isinstance(value, (int, float))
+        or not math.isfinite(value)
+    ):
+        raise AuthError(HTTP_401_UNAUTHORIZED, "Token mal formado")
+    return float(value)
+
+
+_verifier: TokenVerifier | None = None
+
+
+def configure(verifier: TokenVerifier | None) -> None:
+    """Instala el verificador usado por :func:`verify_token` y :func:`authorize`."""
+
+    global _verifier
+    _verifier = verifier
 
 
 def verify_token(token: str | None = None) -> str:
     if not token:
         raise AuthError(status_code=HTTP_401_UNAUTHORIZED, detail="Token requerido")
+    if _verifier is not None:
+        _verifier.verify(token)
     return token
 
 
 def get_current_token(token: str | None = None) -> str:
     return verify_token(token)
+
+
+def get_current_claims(token: str | None = None) -> Claims:
+    if not token:
+        raise AuthError(status_code=HTTP_401_UNAUTHORIZED, detail="Token requerido")
+    if _verifier is None:
+        raise AuthError(
+            status_code=HTTP_401_UNAUTHORIZED,
+            detail="Verificación de tokens no configurada",
+        )
+    return _verifier.verify(token)
+
+
+def authorize(token: str | None, action: str) -> Claims:
+    """Verifica el token y comprueba ``action`` con el rol de sus claims."""
+
+    claims = get_current_claims(token)
+    if not claims.can(action):
+        raise AuthError(
+            status_code=HTTP_403_FORBIDDEN,
+            detail=f"Rol {claims.role!r} sin permiso para {action}",
+        )
+    return claims
@@ -1,19 +1,502 @@
-"""Rate limiting simple."""
+"""Rate limiting por clave (tenant, token, IP...).
+
+:class:`RateLimiter` aplica un :class:`RateLimit` de forma independiente a
+cada clave con uno de tres algoritmos, todos con estado O(1) por clave:
+
+* ``"gcra"``: Generic Cell Rate Algorithm; un único instante teórico de
+  llegada por clave. Admite ráfagas de hasta ``burst`` y después espacia las
+  peticiones a ``rate`` por ``period``.
+* ``"token_bucket"``: tokens y última recarga; mismo contrato que GCRA.
+* ``"sliding_window"``: contador de ventana deslizante (ventana actual y
+  anterior ponderada). Un log de timestamps por clave sería exacto pero O(n);
+  el contador aproxima el log sin el pico de 2x en el borde de ventana que
+  tenía la ventana fija anterior.
+
+El estado vive en un backend. :class:`MemoryBackend` (por defecto) lo reparte
+en shards con su propio lock y orden LRU, de modo que las claves inactivas se
+expulsan en O(1) amortizado durante las propias peticiones.
+:class:`SharedMemoryBackend` guarda una tabla asociativa por conjuntos en
+``multiprocessing.shared_memory`` para que varios procesos worker del gateway
+apliquen un único límite.
+
+Una clave se considera inactiva cuando su estado ya equivale al de una clave
+nueva (bucket lleno, ventana vacía), así que expulsarla no cambia ninguna
+decisión.
+"""
 
 from __future__ import annotations
 
-from time import time
+import math
+import multiprocessing
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import blake2b
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from time import monotonic
+from typing import Any, Callable, Dict, List, NamedTuple, Protocol
 
 WINDOW = 1.0
 LIMIT = 5
-_state = {"count": 0, "window_start": time()}
+
+HTTP_429_TOO_MANY_REQUESTS = 429
+
+# Estado por clave: tres floats cuyo significado depende del algoritmo.
+_State = List[float]
+
+
+class RateLimitExceeded(RuntimeError):
+    def __init__(self, key: str, retry_after: float) -> None:
+        super().__init__(f"Rate limit exceeded for {key}")
+        self.status_code = HTTP_429_TOO_MANY_REQUESTS
+        self.detail = "Rate limit exceeded"
+        self.key = key
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """``rate`` peticiones por ``period`` segundos, con ráfagas de ``burst``."""
+
+    rate: float
+    period: float = 1.0
+    burst: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.rate <= 0:
+            raise ValueError("rate must be > 0")
+        if self.period <= 0:
+            raise ValueError("period must be > 0")
+        if self.burst is not None and self.burst <= 0:
+            raise ValueError("burst must be > 0")
+
+    @property
+    def capacity(self) -> float:
+        return float(self.burst if self.burst is not None else self.rate)
+
+    @property
+    def interval(self) -> float:
+        """Segundos entre peticiones a ritmo sostenido."""
+
+        return self.period / self.rate
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+class _Algorithm(ABC):
+    name = ""
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+
+    @abstractmethod
+    def initial(self, now: float) -> _State: ...
+
+    @abstractmethod
+    def apply(self, state: _State, now: float, cost: float) -> Decision: ...
+
+    @abstractmethod
+    def idle_after(self) -> float:
+        """Segundos sin peticiones tras los que el estado equivale a uno nuevo."""
+
+
+class _Gcra(_Algorithm):
+    """``state[0]`` es el instante teórico de llegada (TAT)."""
+
+    name = "gcra"
+
+    def initial(self, now: float) -> _State:
+        return [now, 0.0, 0.0]
+
+    def apply(self, state: _State, now: float, cost: float) -> Decision:
+        interval = self.limit.interval
+        horizon = self.limit.capacity * interval
+        tat = max(state[0], now) + cost * interval
+        ahead = tat - now
+        if ahead > horizon:
+            remaining = (
+                horizon - (state[0] - now if state[0] > now else 0.0)
+            ) / interval
+            return Decision(False, max(0, int(remaining)), ahead - horizon)
+        state[0] = tat
+        return Decision(True, int((horizon - ahead) / interval + 1e-9), 0.0)
+
+    def idle_after(self) -> float:
+        return self.limit.capacity * self.limit.interval
+
+
+class _TokenBucket(_Algorithm):
+    """``state[0]`` son los tokens y ``state[1]`` la última recarga."""
+
+    name = "token_bucket"
+
+    def initial(self, now: float) -> _State:
+        return [self.limit.capacity, now, 0.0]
+
+    def apply(self, state: _State, now: float, cost: float) -> Decision:
+        limit = self.limit
+        capacity = limit.capacity
+        tokens = state[0]
+        if now > state[1]:
+            tokens = min(capacity, tokens + (now - state[1]) / limit.interval)
+            state[1] = now
+        if tokens >= cost:
+            state[0] = tokens - cost
+            return Decision(True, int(state[0] + 1e-9), 0.0)
+        state[0] = tokens
+        return Decision(False, int(tokens + 1e-9), (cost - tokens) * limit.interval)
+
+    def idle_after(self) -> float:
+        return self.limit.capacity * self.limit.interval
+
+
+class _SlidingWindow(_Algorithm):
+    """``state`` es (inicio de la ventana actual, cuenta actual, cuenta anterior).
+
+    Las ventanas se alinean a múltiplos de ``period``.
+
+    La cuenta estimada es ``anterior * fracción no transcurrida + actual``; el
+    límite es ``capacity`` peticiones por ``period``.
+    """
+
+    name = "sliding_window"
+
+    def initial(self, now: float) -> _State:
+        period = self.limit.period
+        return [math.floor(now / period) * period, 0.0, 0.0]
+
+    def apply(self, state: _State, now: float, cost: float) -> Decision:
+        period = self.limit.period
+        capacity = self.limit.capacity
+        elapsed = now - state[0]
+        if elapsed >= period:
+            windows = math.floor(elapsed / period)
+            state[2] = state[1] if windows == 1 else 0.0
+            state[1] = 0.0
+            state[0] += windows * period
+            elapsed = now - state[0]
+        weight = 1.0 - elapsed / period
+        estimated = state[2] * weight + state[1]
+        if estimated + cost <= capacity + 1e-9:
+            state[1] += cost
+            return Decision(True, int(capacity - estimated - cost + 1e-9), 0.0)
+        free = capacity - state[1] - cost
+        if state[2] > 0 and free >= 0:
+            # Momento en que la ventana anterior pesa lo bastante poco.
+            retry_after = (1.0 - free / state[2]) * period - elapsed
+        else:
+            retry_after = period - elapsed
+        return Decision(
+            False, max(0, int(capacity - estimated + 1e-9)), max(retry_after, 0.0)
+        )
+
+    def idle_after(self) -> float:
+        return 2 * self.limit.period
+
+
+_ALGORITHMS: Dict[str, Callable[[RateLimit], _Algorithm]] = {
+    "gcra": _Gcra,
+    "token_bucket": _TokenBucket,
+    "sliding_window": _SlidingWindow,
+}
+
+
+class RateLimitBackend(Protocol):
+    def apply(
+        self,
+        key: str,
+        now: float,
+        algorithm: _Algorithm,
+        cost: float,
+        idle_before: float,
+    ) -> Decision:
+        """Aplica ``algorithm`` al estado de ``key`` de forma atómica."""
+
+    def evict_idle(self, idle_before: float) -> int:
+        """Expulsa las claves sin actividad desde ``idle_before``."""
+
+    def __len__(self) -> int: ...
+
+
+class _Shard:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # clave -> [s0, s1, s2, última actividad], en orden de última actividad.
+        self.entries: OrderedDict[str, List[float]] = OrderedDict()
+
+
+class MemoryBackend:
+    """Estado en memoria del proceso, repartido en ``shards`` con lock propio."""
+
+    # Claves inactivas que se intentan expulsar en cada petición.
+    _EVICT_PER_CALL = 2
+
+    def __init__(self, *, shards: int = 16) -> None:
+        if shards <= 0:
+            raise ValueError("shards must be > 0")
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def apply(
+        self,
+        key: str,
+        now: float,
+        algorithm: _Algorithm,
+        cost: float,
+        idle_before: float,
+    ) -> Decision:
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            entries = shard.entries
+            entry = entries.get(key)
+            if entry is None:
+                entry = algorithm.initial(now)
+                entry.append(now)
+                entries[key] = entry
+            else:
+                entries.move_to_end(key)
+            decision = algorithm.apply(entry, now, cost)
+            entry[3] = now
+            # La más antigua está al principio: se expulsa si ya está inactiva.
+            for _ in range(self._EVICT_PER_CALL):
+                oldest = next(iter(entries.values()))
+                if oldest[3] >= idle_before:
+                    break
+                entries.popitem(last=False)
+        return decision
+
+    def evict_idle(self, idle_before: float) -> int:
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                entries = shard.entries
+                while entries and next(iter(entries.values()))[3] < idle_before:
+                    entries.popitem(last=False)
+                    evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+
+class SharedMemoryBackend:
+    """Tabla de estado compartida entre procesos en ``shared_memory``.
+
+    La tabla es asociativa por conjuntos: cada clave se reduce a un hash de 64
+    bits que elige un conjunto de ``ways`` huecos. Si la clave no está, ocupa
+    un hueco libre o el de actividad más antigua del conjunto, de modo que las
+    claves inactivas se reciclan sin recorrer la tabla. Dimensiona ``slots``
+    por encima de las claves activas esperadas: si un conjunto se llena de
+    claves activas, la menos reciente pierde su estado.
+
+    Los locks (``stripes`` de ``multiprocessing.Lock``) se comparten al crear
+    los procesos: pasa el backend como argumento de ``Process`` o créalo antes
+    de hacer fork. Todos los procesos deben usar el mismo reloj; ``monotonic``
+    lo es dentro de un mismo host Linux.
+    """
+
+    def __init__(
+        self,
+        *,
+        slots: int = 1 << 18,
+        ways: int = 8,
+        stripes: int = 64,
+        name: str | None = None,
+        context: Any = None,
+    ) -> None:
+        if slots <= 0 or ways <= 0 or stripes <= 0:
+            raise ValueError("slots, ways and stripes must be > 0")
+        self._sets = max(1, slots // ways)
+        self._ways = ways
+        size = self._sets * ways
+        ctx = context or multiprocessing.get_context()
+        self._locks = [ctx.Lock() for _ in range(stripes)]
+        self._shm = SharedMemory(name=name, create=True, size=size * 40)
+        self._owner = os.getpid()
+        self._attach()
+
+    def _attach(self) -> None:
+        size = self._sets * self._ways
+        buffer = self._shm.buf
+        assert buffer is not None, "segmento de memoria compartida cerrado"
+        self._keys = buffer[: size * 8].cast("Q")
+        self._values = buffer[size * 8 : size * 40].cast("d")
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "name": self._shm.name,
+            "sets": self._sets,
+            "ways": self._ways,
+            "locks": self._locks,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._sets = state["sets"]
+        self._ways = state["ways"]
+        self._locks = state["locks"]
+        self._shm = SharedMemory(name=state["name"])
+        # Sólo el creador libera el segmento; el resource tracker no debe
+        # borrarlo cuando termine un worker.
+        resource_tracker.unregister(self._shm._name, "shared_memory")  # type: ignore[attr-defined]
+        self._owner = -1
+        self._attach()
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        digest = int.from_bytes(
+            blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+        return digest or 1  # 0 marca un hueco libre
+
+    def apply(
+        self,
+        key: str,
+        now: float,
+        algorithm: _Algorithm,
+        cost: float,
+        idle_before: float,
+    ) -> Decision:
+        digest = self._hash(key)
+        group = digest % self._sets
+        base = group * self._ways
+        keys = self._keys
+        values = self._values
+        with self._locks[group % len(self._locks)]:
+            slot = -1
+            victim = base
+            oldest = math.inf
+            for index in range(base, base + self._ways):
+                if keys[index] == digest:
+                    slot = index
+                    break
+                seen = values[index * 4 + 3] if keys[index] else -math.inf
+                if seen < oldest:
+                    victim, oldest = index, seen
+            if slot < 0:
+                slot = victim
+                keys[slot] = digest
+                state = algorithm.initial(now)
+            else:
+                offset = slot * 4
+                state = [values[offset], values[offset + 1], values[offset + 2]]
+            decision = algorithm.apply(state, now, cost)
+            offset = slot * 4
+            values[offset] = state[0]
+            values[offset + 1] = state[1]
+            values[offset + 2] = state[2]
+            values[offset + 3] = now
+        return decision
+
+    def evict_idle(self, idle_before: float) -> int:
+        evicted = 0
+        keys = self._keys
+        values = self._values
+        stripes = len(self._locks)
+        for stripe, lock in enumerate(self._locks):
+            with lock:
+                for group in range(stripe, self._sets, stripes):
+                    for index in range(group * self._ways, (group + 1) * self._ways):
+                        if keys[index] and values[index * 4 + 3] < idle_before:
+                            keys[index] = 0
+                            evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(1 for key in self._keys if key)
+
+    def close(self) -> None:
+        """Suelta la vista local; el proceso creador además elimina el segmento."""
+
+        self._keys.release()
+        self._values.release()
+        self._shm.close()
+        # Un hijo creado con fork hereda el objeto, pero no la propiedad.
+        if self._owner == os.getpid():
+            self._shm.unlink()
+
+
+class RateLimiter:
+    """Límite independiente por clave sobre un backend intercambiable."""
+
+    def __init__(
+        self,
+        limit: RateLimit,
+        *,
+        algorithm: str = "gcra",
+        backend: RateLimitBackend | None = None,
+        idle_ttl: float | None = None,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        try:
+            self._algorithm = _ALGORITHMS[algorithm](limit)
+        except KeyError:
+            raise ValueError(
+                f"Unknown algorithm {algorithm!r}; expected one of {sorted(_ALGORITHMS)}"
+            ) from None
+        self.limit = limit
+        self.backend: RateLimitBackend = (
+            backend if backend is not None else MemoryBackend()
+        )
+        idle_after = self._algorithm.idle_after()
+        # Expulsar antes de ``idle_after`` olvidaría consumo aún vigente.
+        self.idle_ttl = (
+            max(idle_ttl, idle_after) if idle_ttl is not None else idle_after
+        )
+        self._clock = clock
+
+    @property
+    def algorithm(self) -> str:
+        return self._algorithm.name
+
+    def hit(self, key: str, *, cost: float = 1.0, now: float | None = None) -> Decision:
+        if cost <= 0:
+            raise ValueError("cost must be > 0")
+        now = self._clock() if now is None else now
+        return self.backend.apply(key, now, self._algorithm, cost, now - self.idle_ttl)
+
+    def check(
+        self, key: str, *, cost: float = 1.0, now: float | None = None
+    ) -> Decision:
+        """Como :meth:`hit`, pero lanza :class:`RateLimitExceeded` si se rechaza."""
+
+        decision = self.hit(key, cost=cost, now=now)
+        if not decision.allowed:
+            raise RateLimitExceeded(key, decision.retry_after)
+        return decision
+
+    def evict_idle(self, *, now: float | None = None) -> int:
+        now = self._clock() if now is None else now
+        return self.backend.evict_idle(now - self.idle_ttl)
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+
+_default = RateLimiter(RateLimit(rate=LIMIT, period=WINDOW), algorithm="sliding_window")
+
+
+def check_rate_limit(key: str = "global") -> None:
+    _default.check(key)
 
 
-def check_rate_limit() -> None:
-    now = time()
-    if now - _state["window_start"] > WINDOW:
-        _state["window_start"] = now
-        _state["count"] = 0
-    _state["count"] += 1
-    if _state["count"] > LIMIT:
-        raise RuntimeError("Rate limit exceeded")
+__all__ = [
+    "Decision",
+    "MemoryBackend",
+    "RateLimit",
+    "RateLimitExceeded",
+    "RateLimiter",
+    "SharedMemoryBackend",
+    "check_rate_limit",
+]
@@ -2,16 +2,28 @@
 
 from __future__ import annotations
 
+import unicodedata
 from dataclasses import asdict, dataclass
 
+DEFAULT_TENANT = "default"
+
 
 @dataclass(slots=True)
 class QueryRequest:
     query: str
+    tenant: str = DEFAULT_TENANT
 
     def to_dict(self) -> dict[str, str]:
         return asdict(self)
 
+    def normalised_query(self) -> str:
+        """Consulta en forma canónica: NFKC, sin mayúsculas y con espacios colapsados."""
+
+        return " ".join(unicodedata.normalize("NFKC", self.query).casefold().split())
+
+    def coalescing_key(self) -> tuple[str, str]:
+        return self.tenant, self.normalised_query()
+
 
 @dataclass(slots=True)
 class QueryResponse:
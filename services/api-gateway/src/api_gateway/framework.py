@@ -1,10 +1,42 @@
-"""Framework HTTP mínimo para pruebas sin dependencias externas."""
+"""Framework HTTP mínimo para pruebas sin dependencias externas.
+
+Los handlers pueden ser funciones normales o corrutinas. :meth:`App.handle`
+despacha en el hilo del llamante (lo usa :class:`TestClient`) y
+:meth:`App.handle_async` lo hace desde un event loop, ejecutando los handlers
+síncronos en un pool de hilos; :meth:`App.dispatch`, su variante que devuelve
+además la ruta encontrada, es la base de :mod:`api_gateway.server`.
+
+Las rutas se compilan en :meth:`App.include_router`: las estáticas van a un
+diccionario ``(método, ruta)`` y las parametrizadas (``/v1/eval/report/{id}``)
+a un árbol por segmentos, uno por método. El plan de enlace de argumentos de
+cada handler también se calcula una sola vez, de modo que el despacho no
+recorre listas ni llama a ``inspect.signature`` por petición.
+
+Un handler puede devolver :class:`StreamingResponse` para emitir eventos
+(tokens, citas...) a medida que se generan; el servidor los envía como
+server-sent events o NDJSON con ``Transfer-Encoding: chunked``.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import inspect
+import json
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Iterable, List, Tuple
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
 @dataclass(slots=True)
@@ -25,7 +57,9 @@ class Router:
     def post(self, path: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
         return self._register("POST", path)
 
-    def _register(self, method: str, path: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def _register(
+        self, method: str, path: str
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
         full_path = f"{self.prefix}{path}" if self.prefix else path
 
         def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
@@ -39,43 +73,278 @@ class Router:
         return tuple(self._routes)
 
 
+class _Binding:
+    """Plan de enlace precalculado: qué argumentos pide un handler y sus defaults."""
+
+    __slots__ = ("parameters", "is_coroutine")
+
+    def __init__(self, handler: Callable[..., Any]) -> None:
+        self.parameters: Tuple[Tuple[str, Any], ...] = tuple(
+            (
+                name,
+                None
+                if parameter.default is inspect.Parameter.empty
+                else parameter.default,
+            )
+            for name, parameter in inspect.signature(handler).parameters.items()
+            if parameter.kind
+            not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+        )
+        self.is_coroutine = inspect.iscoroutinefunction(handler)
+
+    def bind(self, json_body: Dict[str, Any] | None) -> Dict[str, Any]:
+        if not json_body:
+            return {name: default for name, default in self.parameters}
+        get = json_body.get
+        return {name: get(name, default) for name, default in self.parameters}
+
+
+@dataclass(slots=True)
+class _Endpoint:
+    route: Route
+    binding: _Binding
+
+
+class _Node:
+    """Nodo del árbol de rutas parametrizadas, con un hijo por segmento."""
+
+    __slots__ = ("children", "param", "param_child", "endpoint")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Node] = {}
+        self.param: str | None = None
+        self.param_child: _Node | None = None
+        self.endpoint: _Endpoint | None = None
+
+    def insert(self, segments: List[str], endpoint: _Endpoint) -> None:
+        node = self
+        for segment in segments:
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+                if node.param_child is None:
+                    node.param, node.param_child = name, _Node()
+                elif node.param != name:
+                    raise ValueError(
+                        f"Parámetros en conflicto: {{{node.param}}} y {segment}"
+                    )
+                node = node.param_child
+            else:
+                node = node.children.setdefault(segment, _Node())
+        if node.endpoint is None:
+            node.endpoint = endpoint
+
+    def match(
+        self, segments: List[str], index: int, params: Dict[str, str]
+    ) -> _Endpoint | None:
+        if index == len(segments):
+            return self.endpoint
+        segment = segments[index]
+        # Los segmentos literales tienen prioridad sobre los parámetros.
+        child = self.children.get(segment)
+        if child is not None:
+            found = child.match(segments, index + 1, params)
+            if found is not None:
+                return found
+        if self.param_child is not None and segment:
+            found = self.param_child.match(segments, index + 1, params)
+            if found is not None:
+                assert self.param is not None
+                params[self.param] = segment
+                return found
+        return None
+
+
 class App:
     def __init__(self, title: str = "") -> None:
         self.title = title
         self._routes: List[Route] = []
+        self._static: Dict[Tuple[str, str], _Endpoint] = {}
+        self._trees: Dict[str, _Node] = {}
 
     def include_router(self, router: Router) -> None:
-        self._routes.extend(router.routes)
+        for route in router.routes:
+            self._routes.append(route)
+            endpoint = _Endpoint(route, _Binding(route.handler))
+            if "{" in route.path:
+                self._trees.setdefault(route.method, _Node()).insert(
+                    route.path.split("/"), endpoint
+                )
+            else:
+                # Como el recorrido lineal anterior, gana la primera ruta registrada.
+                self._static.setdefault((route.method, route.path), endpoint)
 
-    def handle(self, method: str, path: str, json_body: Dict[str, Any] | None = None) -> Tuple[int, Any]:
-        for route in self._routes:
-            if route.method == method and route.path == path:
-                return _invoke(route.handler, json_body)
+    @property
+    def routes(self) -> Iterable[Route]:
+        return tuple(self._routes)
+
+    def resolve(self, method: str, path: str) -> Route:
+        return self._match(method, path)[0].route
+
+    def _match(self, method: str, path: str) -> Tuple[_Endpoint, Dict[str, str] | None]:
+        endpoint = self._static.get((method, path))
+        if endpoint is not None:
+            return endpoint, None
+        tree = self._trees.get(method)
+        if tree is not None:
+            params: Dict[str, str] = {}
+            endpoint = tree.match(path.split("/"), 0, params)
+            if endpoint is not None:
+                return endpoint, params
         raise LookupError(f"Ruta no encontrada: {method} {path}")
 
+    def handle(
+        self, method: str, path: str, json_body: Dict[str, Any] | None = None
+    ) -> Tuple[int, Any]:
+        endpoint, params = self._match(method, path)
+        return _invoke(
+            endpoint.route.handler, _merge(json_body, params), endpoint.binding
+        )
 
-def _invoke(handler: Callable[..., Any], json_body: Dict[str, Any] | None) -> Tuple[int, Any]:
-    signature = inspect.signature(handler)
-    if not signature.parameters:
-        result = handler()
-    else:
-        kwargs = {}
-        json_body = json_body or {}
-        for name, parameter in signature.parameters.items():
-            if name in json_body:
-                kwargs[name] = json_body[name]
-            elif parameter.default is not inspect._empty:  # pragma: no cover - rutas sin datos
-                kwargs[name] = parameter.default
-            else:
-                kwargs[name] = None
-        result = handler(**kwargs)
+    async def handle_async(
+        self,
+        method: str,
+        path: str,
+        json_body: Dict[str, Any] | None = None,
+        *,
+        executor: Executor | None = None,
+    ) -> Tuple[int, Any]:
+        """Despacha desde un event loop sin bloquearlo.
+
+        Las corrutinas se esperan en el propio loop; los handlers síncronos
+        se ejecutan en ``executor`` (o en el pool por defecto del loop).
+        """
+
+        return await self.dispatch(method, path, json_body, executor=executor)[1]
+
+    def dispatch(
+        self,
+        method: str,
+        path: str,
+        json_body: Dict[str, Any] | None = None,
+        *,
+        executor: Executor | None = None,
+    ) -> Tuple[Route, Coroutine[Any, Any, Tuple[int, Any]]]:
+        """Como :meth:`handle_async`, pero devuelve también la ruta encontrada.
+
+        La búsqueda se hace una sola vez, aquí (``LookupError`` si no hay
+        ruta); la corrutina devuelta ejecuta el handler.
+        """
+
+        endpoint, params = self._match(method, path)
+        return endpoint.route, _invoke_async(
+            endpoint, _merge(json_body, params), executor
+        )
+
+
+async def _invoke_async(
+    endpoint: _Endpoint, json_body: Dict[str, Any] | None, executor: Executor | None
+) -> Tuple[int, Any]:
+    handler, binding = endpoint.route.handler, endpoint.binding
+    if binding.is_coroutine:
+        return _normalise(await handler(**binding.bind(json_body)))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, _invoke, handler, json_body, binding)
+
+
+def _merge(
+    json_body: Dict[str, Any] | None, params: Dict[str, str] | None
+) -> Dict[str, Any] | None:
+    # Los parámetros de la ruta mandan sobre los campos del cuerpo.
+    if not params:
+        return json_body
+    return {**json_body, **params} if json_body else params
+
+
+def _invoke(
+    handler: Callable[..., Any],
+    json_body: Dict[str, Any] | None,
+    binding: _Binding | None = None,
+) -> Tuple[int, Any]:
+    binding = binding or _Binding(handler)
+    result = handler(**binding.bind(json_body))
+    if inspect.isawaitable(result):
+        # Handler asíncrono llamado fuera de un event loop (TestClient).
+        result = asyncio.run(_await(result))
+    return _normalise(result)
+
+
+async def _await(awaitable: Any) -> Any:
+    return await awaitable
+
+
+def _normalise(result: Any) -> Tuple[int, Any]:
+    if isinstance(result, StreamingResponse):
+        return result.status_code, result
     if isinstance(result, tuple) and len(result) == 2:
         return int(result[0]), result[1]
     return 200, result
 
 
+class StreamingResponse:
+    """Respuesta incremental sobre un iterable síncrono o asíncrono de eventos.
+
+    Cada elemento es el dato a enviar o una tupla ``(evento, dato)``; el dato
+    se serializa como JSON. Con ``text/event-stream`` se emite como SSE y con
+    ``application/x-ndjson`` como una línea ``{"event", "data"}`` por evento.
+    El servidor consume el iterable al ritmo al que el cliente lee y lo cierra
+    (``aclose``/``close``) si el cliente se desconecta.
+    """
+
+    def __init__(
+        self,
+        events: Iterable[Any] | AsyncIterable[Any],
+        *,
+        media_type: str = SSE_MEDIA_TYPE,
+        status_code: int = 200,
+    ) -> None:
+        if media_type not in (SSE_MEDIA_TYPE, NDJSON_MEDIA_TYPE):
+            raise ValueError(f"media_type no soportado: {media_type}")
+        self.events = events
+        self.media_type = media_type
+        self.status_code = status_code
+        # Segundos desde la llegada de la petición hasta el primer evento
+        # enviado; lo rellena el servidor.
+        self.first_event_seconds: float | None = None
+
+    @property
+    def is_async(self) -> bool:
+        return hasattr(self.events, "__aiter__")
+
+    @staticmethod
+    def split(item: Any) -> Tuple[str, Any]:
+        if isinstance(item, tuple) and len(item) == 2 and isinstance(item[0], str):
+            return item
+        return "message", item
+
+    def encode(self, item: Any) -> bytes:
+        event, data = self.split(item)
+        if self.media_type == SSE_MEDIA_TYPE:
+            text = json.dumps(data, separators=(",", ":"), default=str)
+            return f"event: {event}\ndata: {text}\n\n".encode("utf-8")
+        line = json.dumps(
+            {"event": event, "data": data}, separators=(",", ":"), default=str
+        )
+        return (line + "\n").encode("utf-8")
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Consume el stream entero en el hilo actual (para :class:`TestClient`)."""
+
+        if self.is_async:
+            return asyncio.run(self._collect_async())
+        return [dict(zip(("event", "data"), self.split(item))) for item in self.events]  # type: ignore[union-attr]
+
+    async def _collect_async(self) -> List[Dict[str, Any]]:
+        return [
+            dict(zip(("event", "data"), self.split(item)))
+            async for item in self.events  # type: ignore[union-attr]
+        ]
+
+
 class Response:
     def __init__(self, status_code: int, payload: Any) -> None:
+        if isinstance(payload, StreamingResponse):
+            # El stream se consume entero: ``json()`` devuelve la lista de eventos.
+            status_code, payload = payload.status_code, payload.collect()
         self.status_code = status_code
         self._payload = payload
 
@@ -0,0 +1,218 @@
+"""Coalescencia de peticiones idénticas concurrentes (single-flight).
+
+:class:`SingleFlight` agrupa por clave las llamadas que llegan mientras otra
+con la misma clave está en curso: sólo la primera ejecuta el trabajo y el
+resto recibe su resultado (o su excepción).
+
+* :meth:`SingleFlight.do` comparte el resultado de una corrutina. Si un
+  llamante se cancela, la ejecución sigue mientras quede alguien esperando;
+  al irse el último, se cancela.
+* :meth:`SingleFlight.stream` comparte un generador asíncrono: los eventos se
+  guardan en orden y cada suscriptor los recorre desde el principio, de modo
+  que quien llega tarde recibe también los ya emitidos. Cada suscriptor
+  avanza a su ritmo; el productor arranca con la primera iteración de
+  cualquiera de ellos y se cancela cuando no queda ninguno. Un suscriptor
+  que se descarta sin iterar se da de baja al recolectarse.
+
+La clave sólo vive mientras hay una ejecución en curso: no es una caché, una
+petición que llega después de terminar la anterior ejecuta de nuevo.
+:meth:`SingleFlight.stats` da el ratio de coalescencia (peticiones servidas
+sin ejecutar respecto al total).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from dataclasses import asdict, dataclass
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class CoalescingStats:
+    requests: int
+    executions: int
+    coalesced: int
+    in_flight: int
+
+    @property
+    def ratio(self) -> float:
+        return self.coalesced / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> dict[str, object]:
+        return {**asdict(self), "ratio": self.ratio}
+
+
+class _Call(Generic[T]):
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task[T]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    """Eventos de un stream compartido y el productor que los rellena."""
+
+    __slots__ = ("source", "events", "done", "error", "changed", "subscribers", "task")
+
+    def __init__(self, source: Callable[[], AsyncIterator[Any]]) -> None:
+        self.source = source
+        self.events: List[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task: asyncio.Task[None] | None = None
+
+
+class SingleFlight:
+    """Agrupa ejecuciones concurrentes por clave dentro de un event loop."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call[Any]] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._executions = 0
+
+    def _count(self, leader: bool) -> None:
+        with self._lock:
+            self._requests += 1
+            self._executions += leader
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        leader = call is None or call.task.done()
+        if leader:
+            new_call: _Call[T] = _Call(asyncio.ensure_future(work()))
+
+            def forget(_: object) -> None:
+                self._forget(self._calls, key, new_call)
+
+            new_call.task.add_done_callback(forget)
+            self._calls[key] = call = new_call
+        assert call is not None
+        self._count(leader)
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stream(
+        self, key: Hashable, source: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncGenerator[Any, None]:
+        """Suscribe al stream en curso para ``key`` o arranca ``source()``."""
+
+        broadcast = self._streams.get(key)
+        leader = broadcast is None
+        if broadcast is None:
+            broadcast = _Broadcast(source)
+            self._streams[key] = broadcast
+        self._count(leader)
+        broadcast.subscribers += 1
+        started = [False]
+        subscriber = self._subscribe(key, broadcast, started)
+        # Un generador que nunca se itera no llega a ejecutar su ``finally``.
+        weakref.finalize(subscriber, self._abandon, key, broadcast, started)
+        return subscriber
+
+    async def _subscribe(
+        self, key: Hashable, broadcast: _Broadcast, started: List[bool]
+    ) -> AsyncGenerator[Any, None]:
+        started[0] = True
+        if broadcast.task is None:
+            # El productor arranca con la primera iteración, no al construir
+            # la respuesta.
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast))
+        position = 0
+        try:
+            while True:
+                if position < len(broadcast.events):
+                    yield broadcast.events[position]
+                    position += 1
+                    continue
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                broadcast.changed.clear()
+                await broadcast.changed.wait()
+        finally:
+            self._leave(key, broadcast)
+
+    def _abandon(
+        self, key: Hashable, broadcast: _Broadcast, started: List[bool]
+    ) -> None:
+        if not started[0]:
+            self._leave(key, broadcast)
+
+    def _leave(self, key: Hashable, broadcast: _Broadcast) -> None:
+        broadcast.subscribers -= 1
+        if broadcast.subscribers:
+            return
+        if broadcast.task is None:
+            self._forget(self._streams, key, broadcast)
+        elif not broadcast.task.done():
+            broadcast.task.cancel()
+
+    async def _pump(self, key: Hashable, broadcast: _Broadcast) -> None:
+        iterator = broadcast.source()
+        try:
+            async for event in iterator:
+                broadcast.events.append(event)
+                broadcast.changed.set()
+        except asyncio.CancelledError:
+            broadcast.error = ConnectionAbortedError("stream cancelled")
+            raise
+        except Exception as exc:  # noqa: BLE001 - se entrega a todos los suscriptores
+            broadcast.error = exc
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            broadcast.done = True
+            broadcast.changed.set()
+            self._forget(self._streams, key, broadcast)
+
+    @staticmethod
+    def _forget(registry: Dict[Hashable, Any], key: Hashable, entry: Any) -> None:
+        if registry.get(key) is entry:
+            del registry[key]
+
+    def stats(self) -> CoalescingStats:
+        with self._lock:
+            requests, executions = self._requests, self._executions
+        return CoalescingStats(
+            requests,
+            executions,
+            requests - executions,
+            len(self._calls) + len(self._streams),
+        )
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._requests = 0
+            self._executions = 0
+
+
+__all__ = ["CoalescingStats", "SingleFlight"]
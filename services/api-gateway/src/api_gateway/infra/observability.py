@@ -1,18 +1,32 @@
-"""Hooks de observabilidad."""
+"""Hooks de observabilidad.
+
+Las duraciones por ruta se acumulan en histogramas log-lineales de
+:mod:`core.instrumentation`; :func:`render_metrics` devuelve la exposición en
+texto de Prometheus de estos y del resto de recorders del proceso (spans de
+:mod:`core.tracing` incluidos).
+"""
 
 from __future__ import annotations
 
-from time import time
-from typing import Iterator
+from typing import Callable
+
+from core.instrumentation import LatencyRecorder, Timer, render_prometheus
+
+ROUTE_LATENCY = LatencyRecorder(
+    "http_request_duration_seconds",
+    "Duración de las peticiones por ruta",
+    label="route",
+)
+STREAM_FIRST_EVENT = LatencyRecorder(
+    "http_stream_first_event_seconds",
+    "Tiempo hasta el primer evento de un stream",
+    label="route",
+)
+
 
-from contextlib import contextmanager
+# Método enlazado directamente: sin una llamada intermedia por petición.
+track_latency: Callable[[str], Timer] = ROUTE_LATENCY.time
 
 
-@contextmanager
-def track_latency(route: str) -> Iterator[None]:
-    start = time()
-    try:
-        yield
-    finally:
-        duration = time() - start
-        print(f"Route {route} took {duration:.3f}s")
+def render_metrics() -> str:
+    return render_prometheus()
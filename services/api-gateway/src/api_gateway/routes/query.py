@@ -1,18 +1,66 @@
-"""Endpoint de consulta simplificado."""
+"""Endpoint de consulta simplificado.
+
+Con ``stream=true`` la respuesta se emite como server-sent events: un evento
+``token`` por fragmento de la respuesta, después ``citations`` y por último
+``done`` con la confianza, para que el cliente vea el primer token sin
+esperar a la generación completa.
+
+Las consultas concurrentes de un mismo tenant que coinciden una vez
+normalizadas (:meth:`QueryRequest.coalescing_key`) comparten una sola
+ejecución mediante :class:`~api_gateway.infra.coalescing.SingleFlight`;
+``GET /v1/query/stats`` expone el ratio de coalescencia. El tenant sale de
+los claims verificados del ``token`` (o es ``DEFAULT_TENANT`` sin token),
+nunca del cuerpo: así nadie recibe la respuesta coalescida de otro tenant.
+"""
 
 from __future__ import annotations
 
-from api_gateway.framework import Router
+import asyncio
+from typing import Any, AsyncIterator
+
+from api_gateway.deps.auth import get_current_claims
+from api_gateway.domain.dto import make_placeholder_response
+from api_gateway.domain.schemas import DEFAULT_TENANT, QueryRequest
+from api_gateway.framework import Router, StreamingResponse
+from api_gateway.infra.coalescing import SingleFlight
 
 router = Router(prefix="/v1")
 
+flights = SingleFlight()
+
 
 @router.post("/query")
-def query(payload: dict[str, str] | None = None) -> dict[str, object]:
+async def query(
+    payload: dict[str, str] | None = None,
+    stream: bool | str = False,
+    token: str | None = None,
+) -> object:
     payload = payload or {}
-    question = payload.get("query", "")
-    return {
-        "answer": f"Respuesta placeholder para: {question}",
-        "citations": [],
-        "confidence": 0.0,
-    }
+    claims = get_current_claims(token) if token else None
+    tenant = claims.tenant if claims is not None and claims.tenant else DEFAULT_TENANT
+    request = QueryRequest(query=payload.get("query", ""), tenant=tenant)
+    key = request.coalescing_key()
+    if stream in (True, "true", "1"):
+        return StreamingResponse(flights.stream(key, lambda: _generate(request)))
+    result = await flights.do(key, lambda: _execute(request))
+    # Cada llamante recibe su propia copia del resultado compartido.
+    return {**result, "citations": list(result["citations"])}
+
+
+@router.get("/query/stats")
+def query_stats() -> dict[str, object]:
+    return flights.stats().to_dict()
+
+
+async def _execute(request: QueryRequest) -> dict[str, Any]:
+    return make_placeholder_response(request.query).to_dict()
+
+
+async def _generate(request: QueryRequest) -> AsyncIterator[tuple[str, Any]]:
+    response = make_placeholder_response(request.query)
+    for index, word in enumerate(response.answer.split(" ")):
+        yield "token", {"text": word if index == 0 else f" {word}"}
+        # Punto de cesión entre tokens, como lo tendría un generador real.
+        await asyncio.sleep(0)
+    yield "citations", response.citations
+    yield "done", {"confidence": response.confidence}
@@ -0,0 +1,559 @@
+"""Servidor HTTP/1.1 asyncio para :class:`~api_gateway.framework.App`.
+
+* Conexiones keep-alive: HTTP/1.1 mantiene la conexión salvo
+  ``Connection: close``; HTTP/1.0 sólo con ``Connection: keep-alive``. Una
+  conexión inactiva se cierra tras ``keepalive_timeout`` segundos.
+* Pipelining: las peticiones de una conexión se leen y despachan en cuanto
+  llegan (hasta ``pipeline_depth`` por conexión) y las respuestas se escriben
+  en el mismo orden.
+* Concurrencia acotada: como mucho ``max_concurrency`` handlers en curso en
+  todo el servidor; el resto espera sin leer más de su conexión.
+* Los handlers asíncronos se ejecutan en el loop y los síncronos en un
+  ``ThreadPoolExecutor`` propio.
+* Métricas: la duración de cada petición se registra por ruta (patrón, no
+  la ruta concreta) en ``infra.observability.ROUTE_LATENCY`` y el tiempo
+  hasta el primer evento de cada stream en ``STREAM_FIRST_EVENT``.
+* Streaming: si el handler devuelve
+  :class:`~api_gateway.framework.StreamingResponse`, cada evento se envía como
+  un chunk en cuanto se produce. Tras cada chunk se espera a ``drain()``, así
+  que un cliente lento frena al generador (backpressure); si el cliente cierra
+  la conexión, la tarea se cancela y el generador se cierra, de modo que la
+  cancelación llega hasta quien produce los tokens. Un stream ocupa un hueco
+  de ``max_concurrency`` mientras dura.
+
+Los cuerpos se interpretan como JSON y los parámetros de la query string se
+pasan al handler igual que los campos del cuerpo. Las excepciones con un
+atributo ``status_code`` entero (como ``AuthError``) se traducen a ese
+estado; el resto devuelve 500.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from time import perf_counter
+from typing import Any, Dict, Iterator
+from urllib.parse import parse_qsl, urlsplit
+
+from api_gateway.framework import App, StreamingResponse
+from api_gateway.infra.observability import STREAM_FIRST_EVENT, track_latency
+
+logger = logging.getLogger(__name__)
+
+_MAX_HEADER_BYTES = 64 * 1024
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+@dataclass(slots=True)
+class _Request:
+    method: str
+    path: str
+    body: Dict[str, Any] | None
+    keep_alive: bool
+    chunked: bool = True
+    received_at: float = field(default_factory=perf_counter)
+    route: str = ""
+
+
+@dataclass(slots=True)
+class _Reply:
+    data: bytes
+    keep_alive: bool
+    stream: StreamingResponse | None = None
+    request: _Request | None = None
+
+
+@dataclass(slots=True)
+class _Connection:
+    """Estado compartido entre el lector y el escritor de una conexión."""
+
+    inflight: int = 0
+    streaming: bool = False
+
+
+class HttpServer:
+    """Front-end HTTP/1.1 sobre una :class:`App`."""
+
+    def __init__(
+        self,
+        app: App,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_concurrency: int = 256,
+        pipeline_depth: int = 16,
+        keepalive_timeout: float = 5.0,
+        max_body_bytes: int = 1024 * 1024,
+        executor_workers: int | None = None,
+    ) -> None:
+        if max_concurrency <= 0 or pipeline_depth <= 0:
+            raise ValueError("max_concurrency and pipeline_depth must be positive")
+        self._app = app
+        self._host = host
+        self._port = port
+        self._max_concurrency = max_concurrency
+        self._pipeline_depth = pipeline_depth
+        self._keepalive_timeout = keepalive_timeout
+        self._max_body_bytes = max_body_bytes
+        self._executor_workers = executor_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task[None]] = set()
+
+    @property
+    def port(self) -> int:
+        """Puerto real de escucha (útil con ``port=0``)."""
+
+        sockets = getattr(self._server, "sockets", None)
+        if not sockets:
+            return self._port
+        return int(sockets[0].getsockname()[1])
+
+    async def start(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._executor_workers, thread_name_prefix="api-gateway"
+        )
+        self._slots = asyncio.Semaphore(self._max_concurrency)
+        self._server = await asyncio.start_server(
+            self._on_connection, self._host, self._port, limit=_MAX_HEADER_BYTES
+        )
+        logger.info("Servidor HTTP escuchando en %s:%s", self._host, self.port)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "HttpServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    # -- conexión ----------------------------------------------------------
+
+    async def _on_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections.add(task)
+        # Cola sin límite: la profundidad del pipeline la acota ``window``, de
+        # modo que encolar el centinela de cierre nunca bloquea.
+        pending: asyncio.Queue[asyncio.Future[_Reply] | None] = asyncio.Queue()
+        window = asyncio.Semaphore(self._pipeline_depth)
+        state = _Connection()
+        responder = asyncio.create_task(
+            self._write_responses(pending, window, writer, state)
+        )
+        try:
+            while True:
+                await window.acquire()
+                if responder.done():
+                    break
+                try:
+                    request = await self._read_request(reader, state)
+                except asyncio.TimeoutError:
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    request = None
+                except _BadRequest as exc:
+                    future: asyncio.Future[_Reply] = (
+                        asyncio.get_running_loop().create_future()
+                    )
+                    future.set_result(
+                        _Reply(
+                            _encode(
+                                exc.status, {"detail": exc.detail}, keep_alive=False
+                            ),
+                            False,
+                        )
+                    )
+                    pending.put_nowait(future)
+                    break
+                if request is None:
+                    # El cliente ha cerrado: un stream en curso ya no tiene a
+                    # quién escribir, así que se cancela hasta el generador.
+                    if state.streaming:
+                        responder.cancel()
+                    break
+                state.inflight += 1
+                pending.put_nowait(asyncio.ensure_future(self._respond(request)))
+                if not request.keep_alive:
+                    break
+        except asyncio.CancelledError:
+            # Cierre del servidor. No se re-lanza: ``asyncio.streams`` registra
+            # como error cualquier tarea de conexión que acabe cancelada.
+            responder.cancel()
+        finally:
+            pending.put_nowait(None)
+            try:
+                await responder
+            except asyncio.CancelledError:
+                pass
+            writer.close()
+            self._connections.discard(task)
+
+    async def _write_responses(
+        self,
+        pending: asyncio.Queue[asyncio.Future[_Reply] | None],
+        window: asyncio.Semaphore,
+        writer: asyncio.StreamWriter,
+        state: _Connection,
+    ) -> None:
+        try:
+            while True:
+                future = await pending.get()
+                if future is None:
+                    return
+                reply = await future
+                writer.write(reply.data)
+                keep_alive = reply.keep_alive
+                if reply.stream is not None:
+                    assert reply.request is not None
+                    state.streaming = True
+                    try:
+                        keep_alive = (
+                            await self._write_stream(
+                                reply.stream, reply.request, writer
+                            )
+                            and keep_alive
+                        )
+                    finally:
+                        state.streaming = False
+                await writer.drain()
+                state.inflight -= 1
+                window.release()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            return
+        finally:
+            # Despierta al lector y cancela lo que quedase en cola; las
+            # respuestas ya listas que traen un stream lo cierran.
+            window.release()
+            while not pending.empty():
+                leftover = pending.get_nowait()
+                if leftover is None:
+                    continue
+                if (
+                    not leftover.done()
+                    or leftover.cancelled()
+                    or leftover.exception() is not None
+                ):
+                    leftover.cancel()
+                    continue
+                stream = leftover.result().stream
+                if stream is not None:
+                    await _close_stream(stream)
+
+    async def _write_stream(
+        self, stream: StreamingResponse, request: _Request, writer: asyncio.StreamWriter
+    ) -> bool:
+        """Envía los eventos de ``stream``; devuelve si la conexión sigue usable."""
+
+        assert self._slots is not None
+        loop = asyncio.get_running_loop()
+        chunked = request.chunked
+
+        async def emit(data: bytes) -> None:
+            if stream.first_event_seconds is None:
+                stream.first_event_seconds = perf_counter() - request.received_at
+                STREAM_FIRST_EVENT.record(
+                    f"{request.method} {request.route}", stream.first_event_seconds
+                )
+                logger.debug(
+                    "Primer evento de %s en %.4fs",
+                    request.path,
+                    stream.first_event_seconds,
+                )
+            writer.write(_chunk(data) if chunked else data)
+            await writer.drain()
+
+        healthy = True
+        async with self._slots:
+            if stream.is_async:
+                iterator: Any = stream.events.__aiter__()  # type: ignore[union-attr]
+                try:
+                    async for item in iterator:
+                        await emit(stream.encode(item))
+                except (ConnectionError, asyncio.CancelledError):
+                    raise
+                except Exception:  # noqa: BLE001 - las cabeceras ya se enviaron
+                    logger.exception("Error en el stream de %s", request.path)
+                    await emit(stream.encode(("error", {"detail": "Error interno"})))
+                    healthy = False
+                finally:
+                    aclose = getattr(iterator, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+            else:
+                items: Iterator[Any] = iter(stream.events)  # type: ignore[arg-type]
+                done = object()
+                step: asyncio.Future[Any] | None = None
+                try:
+                    while True:
+                        step = loop.run_in_executor(self._executor, next, items, done)
+                        item = await step
+                        step = None
+                        if item is done:
+                            break
+                        await emit(stream.encode(item))
+                except (ConnectionError, asyncio.CancelledError):
+                    raise
+                except Exception:  # noqa: BLE001 - las cabeceras ya se enviaron
+                    logger.exception("Error en el stream de %s", request.path)
+                    await emit(stream.encode(("error", {"detail": "Error interno"})))
+                    healthy = False
+                finally:
+                    close = getattr(items, "close", None)
+                    if close is not None:
+                        if step is not None and not step.done():
+                            # El generador sigue corriendo en su hilo: se cierra al volver.
+                            step.add_done_callback(lambda _: close())
+                        else:
+                            close()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        # Sin chunked (HTTP/1.0) el final del cuerpo lo marca el cierre.
+        return healthy and chunked
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader, state: _Connection
+    ) -> _Request | None:
+        while True:
+            try:
+                head = await asyncio.wait_for(
+                    reader.readuntil(b"\r\n\r\n"), self._keepalive_timeout
+                )
+                break
+            except asyncio.TimeoutError:
+                # Sólo cuenta como inactiva una conexión sin respuestas pendientes.
+                if not state.inflight:
+                    raise
+            except asyncio.IncompleteReadError as exc:
+                if not exc.partial.strip():
+                    return None
+                raise
+            except asyncio.LimitOverrunError as exc:
+                raise _BadRequest(
+                    HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                    "Cabeceras demasiado grandes",
+                ) from exc
+        received_at = perf_counter()
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError as exc:
+            raise _BadRequest(
+                HTTPStatus.BAD_REQUEST, "Línea de petición inválida"
+            ) from exc
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = (
+            connection != "close"
+            if version == "HTTP/1.1"
+            else connection == "keep-alive"
+        )
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise _BadRequest(HTTPStatus.LENGTH_REQUIRED, "Se requiere Content-Length")
+        raw_length = headers.get("content-length") or "0"
+        if not (raw_length.isascii() and raw_length.isdigit()):
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Content-Length inválido")
+        length = int(raw_length)
+        if length > self._max_body_bytes:
+            raise _BadRequest(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo demasiado grande"
+            )
+        raw_body = (
+            await asyncio.wait_for(reader.readexactly(length), self._keepalive_timeout)
+            if length
+            else b""
+        )
+
+        url = urlsplit(target)
+        body: Dict[str, Any] | None = dict(parse_qsl(url.query)) if url.query else None
+        if raw_body:
+            try:
+                decoded = json.loads(raw_body)
+            except ValueError as exc:
+                raise _BadRequest(HTTPStatus.BAD_REQUEST, "JSON inválido") from exc
+            if not isinstance(decoded, dict):
+                raise _BadRequest(
+                    HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON"
+                )
+            body = {**(body or {}), **decoded}
+        return _Request(
+            method.upper(),
+            url.path or "/",
+            body,
+            keep_alive,
+            version == "HTTP/1.1",
+            received_at,
+        )
+
+    async def _respond(self, request: _Request) -> _Reply:
+        assert self._slots is not None
+        async with self._slots:
+            try:
+                route, reply = self._app.dispatch(
+                    request.method,
+                    request.path,
+                    request.body,
+                    executor=self._executor,
+                )
+                request.route = route.path
+                with track_latency(f"{request.method} {request.route}"):
+                    status, payload = await reply
+            except LookupError as exc:
+                status, payload = HTTPStatus.NOT_FOUND, {"detail": str(exc)}
+            except Exception as exc:  # noqa: BLE001 - se traduce a respuesta HTTP
+                code = getattr(exc, "status_code", None)
+                if isinstance(code, int):
+                    status, payload = code, {"detail": getattr(exc, "detail", str(exc))}
+                else:
+                    logger.exception("Error en %s %s", request.method, request.path)
+                    status, payload = (
+                        HTTPStatus.INTERNAL_SERVER_ERROR,
+                        {"detail": "Error interno"},
+                    )
+        if isinstance(payload, StreamingResponse):
+            keep_alive = request.keep_alive and request.chunked
+            head = _stream_head(
+                int(status),
+                payload.media_type,
+                chunked=request.chunked,
+                keep_alive=keep_alive,
+            )
+            return _Reply(head, keep_alive, payload, request)
+        return _Reply(
+            _encode(int(status), payload, keep_alive=request.keep_alive),
+            request.keep_alive,
+        )
+
+
+async def _close_stream(stream: StreamingResponse) -> None:
+    """Cierra los eventos de un stream que no llegó a enviarse."""
+
+    try:
+        if stream.is_async:
+            aclose = getattr(stream.events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        else:
+            close = getattr(stream.events, "close", None)
+            if close is not None:
+                close()
+    except Exception:  # noqa: BLE001 - la conexión ya se está cerrando
+        logger.exception("Error al cerrar un stream pendiente")
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return "Unknown"
+
+
+def _chunk(data: bytes) -> bytes:
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+def _stream_head(
+    status: int, media_type: str, *, chunked: bool, keep_alive: bool
+) -> bytes:
+    head = (
+        f"HTTP/1.1 {status} {_reason(status)}\r\n"
+        f"Content-Type: {media_type}; charset=utf-8\r\n"
+        "Cache-Control: no-cache\r\n"
+        + ("Transfer-Encoding: chunked\r\n" if chunked else "")
+        + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1")
+
+
+def _encode(status: int, payload: Any, *, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_reason(status)}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve(
+    app: App, *, host: str = "127.0.0.1", port: int = 8000, **options: Any
+) -> None:
+    """Arranca un :class:`HttpServer` y lo mantiene hasta que se cancele."""
+
+    async with HttpServer(app, host=host, port=port, **options) as server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    import argparse
+
+    from core.logging import setup as setup_logging
+
+    parser = argparse.ArgumentParser(description="Servidor HTTP del api-gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    args = parser.parse_args()
+
+    setup_logging()
+    from api_gateway.main import app
+
+    try:
+        asyncio.run(
+            serve(
+                app,
+                host=args.host,
+                port=args.port,
+                max_concurrency=args.max_concurrency,
+            )
+        )
+    except KeyboardInterrupt:  # pragma: no cover - parada manual
+        pass
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["HttpServer", "serve"]
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+from api_gateway.deps import auth
+from api_gateway.deps.auth import AuthError, TokenVerifier, encode_token
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def keys() -> dict:
+    return {"k1": b"secret-1"}
+
+
+@pytest.fixture()
+def clock() -> _Clock:
+    return _Clock()
+
+
+@pytest.fixture()
+def verifier(keys: dict, clock: _Clock) -> TokenVerifier:
+    return TokenVerifier(
+        lambda: keys,
+        cache_size=3,
+        cache_ttl=30.0,
+        min_refresh_interval=0.0,
+        clock=clock,
+    )
+
+
+def _token(
+    role: str = "analyst", *, kid: str = "k1", key: bytes = b"secret-1", **extra
+) -> str:
+    return encode_token(
+        {"sub": "ana", "role": role, "tenant": "acme", **extra}, key, kid=kid
+    )
+
+
+def test_valid_tokens_are_cached_by_digest(verifier: TokenVerifier) -> None:
+    token = _token(exp=2_000)
+    claims = verifier.verify(token)
+    assert (claims.subject, claims.role, claims.tenant, claims.expires_at) == (
+        "ana",
+        "analyst",
+        "acme",
+        2_000.0,
+    )
+    assert verifier.verify(token) is claims
+    assert (verifier.hits, verifier.misses) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "token, detail",
+    [
+        ("not-a-token", "Token mal formado"),
+        (_token(key=b"wrong"), "Firma inválida"),
+        (_token(kid="unknown"), "Clave de firma desconocida"),
+        (_token(exp=999), "Token expirado"),
+        (_token(nbf=1_500), "Token aún no válido"),
+        (_token().replace(".", ".ñ", 1), "Token mal formado"),
+        (_token() + "\udc80", "Token mal formado"),
+        (_token(exp="mañana"), "Token mal formado"),
+        (_token(nbf="ayer"), "Token mal formado"),
+        (_token(exp=True), "Token mal formado"),
+        (_token(tenant=["acme"]), "Token mal formado"),
+        (_token(tenant=7), "Token mal formado"),
+        (
+            encode_token({"sub": "ana", "exp": float("nan")}, b"secret-1", kid="k1"),
+            "Token mal formado",
+        ),
+    ],
+)
+def test_invalid_tokens_are_rejected(
+    verifier: TokenVerifier, token: str, detail: str
+) -> None:
+    with pytest.raises(AuthError) as excinfo:
+        verifier.verify(token)
+    assert excinfo.value.status_code == 401
+    assert excinfo.value.detail == detail
+    assert len(verifier) == 0
+
+
+def test_cache_honours_ttl_expiry_and_size(
+    verifier: TokenVerifier, clock: _Clock
+) -> None:
+    short = _token(exp=1_010)
+    verifier.verify(short)
+    clock.now = 1_011
+    with pytest.raises(AuthError):
+        verifier.verify(short)
+
+    tokens = [_token(jti=str(index)) for index in range(5)]
+    for token in tokens:
+        verifier.verify(token)
+    assert len(verifier) == 3
+    clock.now += 31
+    verifier.verify(tokens[-1])
+    assert verifier.misses == 8
+
+
+def test_key_rotation_drops_cached_claims(verifier: TokenVerifier, keys: dict) -> None:
+    old = _token()
+    verifier.verify(old)
+    keys["k2"] = b"secret-2"
+    # Un kid nuevo se descubre con una recarga inmediata.
+    assert verifier.verify(_token(kid="k2", key=b"secret-2")).key_id == "k2"
+    del keys["k1"]
+    verifier.refresh()
+    with pytest.raises(AuthError):
+        verifier.verify(old)
+
+
+def test_background_refresh_picks_up_new_keys(keys: dict) -> None:
+    refreshed = threading.Event()
+
+    def provider() -> dict:
+        if "k2" in keys:
+            refreshed.set()
+        return dict(keys)
+
+    verifier = TokenVerifier(provider, refresh_interval=0.01, min_refresh_interval=3600)
+    verifier.start()
+    try:
+        keys["k2"] = b"secret-2"
+        assert refreshed.wait(2)
+        assert verifier.verify(_token(kid="k2", key=b"secret-2")).subject == "ana"
+    finally:
+        verifier.stop()
+
+
+def test_authorize_uses_rbac_on_cached_claims(verifier: TokenVerifier) -> None:
+    auth.configure(verifier)
+    try:
+        assert auth.authorize(_token("analyst"), "eval").role == "analyst"
+        with pytest.raises(AuthError) as excinfo:
+            auth.authorize(_token("user"), "admin")
+        assert excinfo.value.status_code == 403
+        assert auth.verify_token(_token()) == _token()
+        with pytest.raises(AuthError):
+            auth.verify_token(_token(key=b"forged"))
+    finally:
+        auth.configure(None)
+    assert auth.verify_token("opaque") == "opaque"
@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+from api_gateway.deps import auth
+from api_gateway.deps.auth import TokenVerifier, encode_token
+from api_gateway.domain.schemas import QueryRequest
+from api_gateway.infra.coalescing import SingleFlight
+from api_gateway.main import app
+from api_gateway.routes import query as query_route
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    flights = SingleFlight()
+    executions = []
+
+    async def work(tag: str) -> dict:
+        executions.append(tag)
+        await asyncio.sleep(0.01)
+        return {"tag": tag}
+
+    async def scenario() -> list:
+        calls = [flights.do("a", lambda: work("a")) for _ in range(9)] + [
+            flights.do("b", lambda: work("b"))
+        ]
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(scenario())
+    assert sorted(executions) == ["a", "b"]
+    assert results[:9] == [{"tag": "a"}] * 9 and results[9] == {"tag": "b"}
+    stats = flights.stats()
+    assert (stats.requests, stats.executions, stats.coalesced, stats.in_flight) == (
+        10,
+        2,
+        8,
+        0,
+    )
+    assert stats.ratio == pytest.approx(0.8)
+
+
+def test_errors_reach_every_waiter_and_are_not_cached() -> None:
+    flights = SingleFlight()
+    attempts = []
+
+    async def failing() -> None:
+        attempts.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("backend down")
+
+    async def scenario() -> list:
+        first = await asyncio.gather(
+            *(flights.do("k", failing) for _ in range(3)), return_exceptions=True
+        )
+        second = await asyncio.gather(flights.do("k", failing), return_exceptions=True)
+        return [*first, *second]
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 2
+
+
+def test_execution_survives_until_the_last_waiter_leaves() -> None:
+    flights = SingleFlight()
+    state = {"cancelled": False}
+
+    async def slow() -> str:
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def scenario() -> str:
+        impatient = asyncio.ensure_future(flights.do("k", slow))
+        patient = asyncio.ensure_future(flights.do("k", slow))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        result = await patient
+        assert not state["cancelled"]
+
+        lonely = asyncio.ensure_future(flights.do("k2", slow))
+        await asyncio.sleep(0.01)
+        lonely.cancel()
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(scenario()) == "done"
+    assert state["cancelled"]
+
+
+def test_streams_fan_out_to_late_subscribers() -> None:
+    flights = SingleFlight()
+    runs = []
+
+    async def source():
+        runs.append(1)
+        for index in range(4):
+            yield index
+            await asyncio.sleep(0.005)
+
+    async def consume(iterator) -> list:
+        return [event async for event in iterator]
+
+    async def scenario() -> list:
+        first = asyncio.ensure_future(consume(flights.stream("k", source)))
+        await asyncio.sleep(0.007)
+        second = asyncio.ensure_future(consume(flights.stream("k", source)))
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == [[0, 1, 2, 3], [0, 1, 2, 3]]
+    assert len(runs) == 1
+    assert flights.stats().coalesced == 1
+
+
+def test_stream_producer_is_cancelled_when_everyone_leaves() -> None:
+    flights = SingleFlight()
+    state = {"closed": False}
+
+    async def endless():
+        try:
+            while True:
+                yield "tick"
+                await asyncio.sleep(0)
+        finally:
+            state["closed"] = True
+
+    async def scenario() -> None:
+        iterators = [flights.stream("k", endless) for _ in range(2)]
+        for iterator in iterators:
+            await iterator.__anext__()
+            await iterator.aclose()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert state["closed"]
+    assert flights.stats().in_flight == 0
+
+
+def test_follower_is_served_when_the_leader_is_never_iterated() -> None:
+    flights = SingleFlight()
+    runs = []
+
+    async def source():
+        runs.append(1)
+        yield "only"
+
+    async def scenario() -> list:
+        leader = flights.stream("k", source)
+        follower = flights.stream("k", source)
+        del leader  # p. ej. una respuesta que nunca llegó a enviarse
+        return [event async for event in follower]
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 2)) == ["only"]
+    assert len(runs) == 1
+    assert flights.stats().in_flight == 0
+
+    # Si nadie llega a iterar, la clave se libera al descartar el stream.
+    abandoned = flights.stream("k2", source)
+    assert flights.stats().in_flight == 1
+    del abandoned
+    assert flights.stats().in_flight == 0 and len(runs) == 1
+
+
+def test_query_route_coalesces_normalised_queries_per_tenant() -> None:
+    query_route.flights.reset_stats()
+    acme, globex = (
+        encode_token(
+            {"sub": "ana", "role": "user", "tenant": tenant}, b"secret", kid="k1"
+        )
+        for tenant in ("acme", "globex")
+    )
+
+    async def scenario() -> list:
+        bodies = [
+            {"payload": {"query": "Hola  mundo"}, "token": acme},
+            # El tenant del cuerpo se ignora: manda el de los claims.
+            {"payload": {"query": "hola MUNDO ", "tenant": "globex"}, "token": acme},
+            {"payload": {"query": "hola mundo", "tenant": "acme"}, "token": globex},
+        ]
+        return await asyncio.gather(
+            *(app.handle_async("POST", "/v1/query", body) for body in bodies)
+        )
+
+    auth.configure(TokenVerifier(lambda: {"k1": b"secret"}))
+    try:
+        responses = asyncio.run(scenario())
+    finally:
+        auth.configure(None)
+    assert [status for status, _ in responses] == [200, 200, 200]
+    assert responses[0][1] == responses[1][1] and responses[0][1] is not responses[1][1]
+    stats = app.handle("GET", "/v1/query/stats")[1]
+    assert stats["requests"] == 3 and stats["coalesced"] == 1
+
+
+def test_query_request_normalisation() -> None:
+    request = QueryRequest(query="  ¿Qué  es\tFERIA?  ", tenant="acme")
+    assert request.coalescing_key() == ("acme", "¿qué es feria?")
+    assert QueryRequest(query="ﬁn").normalised_query() == "fin"
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from api_gateway.framework import App, Router, TestClient
+
+
+def _app() -> App:
+    router = Router(prefix="/v1")
+
+    @router.get("/eval/report")
+    def latest(version: str = "latest") -> dict:
+        return {"report": version}
+
+    @router.get("/eval/report/{id}")
+    def report(id: str, detail: bool = False) -> dict:
+        return {"id": id, "detail": detail}
+
+    @router.get("/eval/report/summary")
+    def summary() -> dict:
+        return {"summary": True}
+
+    @router.post("/tenants/{tenant}/jobs/{job}")
+    def job(tenant: str, job: str, priority: int = 0) -> tuple:
+        return 201, {"tenant": tenant, "job": job, "priority": priority}
+
+    app = App()
+    app.include_router(router)
+    return app
+
+
+def test_static_routes_use_handler_defaults() -> None:
+    client = TestClient(_app())
+    assert client.get("/v1/eval/report").json() == {"report": "latest"}
+
+
+def test_path_parameters_are_bound() -> None:
+    app = _app()
+    assert app.handle("GET", "/v1/eval/report/r-42") == (
+        200,
+        {"id": "r-42", "detail": False},
+    )
+    status, payload = app.handle(
+        "POST", "/v1/tenants/acme/jobs/7", {"priority": 3, "job": "ignored"}
+    )
+    assert status == 201
+    assert payload == {"tenant": "acme", "job": "7", "priority": 3}
+
+
+def test_literal_segments_win_over_parameters() -> None:
+    app = _app()
+    assert app.handle("GET", "/v1/eval/report/summary") == (200, {"summary": True})
+    assert app.resolve("GET", "/v1/eval/report/other").path == "/v1/eval/report/{id}"
+
+
+def test_dispatch_returns_the_matched_pattern() -> None:
+    route, reply = _app().dispatch("GET", "/v1/eval/report/r-7", {"detail": True})
+    assert route.path == "/v1/eval/report/{id}"
+    assert asyncio.run(reply) == (200, {"id": "r-7", "detail": True})
+
+
+@pytest.mark.parametrize(
+    "method, path",
+    [
+        ("POST", "/v1/eval/report"),
+        ("GET", "/v1/eval/report/"),
+        ("GET", "/v1/eval/report/a/b"),
+        ("GET", "/v2/x"),
+    ],
+)
+def test_unknown_routes_raise_lookup_error(method: str, path: str) -> None:
+    with pytest.raises(LookupError):
+        _app().handle(method, path)
+
+
+def test_conflicting_parameter_names_are_rejected() -> None:
+    router = Router()
+
+    @router.get("/items/{id}")
+    def by_id(id: str) -> dict:
+        return {}
+
+    @router.get("/items/{name}/tags")
+    def tags(name: str) -> dict:
+        return {}
+
+    with pytest.raises(ValueError):
+        App().include_router(router)
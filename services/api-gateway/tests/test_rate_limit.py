@@ -0,0 +1,127 @@
+import multiprocessing
+import threading
+
+import pytest
+from api_gateway.deps.rate_limit import (
+    MemoryBackend,
+    RateLimit,
+    RateLimiter,
+    RateLimitExceeded,
+    SharedMemoryBackend,
+    check_rate_limit,
+)
+
+
+@pytest.mark.parametrize("algorithm", ["gcra", "token_bucket"])
+def test_burst_then_sustained_rate(algorithm: str) -> None:
+    limiter = RateLimiter(RateLimit(rate=2, period=1.0, burst=4), algorithm=algorithm)
+    decisions = [limiter.hit("tenant-a", now=100.0) for _ in range(5)]
+    assert [d.allowed for d in decisions] == [True, True, True, True, False]
+    assert [d.remaining for d in decisions[:4]] == [3, 2, 1, 0]
+    assert decisions[-1].retry_after == pytest.approx(0.5)
+    assert not limiter.hit("tenant-a", now=100.4).allowed
+    assert limiter.hit("tenant-a", now=100.5).allowed
+    # Otra clave tiene su propio presupuesto.
+    assert limiter.hit("tenant-b", now=100.5).remaining == 3
+
+
+@pytest.mark.parametrize("cost", [0.0, -1.0])
+def test_non_positive_cost_is_rejected(cost: float) -> None:
+    limiter = RateLimiter(RateLimit(rate=2, period=1.0, burst=2))
+    with pytest.raises(ValueError):
+        limiter.hit("k", cost=cost, now=0.0)
+    assert len(limiter) == 0
+
+
+def test_sliding_window_has_no_boundary_burst() -> None:
+    limiter = RateLimiter(RateLimit(rate=10, period=1.0), algorithm="sliding_window")
+    assert all(limiter.hit("k", now=0.95).allowed for _ in range(10))
+    # Justo tras el borde la ventana anterior aún pesa un 85%.
+    assert sum(limiter.hit("k", now=1.15).allowed for _ in range(10)) == 1
+    denied = limiter.hit("k", now=1.15)
+    assert not denied.allowed and 0 < denied.retry_after <= 1.0
+    assert sum(limiter.hit("k", now=3.5).allowed for _ in range(20)) == 10
+
+
+def test_idle_keys_are_evicted_without_changing_decisions() -> None:
+    limiter = RateLimiter(
+        RateLimit(rate=5, period=1.0),
+        algorithm="token_bucket",
+        backend=MemoryBackend(shards=1),
+        idle_ttl=0.1,
+    )
+    assert limiter.idle_ttl == pytest.approx(1.0)
+    for index in range(100):
+        limiter.hit(f"key-{index}", now=0.0)
+    assert len(limiter) == 100
+    assert limiter.evict_idle(now=0.5) == 0
+    assert limiter.evict_idle(now=1.5) == 100
+    # Las peticiones también expulsan de forma incremental.
+    for index in range(100):
+        limiter.hit(f"key-{index}", now=2.0)
+    for index in range(100):
+        limiter.hit(f"other-{index}", now=10.0)
+    assert len(limiter) == 100
+
+
+def test_concurrent_hits_never_exceed_the_burst() -> None:
+    limiter = RateLimiter(
+        RateLimit(rate=1, period=60.0, burst=50), backend=MemoryBackend(shards=4)
+    )
+    allowed = []
+
+    def worker() -> None:
+        allowed.append(sum(limiter.hit("shared", now=0.0).allowed for _ in range(100)))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(allowed) == 50
+
+
+def _hammer(limiter: RateLimiter, results: "multiprocessing.Queue[int]") -> None:
+    results.put(sum(limiter.hit("tenant", now=1.0).allowed for _ in range(40)))
+    limiter.backend.close()  # type: ignore[attr-defined]
+
+
+def test_shared_memory_backend_enforces_one_limit_across_processes() -> None:
+    ctx = multiprocessing.get_context("fork")
+    backend = SharedMemoryBackend(slots=64, ways=4, stripes=4, context=ctx)
+    try:
+        limiter = RateLimiter(RateLimit(rate=1, period=60.0, burst=30), backend=backend)
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=_hammer, args=(limiter, results)) for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+        assert sum(results.get(timeout=5) for _ in workers) == 30
+        assert len(backend) == 1
+        assert limiter.evict_idle(now=1.0 + 3600) == 1
+    finally:
+        backend.close()
+
+
+def test_shared_memory_backend_recycles_stale_slots() -> None:
+    backend = SharedMemoryBackend(slots=8, ways=8, stripes=1)
+    try:
+        limiter = RateLimiter(RateLimit(rate=1, period=1.0), backend=backend)
+        for index in range(32):
+            assert limiter.hit(f"k{index}", now=float(index)).allowed
+        assert len(backend) == 8
+    finally:
+        backend.close()
+
+
+def test_check_rate_limit_raises_429() -> None:
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        for _ in range(10):
+            check_rate_limit("test-client")
+    assert excinfo.value.status_code == 429
+    assert isinstance(excinfo.value, RuntimeError)
+    with pytest.raises(ValueError):
+        RateLimiter(RateLimit(rate=1), algorithm="leaky")
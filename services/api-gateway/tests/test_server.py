@@ -0,0 +1,406 @@
+import asyncio
+import json
+from typing import Any, Dict
+
+from api_gateway.framework import (
+    NDJSON_MEDIA_TYPE,
+    App,
+    Router,
+    StreamingResponse,
+    TestClient,
+)
+from api_gateway.main import app as gateway_app
+from api_gateway.server import HttpServer
+
+
+def _request(
+    method: str, path: str, body: dict | None = None, *, close: bool = False
+) -> bytes:
+    raw = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(raw)}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode() + b"\r\n" + raw
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[int, dict, dict]:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    lines = head.split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {
+        k.lower(): v.strip()
+        for k, _, v in (line.partition(":") for line in lines[1:] if line)
+    }
+    body = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, json.loads(body)
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def _demo_app() -> tuple[App, dict]:
+    router = Router(prefix="/v1")
+    state = {"active": 0, "peak": 0}
+
+    @router.get("/echo")
+    def echo(value: str | None = None) -> dict:
+        return {"value": value}
+
+    @router.post("/slow")
+    async def slow(delay: float = 0.05, tag: str | None = None) -> dict:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delay)
+        state["active"] -= 1
+        return {"tag": tag}
+
+    @router.post("/fail")
+    def fail() -> dict:
+        raise RuntimeError("boom")
+
+    app = App()
+    app.include_router(router)
+    return app, state
+
+
+def test_keep_alive_serves_several_requests_on_one_connection() -> None:
+    async def scenario() -> list:
+        async with HttpServer(gateway_app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/v1/health"))
+            first = await _read_response(reader)
+            writer.write(
+                _request(
+                    "POST", "/v1/query", {"payload": {"query": "hola"}}, close=True
+                )
+            )
+            second = await _read_response(reader)
+            assert await reader.read() == b""
+            writer.close()
+            return [first, second]
+
+    (status, headers, health), (status2, headers2, answer) = _run(scenario())
+    assert status == 200 and health["status"] == "ok"
+    assert headers["connection"] == "keep-alive"
+    assert status2 == 200 and answer["answer"].endswith("hola")
+    assert headers2["connection"] == "close"
+
+
+def test_pipelined_requests_answer_in_order() -> None:
+    app, _ = _demo_app()
+
+    async def scenario() -> list:
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            # The first request is the slowest: responses must still be ordered.
+            writer.write(
+                _request("POST", "/v1/slow", {"delay": 0.1, "tag": "a"})
+                + _request("POST", "/v1/slow", {"delay": 0.0, "tag": "b"})
+                + _request("GET", "/v1/echo?value=c")
+            )
+            responses = [await _read_response(reader) for _ in range(3)]
+            writer.close()
+            return responses
+
+    responses = _run(scenario())
+    assert [body.get("tag", body.get("value")) for _, _, body in responses] == [
+        "a",
+        "b",
+        "c",
+    ]
+
+
+def test_concurrency_is_bounded() -> None:
+    app, state = _demo_app()
+
+    async def one(port: int, tag: str) -> int:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            _request("POST", "/v1/slow", {"delay": 0.02, "tag": tag}, close=True)
+        )
+        status, _, _ = await _read_response(reader)
+        writer.close()
+        return status
+
+    async def scenario() -> list:
+        async with HttpServer(app, port=0, max_concurrency=2) as server:
+            return await asyncio.gather(
+                *(one(server.port, str(index)) for index in range(8))
+            )
+
+    assert _run(scenario()) == [200] * 8
+    assert state["peak"] == 2
+
+
+def test_errors_map_to_status_codes() -> None:
+    app, _ = _demo_app()
+
+    async def scenario() -> list:
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/v1/missing") + _request("POST", "/v1/fail"))
+            responses = [await _read_response(reader) for _ in range(2)]
+            writer.write(b"POST /v1/echo HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}")
+            responses.append(await _read_response(reader))
+            writer.close()
+            return responses
+
+    statuses = [status for status, _, _ in _run(scenario())]
+    assert statuses == [404, 500, 400]
+
+
+def test_invalid_content_length_is_a_bad_request() -> None:
+    app, _ = _demo_app()
+
+    async def scenario(length: str) -> int:
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(
+                f"POST /v1/echo HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+            )
+            status, headers, _ = await _read_response(reader)
+            writer.close()
+            assert headers["connection"] == "close"
+            return status
+
+    assert [_run(scenario(length)) for length in ("abc", "-5", "+3")] == [400, 400, 400]
+
+
+def test_test_client_runs_async_handlers() -> None:
+    app, _ = _demo_app()
+    client = TestClient(app)
+    assert client.post("/v1/slow", json={"delay": 0.0, "tag": "x"}).json() == {
+        "tag": "x"
+    }
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> tuple[dict, bytes]:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    headers = {
+        k.lower(): v.strip()
+        for k, _, v in (line.partition(":") for line in head.split("\r\n")[1:] if line)
+    }
+    assert headers["transfer-encoding"] == "chunked"
+    body = b""
+    while True:
+        size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+        chunk = await reader.readexactly(size + 2)
+        if size == 0:
+            return headers, body
+        body += chunk[:-2]
+
+
+def _sse_events(body: bytes) -> list[tuple[str, object]]:
+    events = []
+    for block in body.decode().strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_query_streams_server_sent_events_over_keep_alive() -> None:
+    async def scenario() -> tuple:
+        async with HttpServer(gateway_app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(
+                _request(
+                    "POST",
+                    "/v1/query?stream=true",
+                    {"payload": {"query": "hola mundo"}},
+                )
+            )
+            headers, body = await _read_chunked(reader)
+            writer.write(_request("GET", "/v1/health", close=True))
+            status, _, _ = await _read_response(reader)
+            writer.close()
+            return headers, _sse_events(body), status
+
+    headers, events, status = _run(scenario())
+    assert headers["content-type"].startswith("text/event-stream")
+    assert (
+        "".join(data["text"] for name, data in events if name == "token")
+        == "Respuesta placeholder para: hola mundo"
+    )
+    assert [name for name, _ in events[-2:]] == ["citations", "done"]
+    assert status == 200
+
+
+def test_test_client_collects_streamed_events() -> None:
+    client = TestClient(gateway_app)
+    events = client.post(
+        "/v1/query", json={"payload": {"query": "x"}, "stream": True}
+    ).json()
+    assert events[0] == {"event": "token", "data": {"text": "Respuesta"}}
+    assert events[-1]["event"] == "done"
+
+
+def test_sync_generators_stream_as_ndjson() -> None:
+    router = Router()
+
+    @router.get("/count")
+    def count(limit: str = "3") -> StreamingResponse:
+        return StreamingResponse(
+            ({"n": n} for n in range(int(limit))), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    app = App()
+    app.include_router(router)
+
+    async def scenario() -> bytes:
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/count?limit=3", close=True))
+            _, body = await _read_chunked(reader)
+            writer.close()
+            return body
+
+    lines = [json.loads(line) for line in _run(scenario()).splitlines()]
+    assert lines == [{"event": "message", "data": {"n": n}} for n in range(3)]
+
+
+def test_client_disconnect_cancels_the_generator() -> None:
+    router = Router()
+    state: Dict[str, Any] = {"closed": None}
+
+    @router.get("/tokens")
+    async def tokens() -> StreamingResponse:
+        async def generate():
+            try:
+                yield "token", "first"
+                await asyncio.Event().wait()  # nunca llega el segundo token
+            finally:
+                state["closed"].set()
+
+        return StreamingResponse(generate())
+
+    app = App()
+    app.include_router(router)
+
+    async def scenario() -> None:
+        state["closed"] = asyncio.Event()
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/tokens"))
+            await reader.readuntil(b"\r\n\r\n")
+            await reader.readuntil(b"\n\n")
+            writer.close()
+            await asyncio.wait_for(state["closed"].wait(), 2)
+
+    _run(scenario())
+
+
+def test_slow_reader_applies_backpressure() -> None:
+    router = Router()
+    state: Dict[str, Any] = {"produced": 0, "closed": None}
+
+    @router.get("/firehose")
+    async def firehose() -> StreamingResponse:
+        async def generate():
+            try:
+                while True:
+                    state["produced"] += 1
+                    yield "x" * 65536
+            finally:
+                state["closed"].set()
+
+        return StreamingResponse(generate())
+
+    app = App()
+    app.include_router(router)
+
+    async def scenario() -> int:
+        state["closed"] = asyncio.Event()
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/firehose"))
+            await asyncio.sleep(0.3)
+            produced = state["produced"]
+            writer.close()
+            await asyncio.wait_for(state["closed"].wait(), 2)
+            return produced
+
+    # Sin backpressure el generador produciría miles de chunks en 0.3s.
+    assert 0 < _run(scenario()) < 500
+
+
+def test_route_latency_is_recorded_by_route_pattern() -> None:
+    from api_gateway.infra.observability import (
+        ROUTE_LATENCY,
+        STREAM_FIRST_EVENT,
+        render_metrics,
+    )
+
+    async def scenario() -> None:
+        async with HttpServer(gateway_app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/v1/health"))
+            await _read_response(reader)
+            writer.write(
+                _request(
+                    "POST",
+                    "/v1/query?stream=true",
+                    {"payload": {"query": "x"}},
+                    close=True,
+                )
+            )
+            await _read_chunked(reader)
+            writer.close()
+
+    _run(scenario())
+    routes = {snapshot.label: snapshot.count for snapshot in ROUTE_LATENCY.snapshot()}
+    assert routes["GET /v1/health"] >= 1
+    assert any(
+        snapshot.label == "POST /v1/query" for snapshot in STREAM_FIRST_EVENT.snapshot()
+    )
+    assert (
+        'http_request_duration_seconds_count{route="GET /v1/health"}'
+        in render_metrics()
+    )
+
+
+def test_pending_streams_are_closed_when_the_client_leaves() -> None:
+    router = Router()
+    state: Dict[str, Any] = {"closed": None, "pending_closed": None}
+
+    class _Events:
+        def __aiter__(self) -> "_Events":
+            return self
+
+        async def __anext__(self) -> str:
+            raise StopAsyncIteration
+
+        async def aclose(self) -> None:
+            state["pending_closed"].set()
+
+    @router.get("/tokens")
+    async def tokens() -> StreamingResponse:
+        async def generate():
+            try:
+                yield "token", "first"
+                await asyncio.Event().wait()
+            finally:
+                state["closed"].set()
+
+        return StreamingResponse(generate())
+
+    @router.get("/queued")
+    async def queued() -> StreamingResponse:
+        return StreamingResponse(_Events())
+
+    app = App()
+    app.include_router(router)
+
+    async def scenario() -> None:
+        state["closed"], state["pending_closed"] = asyncio.Event(), asyncio.Event()
+        async with HttpServer(app, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(_request("GET", "/tokens") + _request("GET", "/queued"))
+            await reader.readuntil(b"\r\n\r\n")
+            await reader.readuntil(b"\n\n")
+            await asyncio.sleep(0.05)  # la segunda respuesta ya está lista en cola
+            writer.close()
+            await asyncio.wait_for(state["closed"].wait(), 2)
+            await asyncio.wait_for(state["pending_closed"].wait(), 2)
+
+    _run(scenario())
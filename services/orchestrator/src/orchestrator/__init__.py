@@ -1,9 +1,24 @@
 """Orchestrator package public API."""
 
-from .admission import AdmissionController, AdmissionDecision, Quota
-from .gpu_governor import GovernorConfig, GovernorDecision, GpuGovernor, GpuMetrics
+from .admission import (
+    AdmissionController,
+    AdmissionDecision,
+    BucketArrays,
+    Quota,
+    QuotaChanges,
+)
+from .gpu_governor import (
+    FleetDecision,
+    FleetGovernor,
+    FleetSummary,
+    GovernorConfig,
+    GovernorDecision,
+    GpuGovernor,
+    GpuMetrics,
+)
 from .job_scheduler import (
     Allocation,
+    BatchPlacement,
     Gpu,
     Job,
     JobScheduler,
@@ -11,23 +26,30 @@ from .job_scheduler import (
     Slice,
     build_gpu_fleet,
 )
-from .queues import QueueManager, QueueSnapshot
+from .queues import AsyncQueueManager, QueueManager, QueueSnapshot
 
 __all__ = [
     "AdmissionController",
     "AdmissionDecision",
+    "BucketArrays",
     "Quota",
+    "QuotaChanges",
+    "FleetDecision",
+    "FleetGovernor",
+    "FleetSummary",
     "GovernorConfig",
     "GovernorDecision",
     "GpuGovernor",
     "GpuMetrics",
     "Allocation",
+    "BatchPlacement",
     "Gpu",
     "Job",
     "JobScheduler",
     "SchedulerConfig",
     "Slice",
     "build_gpu_fleet",
+    "AsyncQueueManager",
     "QueueManager",
     "QueueSnapshot",
 ]
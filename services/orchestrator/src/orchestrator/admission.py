@@ -5,7 +5,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from threading import Lock
 from time import monotonic
-from typing import Dict, Iterable, Mapping, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple, cast
+
+import numpy as np
 
 
 @dataclass(frozen=True)
@@ -25,14 +27,6 @@ class Quota:
             raise ValueError("max_inflight must be > 0")
 
 
-@dataclass
-class _BucketState:
-    quota: Quota
-    tokens: float
-    updated_at: float
-    inflight: int = 0
-
-
 class AdmissionDecision(Tuple[bool, str | None]):
     """Tuple tipado para el resultado."""
 
@@ -47,88 +41,359 @@ class AdmissionDecision(Tuple[bool, str | None]):
         return self[1]
 
 
+_ALLOWED = AdmissionDecision((True, None))
+_DENIED_INFLIGHT = AdmissionDecision((False, "max_inflight"))
+_DENIED_RATE = AdmissionDecision((False, "rate_limit"))
+
+
+@dataclass(frozen=True)
+class BucketArrays:
+    """Vista columnar de todos los buckets, alineada con ``keys``."""
+
+    keys: Tuple[Tuple[str, str], ...]
+    tokens: np.ndarray
+    max_tokens: np.ndarray
+    inflight: np.ndarray
+    max_inflight: np.ndarray
+
+
+class _BucketStore:
+    """Buckets en arrays paralelos indexados por un id interno.
+
+    Cada par ``(tenant, cola)`` se interna a un entero estable que indexa los
+    arrays ``tokens``, ``updated_at``, ``rate``, ``burst``, ``inflight`` y
+    ``max_inflight``, y la lista de locks por bucket. Los buckets eliminados
+    quedan como huecos inactivos: los ids nunca se reutilizan, de modo que un
+    id obtenido antes de una recarga nunca apunta a otro bucket.
+
+    ``lock`` protege la estructura (``keys``, ``active``, ``size`` y el
+    crecimiento de los arrays); se toma siempre antes que los locks de bucket.
+    """
+
+    _INITIAL_CAPACITY = 16
+    _COLUMNS = (
+        "tokens",
+        "updated_at",
+        "rate",
+        "burst",
+        "inflight",
+        "max_inflight",
+        "active",
+    )
+
+    def __init__(self) -> None:
+        self.index: Dict[str, Dict[str, int]] = {}
+        self.keys: List[Tuple[str, str] | None] = []
+        self.locks: List[Lock] = []
+        self.retired: set[Tuple[str, str]] = set()
+        self.lock = Lock()
+        self.size = 0
+        capacity = self._INITIAL_CAPACITY
+        self.tokens = np.zeros(capacity, dtype=np.float64)
+        self.updated_at = np.zeros(capacity, dtype=np.float64)
+        self.rate = np.zeros(capacity, dtype=np.float64)
+        self.burst = np.zeros(capacity, dtype=np.float64)
+        self.inflight = np.zeros(capacity, dtype=np.int64)
+        self.max_inflight = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=np.bool_)
+
+    def add(self, tenant: str, queue: str, quota: Quota, now: float) -> int:
+        if queue in self.index.get(tenant, {}):
+            raise ValueError(f"Duplicate quota for {tenant}/{queue}")
+        with self.lock:
+            if self.size == len(self.tokens):
+                self._grow()
+            bucket_id = self.size
+            self.locks.append(Lock())
+            self.keys.append((tenant, queue))
+            self.tokens[bucket_id] = quota.burst
+            self.updated_at[bucket_id] = now
+            self.rate[bucket_id] = quota.rate
+            self.burst[bucket_id] = quota.burst
+            self.inflight[bucket_id] = 0
+            self.max_inflight[bucket_id] = quota.max_inflight
+            self.active[bucket_id] = True
+            self.size += 1
+        # Se publica en el índice al final para que ningún lector vea un
+        # bucket a medio inicializar.
+        self.retired.discard((tenant, queue))
+        self.index.setdefault(tenant, {})[queue] = bucket_id
+        return bucket_id
+
+    def resize(self, bucket_id: int, quota: Quota, now: float) -> None:
+        """Aplica una cuota nueva conservando tokens e inflight (con el lock tomado)."""
+
+        self.refill(slice(bucket_id, bucket_id + 1), now)
+        self.rate[bucket_id] = quota.rate
+        self.burst[bucket_id] = quota.burst
+        self.max_inflight[bucket_id] = quota.max_inflight
+        self.tokens[bucket_id] = min(self.tokens[bucket_id], quota.burst)
+
+    def remove(self, tenant: str, queue: str) -> None:
+        tenant_index = self.index[tenant]
+        bucket_id = tenant_index[queue]
+        with self.lock, self.locks[bucket_id]:
+            del tenant_index[queue]
+            if not tenant_index:
+                del self.index[tenant]
+            self.keys[bucket_id] = None
+            self.active[bucket_id] = False
+            self.retired.add((tenant, queue))
+
+    def quota(self, bucket_id: int) -> Quota:
+        return Quota(
+            rate=float(self.rate[bucket_id]),
+            burst=int(self.burst[bucket_id]),
+            max_inflight=int(self.max_inflight[bucket_id]),
+        )
+
+    def refill(self, ids: np.ndarray | slice, now: float) -> None:
+        """Recarga en una sola operación vectorizada los buckets ``ids``."""
+
+        updated_at = self.updated_at[ids]
+        elapsed = np.maximum(0.0, now - updated_at)
+        self.tokens[ids] = np.minimum(
+            self.burst[ids], self.tokens[ids] + elapsed * self.rate[ids]
+        )
+        self.updated_at[ids] = np.maximum(updated_at, now)
+
+    def arrays(self, now: float) -> BucketArrays:
+        # Claves y columnas se copian bajo el mismo lock para que una recarga
+        # concurrente no las desalinee.
+        with self.lock:
+            live = np.flatnonzero(self.active[: self.size])
+            keys = tuple(key for key in self.keys[: self.size] if key is not None)
+            updated_at = self.updated_at[live]
+            tokens = self.tokens[live]
+            rate = self.rate[live]
+            burst = self.burst[live]
+            inflight = self.inflight[live]
+            max_inflight = self.max_inflight[live]
+        elapsed = np.maximum(0.0, now - updated_at)
+        return BucketArrays(
+            keys=keys,
+            tokens=np.minimum(burst, tokens + elapsed * rate),
+            max_tokens=burst,
+            inflight=inflight,
+            max_inflight=max_inflight,
+        )
+
+    def _grow(self) -> None:
+        # Copiar los arrays con todos los locks tomados evita perder
+        # escrituras concurrentes sobre la versión antigua.
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            capacity = len(self.tokens) * 2
+            for name in self._COLUMNS:
+                current = getattr(self, name)
+                grown = np.zeros(capacity, dtype=current.dtype)
+                grown[: len(current)] = current
+                setattr(self, name, grown)
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
+
+@dataclass(frozen=True)
+class QuotaChanges:
+    """Resumen de una recarga incremental de cuotas."""
+
+    added: Tuple[Tuple[str, str], ...] = ()
+    removed: Tuple[Tuple[str, str], ...] = ()
+    resized: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed or self.resized)
+
+
 class AdmissionController:
-    """Gestor de cuotas por tenant y cola."""
+    """Gestor de cuotas por tenant y cola.
+
+    El estado vive en un :class:`_BucketStore` columnar y cada bucket tiene su
+    propio lock: las solicitudes de tenants o colas distintas no compiten entre
+    sí. El índice ``tenant -> cola -> id`` se consulta sin bloqueo; sólo
+    :meth:`apply_quotas` lo modifica, publicando cada bucket nuevo una vez
+    inicializado.
+    """
 
     def __init__(self, quotas: Mapping[str, Mapping[str, Quota]]) -> None:
         if not quotas:
             raise ValueError("At least one tenant quota is required")
-        self._buckets: Dict[str, Dict[str, _BucketState]] = {}
+        store = _BucketStore()
         now = monotonic()
         for tenant, queues in quotas.items():
             if not queues:
                 raise ValueError(f"Tenant '{tenant}' must define at least one queue")
-            tenant_buckets: Dict[str, _BucketState] = {}
             for queue, quota in queues.items():
-                tenant_buckets[queue] = _BucketState(quota=quota, tokens=quota.burst, updated_at=now)
-            self._buckets[tenant] = tenant_buckets
-        self._lock = Lock()
+                store.add(tenant, queue, quota, now)
+        self._store = store
+        self._reload_lock = Lock()
 
     @classmethod
     def from_dict(cls, config: Iterable[Mapping[str, object]]) -> "AdmissionController":
         """Construye el controlador a partir de la estructura de YAML."""
 
+        store = _BucketStore()
+        now = monotonic()
+        for tenant, queue, quota in _iter_quotas(config):
+            store.add(tenant, queue, quota, now)
+        if not store.size:
+            raise ValueError("At least one tenant quota is required")
+        controller = cls.__new__(cls)
+        controller._store = store
+        controller._reload_lock = Lock()
+        return controller
+
+    def apply_quotas(
+        self,
+        quotas: Mapping[str, Mapping[str, Quota]],
+        *,
+        now: float | None = None,
+    ) -> QuotaChanges:
+        """Aplica una tabla de cuotas nueva sin reconstruir el controlador.
+
+        Los buckets nuevos se crean llenos, los que desaparecen se retiran y
+        los que cambian de cuota conservan sus tokens (recortados al nuevo
+        ``burst``) y su contador de inflight. Cada bucket se bloquea sólo
+        mientras se modifica; el resto sigue admitiendo tráfico.
+        """
+
+        if not quotas:
+            raise ValueError("At least one tenant quota is required")
+        for tenant, queues in quotas.items():
+            if not queues:
+                raise ValueError(f"Tenant '{tenant}' must define at least one queue")
+        now_monotonic = monotonic() if now is None else now
+        added: List[Tuple[str, str]] = []
+        removed: List[Tuple[str, str]] = []
+        resized: List[Tuple[str, str]] = []
+        store = self._store
+        with self._reload_lock:
+            for tenant, buckets in list(store.index.items()):
+                for queue in list(buckets):
+                    if queue not in quotas.get(tenant, {}):
+                        store.remove(tenant, queue)
+                        removed.append((tenant, queue))
+            for tenant, queues in quotas.items():
+                for queue, quota in queues.items():
+                    bucket_id = store.index.get(tenant, {}).get(queue)
+                    if bucket_id is None:
+                        store.add(tenant, queue, quota, now_monotonic)
+                        added.append((tenant, queue))
+                        continue
+                    with store.locks[bucket_id]:
+                        if store.quota(bucket_id) == quota:
+                            continue
+                        store.resize(bucket_id, quota, now_monotonic)
+                    resized.append((tenant, queue))
+        return QuotaChanges(tuple(added), tuple(removed), tuple(resized))
+
+    def apply_config(
+        self,
+        config: Iterable[Mapping[str, object]],
+        *,
+        now: float | None = None,
+    ) -> QuotaChanges:
+        """Como :meth:`apply_quotas` pero a partir de la estructura de YAML."""
+
         quotas: Dict[str, Dict[str, Quota]] = {}
-        for entry in config:
-            tenant = str(entry.get("tenant"))
-            if not tenant:
-                raise ValueError("Missing tenant identifier")
-            queues_conf = {k: v for k, v in entry.items() if k != "tenant"}
-            queue_quotas: Dict[str, Quota] = {}
-            for queue_name, raw in queues_conf.items():
-                if not isinstance(raw, Mapping):
-                    raise TypeError(f"Quota for {tenant}/{queue_name} must be a mapping")
-                quota = Quota(
-                    rate=float(raw.get("rate", 0)),
-                    burst=int(raw.get("burst", 0)),
-                    max_inflight=int(raw.get("max_inflight", 0)),
-                )
-                queue_quotas[queue_name] = quota
-            quotas[tenant] = queue_quotas
-        return cls(quotas)
-
-    def allow(self, tenant: str, queue: str, *, weight: int = 1, now: float | None = None) -> AdmissionDecision:
+        for tenant, queue, quota in _iter_quotas(config):
+            quotas.setdefault(tenant, {})[queue] = quota
+        return self.apply_quotas(quotas, now=now)
+
+    def allow(
+        self, tenant: str, queue: str, *, weight: int = 1, now: float | None = None
+    ) -> AdmissionDecision:
         """Evalúa si se puede admitir otra solicitud."""
 
         now_monotonic = monotonic() if now is None else now
-        with self._lock:
-            bucket = self._get_bucket(tenant, queue)
-            self._refill(bucket, now_monotonic)
-            if bucket.inflight >= bucket.quota.max_inflight:
-                return AdmissionDecision((False, "max_inflight"))
-            if bucket.tokens < weight:
-                return AdmissionDecision((False, "rate_limit"))
-            bucket.tokens -= weight
-            bucket.inflight += 1
-            return AdmissionDecision((True, None))
+        bucket_id = self._get_bucket(tenant, queue)
+        with self._store.locks[bucket_id]:
+            self._refill_one(bucket_id, now_monotonic)
+            return self._admit(bucket_id, weight)
+
+    def allow_many(
+        self,
+        requests: Sequence[Tuple[str, str, int]],
+        *,
+        now: float | None = None,
+    ) -> List[AdmissionDecision]:
+        """Evalúa un lote de solicitudes ``(tenant, cola, peso)``.
+
+        Las solicitudes se agrupan por bucket; los locks implicados se toman
+        una sola vez, en orden de id para evitar interbloqueos, y la recarga
+        de todos ellos es una única operación vectorizada. Dentro de un bucket
+        se respeta el orden recibido. Devuelve las decisiones en el mismo
+        orden que ``requests``.
+        """
+
+        now_monotonic = monotonic() if now is None else now
+        grouped: Dict[int, List[int]] = {}
+        for index, (tenant, queue, _) in enumerate(requests):
+            grouped.setdefault(self._get_bucket(tenant, queue), []).append(index)
+        bucket_ids = sorted(grouped)
+        locks = [self._store.locks[bucket_id] for bucket_id in bucket_ids]
+        decisions: List[AdmissionDecision | None] = [None] * len(requests)
+        for lock in locks:
+            lock.acquire()
+        try:
+            self._store.refill(np.asarray(bucket_ids, dtype=np.intp), now_monotonic)
+            for bucket_id in bucket_ids:
+                for index in grouped[bucket_id]:
+                    decisions[index] = self._admit(bucket_id, requests[index][2])
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        return cast(List[AdmissionDecision], decisions)
 
     def release(self, tenant: str, queue: str, *, weight: int = 1) -> None:
         """Reduce el contador de concurrencia tras completar un trabajo."""
 
-        with self._lock:
-            bucket = self._get_bucket(tenant, queue)
-            bucket.inflight = max(0, bucket.inflight - weight)
+        store = self._store
+        if (
+            queue not in store.index.get(tenant, {})
+            and (tenant, queue) in store.retired
+        ):
+            # El bucket se retiró en una recarga con trabajos aún en curso.
+            return
+        bucket_id = self._get_bucket(tenant, queue)
+        with store.locks[bucket_id]:
+            store.inflight[bucket_id] = max(0, int(store.inflight[bucket_id]) - weight)
+
+    def snapshot_arrays(self, *, now: float | None = None) -> BucketArrays:
+        """Estado de todos los buckets como arrays, sin construir diccionarios.
+
+        Los tokens se proyectan a ``now`` de forma vectorizada sin modificar el
+        estado; pensado para scrapes con miles de tenants.
+        """
+
+        return self._store.arrays(monotonic() if now is None else now)
 
     def snapshot(self) -> Dict[str, Dict[str, dict[str, float]]]:
         """Devuelve estadísticas actuales para observabilidad."""
 
-        with self._lock:
-            snapshot: Dict[str, Dict[str, dict[str, float]]] = {}
-            for tenant, queues in self._buckets.items():
-                tenant_view: Dict[str, dict[str, float]] = {}
-                for queue, bucket in queues.items():
-                    tenant_view[queue] = {
-                        "tokens": bucket.tokens,
-                        "max_tokens": bucket.quota.burst,
-                        "inflight": float(bucket.inflight),
-                        "max_inflight": float(bucket.quota.max_inflight),
-                    }
-                snapshot[tenant] = tenant_view
-            return snapshot
-
-    def _get_bucket(self, tenant: str, queue: str) -> _BucketState:
+        arrays = self.snapshot_arrays()
+        snapshot: Dict[str, Dict[str, dict[str, float]]] = {}
+        for (tenant, queue), tokens, max_tokens, inflight, max_inflight in zip(
+            arrays.keys,
+            arrays.tokens.tolist(),
+            arrays.max_tokens.tolist(),
+            arrays.inflight.tolist(),
+            arrays.max_inflight.tolist(),
+        ):
+            snapshot.setdefault(tenant, {})[queue] = {
+                "tokens": tokens,
+                "max_tokens": max_tokens,
+                "inflight": float(inflight),
+                "max_inflight": float(max_inflight),
+            }
+        return snapshot
+
+    def _get_bucket(self, tenant: str, queue: str) -> int:
         try:
-            tenant_buckets = self._buckets[tenant]
+            tenant_buckets = self._store.index[tenant]
         except KeyError as exc:  # pragma: no cover - defensa
             raise KeyError(f"Unknown tenant '{tenant}'") from exc
         try:
@@ -136,13 +401,53 @@ class AdmissionController:
         except KeyError as exc:  # pragma: no cover - defensa
             raise KeyError(f"Unknown queue '{queue}' for tenant '{tenant}'") from exc
 
-    @staticmethod
-    def _refill(bucket: _BucketState, now: float) -> None:
-        elapsed = max(0.0, now - bucket.updated_at)
-        if not elapsed:
+    def _admit(self, bucket_id: int, weight: int) -> AdmissionDecision:
+        store = self._store
+        if store.inflight[bucket_id] >= store.max_inflight[bucket_id]:
+            return _DENIED_INFLIGHT
+        if store.tokens[bucket_id] < weight:
+            return _DENIED_RATE
+        store.tokens[bucket_id] -= weight
+        store.inflight[bucket_id] += 1
+        return _ALLOWED
+
+    def _refill_one(self, bucket_id: int, now: float) -> None:
+        store = self._store
+        elapsed = now - store.updated_at[bucket_id]
+        if elapsed <= 0:
             return
-        bucket.tokens = min(bucket.quota.burst, bucket.tokens + elapsed * bucket.quota.rate)
-        bucket.updated_at = now
+        store.tokens[bucket_id] = min(
+            store.burst[bucket_id],
+            store.tokens[bucket_id] + elapsed * store.rate[bucket_id],
+        )
+        store.updated_at[bucket_id] = now
+
+
+def _iter_quotas(
+    config: Iterable[Mapping[str, object]],
+) -> Iterator[Tuple[str, str, Quota]]:
+    for entry in config:
+        tenant = str(entry.get("tenant"))
+        if not tenant:
+            raise ValueError("Missing tenant identifier")
+        queues_conf = {k: v for k, v in entry.items() if k != "tenant"}
+        if not queues_conf:
+            raise ValueError(f"Tenant '{tenant}' must define at least one queue")
+        for queue_name, raw in queues_conf.items():
+            if not isinstance(raw, Mapping):
+                raise TypeError(f"Quota for {tenant}/{queue_name} must be a mapping")
+            quota = Quota(
+                rate=float(raw.get("rate", 0)),
+                burst=int(raw.get("burst", 0)),
+                max_inflight=int(raw.get("max_inflight", 0)),
+            )
+            yield tenant, queue_name, quota
 
 
-__all__ = ["AdmissionController", "Quota", "AdmissionDecision"]
+__all__ = [
+    "AdmissionController",
+    "Quota",
+    "AdmissionDecision",
+    "BucketArrays",
+    "QuotaChanges",
+]
@@ -0,0 +1,434 @@
+"""Offline auto-tuning of the :class:`~orchestrator.gpu_governor.GpuGovernor` gains.
+
+A trace is a sequence of :class:`TraceSample` (recorded ``GpuMetrics`` or a
+bursty synthetic profile). Each candidate ``(kp, ki, kd, kf)`` is replayed
+through :meth:`GpuGovernor.update` in closed loop against a first-order plant:
+
+* the recorded utilisation is treated as the demand at nominal concurrency;
+  the device converges to ``min(1, demand * concurrency_scale)`` with time
+  constant ``tau``;
+* backlog grows with unserved demand and drains with spare capacity, so the
+  feed-forward term sees the consequences of the gains;
+* temperature and memory are replayed as recorded, so thermal clamps happen
+  where they happened in production.
+
+Candidates are scored on settling time (mean length of excursions outside
+``target_util ± band``), overshoot (mean utilisation above the band) and
+throughput lost while the governor was clamped to ``min_scale``. The search
+(grid, random or Bayesian with a small Gaussian-process surrogate) runs the
+replays in a process pool and returns a :class:`TuningReport` with the
+recommended :class:`~orchestrator.gpu_governor.GovernorConfig`.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .gpu_governor import GovernorConfig, GpuGovernor, GpuMetrics
+
+_GAINS = ("kp", "ki", "kd", "kf")
+_METHODS = ("grid", "random", "bayes")
+
+
+@dataclass(frozen=True)
+class TraceSample:
+    """A timestamped metrics sample of one GPU."""
+
+    timestamp: float
+    metrics: GpuMetrics
+
+
+@dataclass(frozen=True)
+class PlantModel:
+    """Closed-loop response used while replaying a trace."""
+
+    tau: float = 4.0
+    backlog_per_unit: float = 40.0
+    band: float = 0.05
+
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    settling: float = 1.0
+    overshoot: float = 20.0
+    clamp_loss: float = 50.0
+
+
+@dataclass(frozen=True)
+class SearchSpace:
+    """Inclusive ``(low, high)`` bounds for each gain."""
+
+    kp: Tuple[float, float] = (0.1, 1.5)
+    ki: Tuple[float, float] = (0.0, 0.8)
+    kd: Tuple[float, float] = (0.0, 0.5)
+    kf: Tuple[float, float] = (0.0, 1.0)
+
+    def bounds(self) -> np.ndarray:
+        return np.array([getattr(self, gain) for gain in _GAINS], dtype=float)
+
+
+@dataclass(frozen=True)
+class TrialResult:
+    gains: Dict[str, float]
+    settling_time: float
+    overshoot: float
+    clamp_loss: float
+    mean_abs_error: float
+    score: float
+
+
+@dataclass(frozen=True)
+class TuningReport:
+    method: str
+    recommended: GovernorConfig
+    baseline: TrialResult
+    best: TrialResult
+    trials: Tuple[TrialResult, ...] = field(repr=False)
+
+    @property
+    def improvement(self) -> float:
+        """Relative score reduction of ``best`` over ``baseline``."""
+
+        if self.baseline.score <= 0:
+            return 0.0
+        return 1.0 - self.best.score / self.baseline.score
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "method": self.method,
+            "recommended": {gain: getattr(self.recommended, gain) for gain in _GAINS},
+            "improvement": self.improvement,
+            "baseline": asdict(self.baseline),
+            "best": asdict(self.best),
+            "trials": [asdict(trial) for trial in self.trials],
+        }
+
+    def to_text(self, top: int = 5) -> str:
+        lines = [
+            f"method={self.method} trials={len(self.trials)} improvement={self.improvement:.1%}",
+            f"{'':<10} {'kp':>6} {'ki':>6} {'kd':>6} {'kf':>6} "
+            f"{'settle':>8} {'over':>7} {'clamp':>7} {'score':>8}",
+        ]
+        rows = [("baseline", self.baseline)]
+        rows += [(f"#{rank}", trial) for rank, trial in enumerate(self.trials[:top], 1)]
+        for label, trial in rows:
+            gains = " ".join(f"{trial.gains[gain]:>6.3f}" for gain in _GAINS)
+            lines.append(
+                f"{label:<10} {gains} {trial.settling_time:>8.2f} {trial.overshoot:>7.4f} "
+                f"{trial.clamp_loss:>7.4f} {trial.score:>8.3f}"
+            )
+        return "\n".join(lines)
+
+
+def load_trace(path: str | Path) -> List[TraceSample]:
+    """Read a JSONL trace: one object per line with ``timestamp`` plus every ``GpuMetrics`` field."""
+
+    samples: List[TraceSample] = []
+    with Path(path).open("r", encoding="utf-8") as fh:
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            try:
+                timestamp = float(record.pop("timestamp"))
+                samples.append(TraceSample(timestamp, GpuMetrics(**record)))
+            except (KeyError, TypeError) as exc:
+                raise ValueError(f"{path}:{number}: invalid trace record") from exc
+    if len(samples) < 2:
+        raise ValueError("A trace needs at least two samples")
+    return samples
+
+
+def synthetic_trace(
+    *,
+    seconds: float = 600.0,
+    interval: float = 1.0,
+    base_load: float = 0.55,
+    burst_load: float = 1.1,
+    burst_probability: float = 0.03,
+    mean_burst_seconds: float = 20.0,
+    seed: int = 0,
+) -> List[TraceSample]:
+    """Bursty on/off demand with heat that follows the load."""
+
+    rng = random.Random(seed)
+    samples: List[TraceSample] = []
+    bursting = False
+    temperature = 60.0
+    for step in range(int(seconds / interval)):
+        if bursting:
+            bursting = rng.random() >= interval / mean_burst_seconds
+        else:
+            bursting = rng.random() < burst_probability * interval
+        demand = (burst_load if bursting else base_load) * rng.uniform(0.9, 1.1)
+        temperature += (55.0 + 28.0 * min(demand, 1.2) - temperature) * min(
+            1.0, interval / 30.0
+        )
+        samples.append(
+            TraceSample(
+                step * interval,
+                GpuMetrics(
+                    utilisation=demand,
+                    memory_utilisation=0.5 + 0.3 * min(demand, 1.0),
+                    temperature=temperature,
+                    backlog=0.0,
+                    concurrency=8,
+                    backlog_target=32.0,
+                    micro_batch=4,
+                    max_new_tokens=1024,
+                ),
+            )
+        )
+    return samples
+
+
+def simulate(
+    config: GovernorConfig,
+    trace: Sequence[TraceSample],
+    *,
+    plant: PlantModel | None = None,
+    weights: ScoreWeights | None = None,
+) -> TrialResult:
+    """Replay ``trace`` through a fresh governor in closed loop and score it."""
+
+    plant = plant or PlantModel()
+    weights = weights or ScoreWeights()
+    governor = GpuGovernor(config)
+    target = config.target_util
+    first = trace[0]
+    utilisation = min(1.0, first.metrics.utilisation)
+    backlog = first.metrics.backlog
+    scale = 1.0
+    outside = 0.0
+    excursions = 0
+    was_outside = False
+    overshoot = 0.0
+    abs_error = 0.0
+    demand_total = 0.0
+    clamp_loss = 0.0
+    duration = 0.0
+    previous = first.timestamp
+    for sample in trace:
+        dt = max(0.0, sample.timestamp - previous)
+        previous = sample.timestamp
+        demand = sample.metrics.utilisation
+        if dt:
+            response = 1.0 - math.exp(-dt / plant.tau)
+            utilisation += (min(1.0, demand * scale) - utilisation) * response
+            backlog = max(
+                0.0, backlog + (demand - utilisation) * plant.backlog_per_unit * dt
+            )
+            duration += dt
+            deviation = utilisation - target
+            abs_error += abs(deviation) * dt
+            overshoot += max(0.0, deviation - plant.band) * dt
+            is_outside = abs(deviation) > plant.band
+            if is_outside:
+                outside += dt
+                excursions += not was_outside
+            was_outside = is_outside
+            demand_total += min(1.0, demand) * dt
+        decision = governor.update(
+            replace(sample.metrics, utilisation=utilisation, backlog=backlog),
+            now=sample.timestamp,
+        )
+        if dt and scale <= config.min_scale:
+            clamp_loss += max(0.0, min(1.0, demand) - utilisation) * dt
+        scale = decision.concurrency_scale
+    duration = max(duration, 1e-9)
+    settling = outside / excursions if excursions else 0.0
+    overshoot /= duration
+    clamp_loss = clamp_loss / demand_total if demand_total else 0.0
+    score = (
+        weights.settling * settling
+        + weights.overshoot * overshoot
+        + weights.clamp_loss * clamp_loss
+    )
+    return TrialResult(
+        gains={gain: getattr(config, gain) for gain in _GAINS},
+        settling_time=settling,
+        overshoot=overshoot,
+        clamp_loss=clamp_loss,
+        mean_abs_error=abs_error / duration,
+        score=score,
+    )
+
+
+def tune(
+    trace: Sequence[TraceSample],
+    *,
+    method: str = "random",
+    budget: int = 64,
+    base: GovernorConfig | None = None,
+    space: SearchSpace | None = None,
+    plant: PlantModel | None = None,
+    weights: ScoreWeights | None = None,
+    workers: int | None = None,
+    seed: int = 0,
+) -> TuningReport:
+    """Search the gain space and recommend a config for ``trace``.
+
+    ``workers`` is the process-pool size (``None`` uses every CPU, ``0`` or
+    ``1`` evaluates in-process); each worker receives the trace once, when
+    it starts. ``grid`` uses ``floor(budget ** 0.25)`` points per gain (at
+    least two) and, when that grid exceeds ``budget``, evaluates ``budget``
+    evenly spaced points of it; ``bayes`` starts with a quarter of the budget at random
+    and then proposes batches by expected improvement.
+    """
+
+    if method not in _METHODS:
+        raise ValueError(f"Unknown search method '{method}'")
+    if budget <= 0:
+        raise ValueError("budget must be > 0")
+    base = base or GovernorConfig()
+    space = space or SearchSpace()
+    bounds = space.bounds()
+    rng = np.random.default_rng(seed)
+    batch = (os.cpu_count() or 1) if workers is None else max(1, workers)
+    pool: Executor | None = None
+    if batch > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=batch,
+            initializer=_init_worker,
+            initargs=(tuple(trace), plant, weights),
+        )
+
+    def evaluate(points: np.ndarray) -> List[TrialResult]:
+        configs = [_with_gains(base, point) for point in points]
+        if pool is None:
+            return [
+                simulate(config, trace, plant=plant, weights=weights)
+                for config in configs
+            ]
+        return list(pool.map(_run_trial, configs))
+
+    try:
+        baseline = simulate(base, trace, plant=plant, weights=weights)
+        if method == "grid":
+            steps = max(2, int(budget**0.25 + 1e-9))
+            axes = [np.linspace(low, high, steps) for low, high in bounds]
+            grid = np.array(list(product(*axes)))
+            if len(grid) > budget:
+                grid = grid[np.linspace(0, len(grid) - 1, budget).round().astype(int)]
+            trials = evaluate(grid)
+        elif method == "random":
+            trials = evaluate(_sample(rng, bounds, budget))
+        else:
+            initial = min(budget, max(4, budget // 4))
+            points = _sample(rng, bounds, initial)
+            trials = evaluate(points)
+            while len(trials) < budget:
+                count = min(batch, budget - len(trials))
+                scores = np.array([trial.score for trial in trials])
+                proposals = _propose(rng, bounds, points, scores, count)
+                points = np.vstack([points, proposals])
+                trials += evaluate(proposals)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    ranked = tuple(sorted(trials, key=lambda trial: trial.score))
+    best = ranked[0] if ranked[0].score < baseline.score else baseline
+    return TuningReport(
+        method=method,
+        recommended=_with_gains(base, [best.gains[gain] for gain in _GAINS]),
+        baseline=baseline,
+        best=best,
+        trials=ranked,
+    )
+
+
+# Trace, plant and weights of the current pool worker, set by ``_init_worker``.
+_worker_context: (
+    Tuple[Sequence[TraceSample], PlantModel | None, ScoreWeights | None] | None
+) = None
+
+
+def _init_worker(
+    trace: Sequence[TraceSample], plant: PlantModel | None, weights: ScoreWeights | None
+) -> None:
+    global _worker_context
+    _worker_context = (trace, plant, weights)
+
+
+def _run_trial(config: GovernorConfig) -> TrialResult:
+    assert _worker_context is not None, "worker started without _init_worker"
+    trace, plant, weights = _worker_context
+    return simulate(config, trace, plant=plant, weights=weights)
+
+
+def _with_gains(base: GovernorConfig, point: Iterable[float]) -> GovernorConfig:
+    kp, ki, kd, kf = (float(value) for value in point)
+    return replace(base, kp=kp, ki=ki, kd=kd, kf=kf)
+
+
+def _sample(rng: np.random.Generator, bounds: np.ndarray, count: int) -> np.ndarray:
+    return rng.uniform(bounds[:, 0], bounds[:, 1], size=(count, len(bounds)))
+
+
+def _propose(
+    rng: np.random.Generator,
+    bounds: np.ndarray,
+    points: np.ndarray,
+    scores: np.ndarray,
+    count: int,
+    *,
+    candidates: int = 512,
+) -> np.ndarray:
+    """Pick ``count`` points by expected improvement under an RBF Gaussian process."""
+
+    width = np.where(bounds[:, 1] > bounds[:, 0], bounds[:, 1] - bounds[:, 0], 1.0)
+    observed = (points - bounds[:, 0]) / width
+    mean, std = scores.mean(), scores.std() or 1.0
+    targets = (scores - mean) / std
+    pool = rng.uniform(size=(candidates, len(bounds)))
+    # Half of the pool explores around the incumbent.
+    incumbent = observed[np.argmin(targets)]
+    local = incumbent + rng.normal(0.0, 0.1, size=(candidates // 2, len(bounds)))
+    pool[: candidates // 2] = np.clip(local, 0.0, 1.0)
+
+    length = 0.25
+    noise = 1e-4
+
+    def kernel(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        distance = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+        return np.exp(-0.5 * distance / length**2)
+
+    gram = kernel(observed, observed) + noise * np.eye(len(observed))
+    cholesky = np.linalg.cholesky(gram)
+    alpha = np.linalg.solve(cholesky.T, np.linalg.solve(cholesky, targets))
+    cross = kernel(pool, observed)
+    predicted = cross @ alpha
+    solved = np.linalg.solve(cholesky, cross.T)
+    sigma = np.sqrt(np.maximum(1.0 - (solved**2).sum(axis=0), 1e-12))
+    improvement = targets.min() - predicted
+    z = improvement / sigma
+    cdf = 0.5 * (1.0 + np.vectorize(math.erf)(z / math.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z**2) / math.sqrt(2.0 * math.pi)
+    expected = improvement * cdf + sigma * pdf
+    chosen = pool[np.argsort(-expected)[:count]]
+    return bounds[:, 0] + chosen * width
+
+
+__all__ = [
+    "PlantModel",
+    "ScoreWeights",
+    "SearchSpace",
+    "TraceSample",
+    "TrialResult",
+    "TuningReport",
+    "load_trace",
+    "simulate",
+    "synthetic_trace",
+    "tune",
+]
@@ -11,6 +11,12 @@ The implementation models the behaviour described in the programme playbook:
 * return actionable levers for the orchestrator: concurrency scaling,
   micro-batch size, ``max_new_tokens`` and queues that should be paused.
 
+:class:`FleetGovernor` runs the same loop for every device of a fleet. The
+per-device state lives in NumPy arrays so a whole-fleet update is a single
+vectorised step; it also derives a placement ``pressure`` per device that
+:class:`~orchestrator.job_scheduler.JobScheduler` uses to steer new work away
+from GPUs that are approaching their thermal or memory limits.
+
 The module is intentionally framework-agnostic so it can be used both in
 the orchestrator service and in offline simulations.
 """
@@ -20,6 +26,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 from math import inf
 from time import monotonic
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .job_scheduler import JobScheduler
 
 
 @dataclass(frozen=True)
@@ -42,6 +54,8 @@ class GovernorConfig:
     base_max_new_tokens: int = 2048
     min_max_new_tokens: int = 256
     pause_queues_on_hot: tuple[str, ...] = ("batch", "eval")
+    thermal_margin: float = 6.0
+    memory_margin: float = 0.1
 
 
 @dataclass(frozen=True)
@@ -83,7 +97,9 @@ class GpuGovernor:
         self._last_error = 0.0
         self._last_time = None
 
-    def update(self, metrics: GpuMetrics, *, now: float | None = None) -> GovernorDecision:
+    def update(
+        self, metrics: GpuMetrics, *, now: float | None = None
+    ) -> GovernorDecision:
         """Run the control loop and return a :class:`GovernorDecision`."""
 
         if metrics.backlog_target <= 0:
@@ -114,7 +130,10 @@ class GpuGovernor:
 
         divert = False
         pause_queues: tuple[str, ...] = ()
-        if metrics.memory_utilisation >= cfg.max_memory or metrics.temperature >= cfg.max_temperature:
+        if (
+            metrics.memory_utilisation >= cfg.max_memory
+            or metrics.temperature >= cfg.max_temperature
+        ):
             # Clamp hard to avoid OOM/thermal trips and signal the orchestrator.
             scale = cfg.min_scale
             divert = True
@@ -143,6 +162,208 @@ class GpuGovernor:
         )
 
 
+@dataclass(frozen=True)
+class FleetSummary:
+    """Fleet-level view of a :class:`FleetGovernor` step."""
+
+    devices: int
+    mean_utilisation: float
+    mean_scale: float
+    max_temperature: float
+    hottest: str | None
+    total_backlog: float
+    diverted: tuple[str, ...]
+    pressured: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class FleetDecision:
+    """Per-GPU decisions plus placement pressure and a fleet summary."""
+
+    decisions: Mapping[str, GovernorDecision]
+    pressure: Mapping[str, float]
+    summary: FleetSummary
+
+
+class FleetGovernor:
+    """One PID+feed-forward loop per GPU, updated as a single array step.
+
+    For each device the step is equivalent to :meth:`GpuGovernor.update`
+    with the shared :class:`GovernorConfig`. Devices missing from a metrics
+    batch keep their state untouched.
+    """
+
+    def __init__(
+        self, gpu_ids: Iterable[str], config: GovernorConfig | None = None
+    ) -> None:
+        self._ids = list(gpu_ids)
+        if not self._ids:
+            raise ValueError("At least one GPU must be declared")
+        self._positions = {
+            gpu_id: position for position, gpu_id in enumerate(self._ids)
+        }
+        if len(self._positions) != len(self._ids):
+            raise ValueError("GPU ids must be unique")
+        self._config = config or GovernorConfig()
+        size = len(self._ids)
+        self._integral = np.zeros(size)
+        self._last_error = np.zeros(size)
+        # NaN marks a device that has not been updated yet.
+        self._last_time = np.full(size, np.nan)
+
+    @property
+    def gpu_ids(self) -> tuple[str, ...]:
+        return tuple(self._ids)
+
+    def reset(self, gpu_id: str | None = None) -> None:
+        index: int | slice = slice(None) if gpu_id is None else self._position(gpu_id)
+        self._integral[index] = 0.0
+        self._last_error[index] = 0.0
+        self._last_time[index] = np.nan
+
+    def update(
+        self,
+        metrics: Mapping[str, GpuMetrics],
+        *,
+        now: float | None = None,
+        scheduler: "JobScheduler | None" = None,
+    ) -> FleetDecision:
+        """Run one control step for every device in ``metrics``.
+
+        When ``scheduler`` is given, each device's temperature and pressure
+        are pushed to it so placement reacts in the same step. Measured
+        utilisation is not: the scheduler keeps its own placement accounting.
+        """
+
+        if not metrics:
+            raise ValueError("metrics must not be empty")
+        cfg = self._config
+        timestamp = monotonic() if now is None else now
+        ids = list(metrics)
+        if scheduler is not None:
+            known = set(scheduler.gpu_ids)
+            for gpu_id in ids:
+                if gpu_id not in known:
+                    raise KeyError(f"Unknown GPU '{gpu_id}' in scheduler")
+        rows = np.fromiter(
+            (self._position(gpu_id) for gpu_id in ids), dtype=np.intp, count=len(ids)
+        )
+        samples = [metrics[gpu_id] for gpu_id in ids]
+        (
+            utilisation,
+            memory,
+            temperature,
+            backlog,
+            backlog_target,
+            micro_batch,
+            max_new_tokens,
+        ) = np.array(
+            [
+                (
+                    sample.utilisation,
+                    sample.memory_utilisation,
+                    sample.temperature,
+                    sample.backlog,
+                    sample.backlog_target,
+                    sample.micro_batch,
+                    sample.max_new_tokens,
+                )
+                for sample in samples
+            ],
+            dtype=float,
+        ).T
+        if np.any(backlog_target <= 0):
+            raise ValueError("backlog_target must be > 0")
+
+        last_time = self._last_time[rows]
+        first = np.isnan(last_time)
+        dt = np.where(first, 0.0, np.maximum(1e-6, timestamp - last_time))
+        error = cfg.target_util - utilisation
+        integral = np.clip(
+            self._integral[rows] + error * dt, -cfg.integral_limit, cfg.integral_limit
+        )
+        derivative = np.divide(
+            error - self._last_error[rows], dt, out=np.zeros_like(error), where=~first
+        )
+        backlog_term = (backlog - backlog_target) / np.maximum(
+            np.maximum(backlog_target, cfg.backlog_normalizer), 1.0
+        )
+        control = (
+            cfg.kp * error
+            + cfg.ki * integral
+            + cfg.kd * derivative
+            + cfg.kf * backlog_term
+        )
+        scale = np.clip(1.0 + control, cfg.min_scale, cfg.max_scale)
+        hot = (memory >= cfg.max_memory) | (temperature >= cfg.max_temperature)
+        scale[hot] = cfg.min_scale
+        # np.rint rounds half to even, like the built-in round().
+        micro = np.clip(
+            np.rint(micro_batch * scale), cfg.base_micro_batch, cfg.max_micro_batch
+        )
+        tokens = np.clip(
+            np.rint(max_new_tokens * scale),
+            cfg.min_max_new_tokens,
+            cfg.base_max_new_tokens,
+        )
+        pressure = np.maximum(
+            _ramp(temperature, cfg.max_temperature, cfg.thermal_margin),
+            _ramp(memory, cfg.max_memory, cfg.memory_margin),
+        )
+
+        self._integral[rows] = integral
+        self._last_error[rows] = error
+        self._last_time[rows] = timestamp
+
+        decisions: Dict[str, GovernorDecision] = {}
+        pressures: Dict[str, float] = {}
+        for index, gpu_id in enumerate(ids):
+            is_hot = bool(hot[index])
+            decisions[gpu_id] = GovernorDecision(
+                concurrency_scale=float(scale[index]),
+                micro_batch=int(micro[index]),
+                max_new_tokens=int(tokens[index]),
+                divert_to_cpu=is_hot,
+                pause_queues=cfg.pause_queues_on_hot if is_hot else (),
+            )
+            pressures[gpu_id] = float(pressure[index])
+            if scheduler is not None:
+                scheduler.update_gpu(
+                    gpu_id,
+                    temperature=float(temperature[index]),
+                    pressure=pressures[gpu_id],
+                )
+
+        hottest = int(np.argmax(temperature))
+        summary = FleetSummary(
+            devices=len(ids),
+            mean_utilisation=float(utilisation.mean()),
+            mean_scale=float(scale.mean()),
+            max_temperature=float(temperature[hottest]),
+            hottest=ids[hottest],
+            total_backlog=float(backlog.sum()),
+            diverted=tuple(gpu_id for index, gpu_id in enumerate(ids) if hot[index]),
+            pressured=tuple(
+                gpu_id for index, gpu_id in enumerate(ids) if pressure[index] > 0.0
+            ),
+        )
+        return FleetDecision(decisions=decisions, pressure=pressures, summary=summary)
+
+    def _position(self, gpu_id: str) -> int:
+        try:
+            return self._positions[gpu_id]
+        except KeyError as exc:
+            raise KeyError(f"Unknown GPU '{gpu_id}'") from exc
+
+
+def _ramp(values: np.ndarray, limit: float, margin: float) -> np.ndarray:
+    """0 below ``limit - margin``, rising linearly to 1 at ``limit``."""
+
+    if margin <= 0:
+        return (values >= limit).astype(float)
+    return np.clip((values - (limit - margin)) / margin, 0.0, 1.0)
+
+
 def _clamp(value: float, lower: float, upper: float) -> float:
     lower = -inf if lower is None else lower
     upper = inf if upper is None else upper
@@ -162,6 +383,9 @@ def _clamp_int(value: int, lower: int, upper: int) -> int:
 
 
 __all__ = [
+    "FleetDecision",
+    "FleetGovernor",
+    "FleetSummary",
     "GovernorConfig",
     "GpuGovernor",
     "GpuMetrics",
@@ -1,9 +1,40 @@
-"""GPU/MIG aware job scheduler."""
+"""GPU/MIG aware job scheduler.
+
+Placement is served from a per-profile index: each MIG profile keeps a
+min-heap of eligible slices keyed on ``(slice load, GPU utilisation, fleet
+position)``. Allocating a job pops the best slice in ``O(log G)`` and only
+re-keys the slices of the GPU that changed; stale heap entries are discarded
+lazily using a per-slice version counter.
+
+:meth:`JobScheduler.schedule_batch` is an alternative to arrival-order greedy
+placement: it sorts the whole job set by utilisation cost and packs it
+first-fit or best-fit, which leaves fewer half-used GPUs with stranded
+capacity.
+
+Every placement is tracked as a lease so the scheduler can run continuously:
+:meth:`Allocation.release` (or :meth:`JobScheduler.release`) frees the slice
+and re-keys the index, leases lapse after ``SchedulerConfig.lease_seconds``
+unless renewed, and a job that finds no free slice may preempt a running job
+of lower priority on the same profile.
+"""
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Iterable, Iterator, List, Mapping, MutableMapping, Sequence
+import heapq
+from dataclasses import dataclass, field, replace
+from itertools import count, product
+from time import monotonic, perf_counter
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Sequence,
+    Tuple,
+)
 
 
 @dataclass
@@ -21,12 +52,17 @@ class Slice:
 
 @dataclass
 class Gpu:
-    """GPU instance with utilisation and thermal state."""
+    """GPU instance with utilisation and thermal state.
+
+    ``pressure`` (0..1) is set by the fleet governor as a device approaches
+    its thermal or memory limits; placement prefers low-pressure GPUs.
+    """
 
     id: str
     utilisation: float
     temperature: float
     slices: MutableMapping[str, Slice] = field(default_factory=dict)
+    pressure: float = 0.0
 
     def compatible_slices(self, profile: str) -> Iterator[Slice]:
         sl = self.slices.get(profile)
@@ -36,59 +72,578 @@ class Gpu:
 
 @dataclass(frozen=True)
 class Job:
+    """Unit of work; a lower ``priority`` value is more important."""
+
     id: str
     profile: str
+    priority: int = 0
 
 
 @dataclass(frozen=True)
 class Allocation:
+    """Handle for a placed job; ``release()`` frees its slice."""
+
     job_id: str
     gpu_id: str
     slice_id: str
+    expires_at: float | None = field(default=None, compare=False)
+    _scheduler: "JobScheduler | None" = field(default=None, compare=False, repr=False)
+
+    def release(self) -> bool:
+        """Free the slice held by this job; ``False`` if it was already gone."""
+
+        if self._scheduler is None:
+            return False
+        return self._scheduler.release(self.job_id)
+
+
+@dataclass(frozen=True)
+class BatchPlacement:
+    """Outcome of :meth:`JobScheduler.schedule_batch`."""
+
+    allocations: Tuple[Allocation, ...]
+    unplaced: Tuple[str, ...]
+    strategy: str
+    gpus_used: int
+    slot_efficiency: float
+    stranded_slots: int
+
+    @property
+    def placed_ratio(self) -> float:
+        total = len(self.allocations) + len(self.unplaced)
+        return len(self.allocations) / total if total else 1.0
 
 
 @dataclass
 class SchedulerConfig:
     max_temperature: float = 82.0
     max_utilisation: float = 0.92
+    lease_seconds: float | None = None
+
+
+@dataclass
+class _Lease:
+    allocation: Allocation
+    position: int
+    profile: str
+    priority: int
+    delta: float
+    sequence: int
+    expires_at: float | None
+
+
+_IndexEntry = Tuple[float, float, float, int, int, str]
+
+
+class _PlacementIndex:
+    """Per-profile min-heaps of eligible slices with lazy invalidation."""
+
+    def __init__(self, gpus: Sequence[Gpu], config: SchedulerConfig) -> None:
+        self._gpus = gpus
+        self._config = config
+        self._heaps: Dict[str, List[_IndexEntry]] = {}
+        self._versions: Dict[Tuple[int, str], int] = {}
+        self._live: Dict[str, int] = {}
+        for position in range(len(gpus)):
+            self.refresh(position)
+
+    def refresh(self, position: int) -> None:
+        """Re-key every slice of the GPU at ``position`` after a state change."""
+
+        gpu = self._gpus[position]
+        eligible = (
+            gpu.temperature < self._config.max_temperature
+            and gpu.utilisation < self._config.max_utilisation
+        )
+        for profile, sl in gpu.slices.items():
+            key = (position, profile)
+            heap = self._heaps.setdefault(profile, [])
+            live = self._live.get(profile, 0)
+            if key in self._versions and self._versions[key] >= 0:
+                live -= 1
+            if eligible and sl.has_capacity():
+                version = abs(self._versions.get(key, 0)) + 1
+                load = sl.running / sl.capacity if sl.capacity else 1.0
+                heapq.heappush(
+                    heap,
+                    (gpu.pressure, load, gpu.utilisation, position, version, profile),
+                )
+                live += 1
+            else:
+                # A negative version marks the slice as absent from the heap.
+                version = -(abs(self._versions.get(key, 0)) + 1)
+            self._versions[key] = version
+            self._live[profile] = live
+            if len(heap) > 2 * live + 16:
+                self._compact(profile)
+
+    def best(self, profile: str) -> int | None:
+        """Return the fleet position of the best slice for ``profile``."""
+
+        heap = self._heaps.get(profile)
+        while heap:
+            _, _, _, position, version, _ = heap[0]
+            if self._versions[(position, profile)] == version:
+                return position
+            heapq.heappop(heap)
+        return None
+
+    def _compact(self, profile: str) -> None:
+        heap = [
+            entry
+            for entry in self._heaps[profile]
+            if self._versions[(entry[3], profile)] == entry[4]
+        ]
+        heapq.heapify(heap)
+        self._heaps[profile] = heap
 
 
 class JobScheduler:
-    """Assigns jobs to GPUs honouring MIG profiles and headroom policies."""
+    """Assigns jobs to GPUs honouring MIG profiles and headroom policies.
+
+    The scheduler owns placement state once constructed: GPU telemetry
+    changes must go through :meth:`update_gpu` so the index stays in sync.
+    """
 
-    def __init__(self, gpus: Sequence[Gpu], config: SchedulerConfig | None = None) -> None:
+    def __init__(
+        self, gpus: Sequence[Gpu], config: SchedulerConfig | None = None
+    ) -> None:
         if not gpus:
             raise ValueError("At least one GPU must be declared")
         self._gpus: List[Gpu] = list(gpus)
         self._config = config or SchedulerConfig()
+        self._positions: Dict[str, int] = {
+            gpu.id: position for position, gpu in enumerate(self._gpus)
+        }
+        self._index = _PlacementIndex(self._gpus, self._config)
+        self._leases: Dict[str, _Lease] = {}
+        self._expiry: List[Tuple[float, int, str]] = []
+        self._victims: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._victims_live: Dict[str, int] = {}
+        self._preempted: List[Allocation] = []
+        self._sequence = count()
+
+    @property
+    def gpu_ids(self) -> Tuple[str, ...]:
+        return tuple(self._positions)
 
-    def schedule(self, jobs: Iterable[Job]) -> List[Allocation]:
+    def schedule(
+        self, jobs: Iterable[Job], *, now: float | None = None
+    ) -> List[Allocation]:
+        """Place jobs greedily in arrival order, preempting if needed.
+
+        Expired leases are reclaimed first. A job that finds no free slice
+        evicts the least important running job (highest ``priority`` value,
+        newest first) on its profile when that job is strictly less
+        important; evicted allocations are returned by
+        :meth:`drain_preempted`.
+        """
+
+        job_list = list(jobs)
+        _check_unique(job_list)
+        now_monotonic = monotonic() if now is None else now
+        self.expire(now=now_monotonic)
+        self._check_not_running(job_list)
         assignments: List[Allocation] = []
-        for job in jobs:
-            allocation = self._allocate(job)
+        for job in job_list:
+            allocation = self._allocate(job, now_monotonic) or self._preempt_for(
+                job, now_monotonic
+            )
             if allocation:
                 assignments.append(allocation)
         return assignments
 
-    def _allocate(self, job: Job) -> Allocation | None:
-        candidates: list[tuple[float, float, Gpu, Slice]] = []
-        for gpu in self._gpus:
-            if gpu.temperature >= self._config.max_temperature:
-                continue
-            if gpu.utilisation >= self._config.max_utilisation:
+    def release(self, job_id: str) -> bool:
+        """Free the slice held by ``job_id``; ``False`` if it is not running."""
+
+        lease = self._leases.pop(job_id, None)
+        if lease is None:
+            return False
+        gpu = self._gpus[lease.position]
+        gpu.slices[lease.profile].running -= 1
+        gpu.utilisation = max(0.0, gpu.utilisation - lease.delta)
+        self._index.refresh(lease.position)
+        live = self._victims_live[lease.profile] - 1
+        self._victims_live[lease.profile] = live
+        if len(self._victims[lease.profile]) > 2 * live + 16:
+            self._compact_victims(lease.profile)
+        return True
+
+    def renew(self, job_id: str, *, now: float | None = None) -> Allocation:
+        """Extend the lease of a running job by ``lease_seconds``."""
+
+        try:
+            lease = self._leases[job_id]
+        except KeyError as exc:
+            raise KeyError(f"Job '{job_id}' is not running") from exc
+        expires_at = self._lease_deadline(monotonic() if now is None else now)
+        lease.expires_at = expires_at
+        lease.allocation = replace(lease.allocation, expires_at=expires_at)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, lease.sequence, job_id))
+        return lease.allocation
+
+    def expire(self, *, now: float | None = None) -> List[Allocation]:
+        """Release every lease whose deadline has passed."""
+
+        now_monotonic = monotonic() if now is None else now
+        expired: List[Allocation] = []
+        while self._expiry and self._expiry[0][0] <= now_monotonic:
+            expires_at, sequence, job_id = heapq.heappop(self._expiry)
+            lease = self._leases.get(job_id)
+            if (
+                lease is None
+                or lease.sequence != sequence
+                or lease.expires_at != expires_at
+            ):
                 continue
-            for sl in gpu.compatible_slices(job.profile):
-                if not sl.has_capacity():
-                    continue
-                load = sl.running / sl.capacity if sl.capacity else 1.0
-                candidates.append((load, gpu.utilisation, gpu, sl))
-        if not candidates:
+            self.release(job_id)
+            expired.append(lease.allocation)
+        return expired
+
+    def drain_preempted(self) -> List[Allocation]:
+        """Return (and forget) the allocations evicted since the last call."""
+
+        preempted, self._preempted = self._preempted, []
+        return preempted
+
+    def running(self) -> List[Allocation]:
+        return [lease.allocation for lease in self._leases.values()]
+
+    def schedule_batch(
+        self,
+        jobs: Iterable[Job],
+        *,
+        fit: str = "auto",
+        order: str = "auto",
+        time_budget: float | None = None,
+        now: float | None = None,
+    ) -> BatchPlacement:
+        """Place a whole job set at once using bin-packing heuristics.
+
+        ``order`` sorts jobs by utilisation cost (``1 / slice capacity``,
+        ties broken by profile scarcity then arrival): ``"decreasing"``
+        (classic FFD/BFD), ``"increasing"`` (cheap jobs first, so an
+        expensive one takes the remaining headroom, which suits fleets where
+        the utilisation cap binds before the slices fill) or ``"arrival"``.
+        ``fit`` is ``"first"`` (first GPU in fleet order), ``"best"`` (the
+        fullest GPU that still fits) or ``"spread"`` (the greedy rule).
+        ``"auto"`` evaluates every combination on a copy of the fleet state,
+        so the greedy plan is always a candidate, and keeps the plan that
+        places the most jobs on the fewest GPUs; ``time_budget`` (seconds)
+        stops the search early with the best plan so far.
+        """
+
+        job_list = list(jobs)
+        _check_unique(job_list)
+        now_monotonic = monotonic() if now is None else now
+        self.expire(now=now_monotonic)
+        self._check_not_running(job_list)
+        fits = tuple(_FITS) if fit == "auto" else (fit,)
+        orders = _ORDERS if order == "auto" else (order,)
+        if any(name not in _FITS for name in fits):
+            raise ValueError(f"Unknown fit rule '{fit}'")
+        if any(name not in _ORDERS for name in orders):
+            raise ValueError(f"Unknown job order '{order}'")
+        started = perf_counter()
+        best: _Plan | None = None
+        for order_name, fit_name in product(orders, fits):
+            plan = _pack_jobs(self._gpus, self._config, job_list, fit_name, order_name)
+            if best is None or plan.score > best.score:
+                best = plan
+            if time_budget is not None and perf_counter() - started >= time_budget:
+                break
+        assert best is not None
+        return self._commit(job_list, best, now_monotonic)
+
+    def update_gpu(
+        self,
+        gpu_id: str,
+        *,
+        utilisation: float | None = None,
+        temperature: float | None = None,
+        pressure: float | None = None,
+    ) -> None:
+        """Apply fresh telemetry for ``gpu_id`` and re-key its slices."""
+
+        try:
+            position = self._positions[gpu_id]
+        except KeyError as exc:
+            raise KeyError(f"Unknown GPU '{gpu_id}'") from exc
+        gpu = self._gpus[position]
+        if utilisation is not None:
+            gpu.utilisation = utilisation
+        if temperature is not None:
+            gpu.temperature = temperature
+        if pressure is not None:
+            gpu.pressure = pressure
+        self._index.refresh(position)
+
+    def _commit(self, jobs: Sequence[Job], plan: _Plan, now: float) -> BatchPlacement:
+        allocations: List[Allocation] = []
+        touched = set()
+        for index, position, delta in plan.placements:
+            allocations.append(self._register(jobs[index], position, delta, now))
+            touched.add(position)
+        for (position, profile), running in plan.running.items():
+            self._gpus[position].slices[profile].running = running
+        for position in touched:
+            self._gpus[position].utilisation = plan.utilisation[position]
+            self._index.refresh(position)
+        placed = {index for index, _, _ in plan.placements}
+        used = [
+            gpu for gpu in self._gpus if any(sl.running for sl in gpu.slices.values())
+        ]
+        total_slots = sum(sl.capacity for gpu in used for sl in gpu.slices.values())
+        busy_slots = sum(sl.running for gpu in used for sl in gpu.slices.values())
+        stranded = sum(
+            sl.capacity - sl.running
+            for gpu in self._gpus
+            if gpu.utilisation >= self._config.max_utilisation
+            or gpu.temperature >= self._config.max_temperature
+            for sl in gpu.slices.values()
+        )
+        return BatchPlacement(
+            allocations=tuple(allocations),
+            unplaced=tuple(
+                job.id for index, job in enumerate(jobs) if index not in placed
+            ),
+            strategy=plan.strategy,
+            gpus_used=len(used),
+            slot_efficiency=busy_slots / total_slots if total_slots else 0.0,
+            stranded_slots=stranded,
+        )
+
+    def _check_not_running(self, jobs: Sequence[Job]) -> None:
+        for job in jobs:
+            if job.id in self._leases:
+                raise ValueError(f"Job '{job.id}' is already running")
+
+    def _allocate(self, job: Job, now: float) -> Allocation | None:
+        position = self._index.best(job.profile)
+        if position is None:
             return None
-        candidates.sort(key=lambda item: (item[0], item[1]))
-        _, _, gpu, slice_ = candidates[0]
+        gpu = self._gpus[position]
+        slice_ = gpu.slices[job.profile]
         slice_.running += 1
+        before = gpu.utilisation
         gpu.utilisation = min(1.0, gpu.utilisation + (1.0 / max(slice_.capacity, 1)))
-        return Allocation(job.id, gpu.id, slice_.id)
+        self._index.refresh(position)
+        return self._register(job, position, gpu.utilisation - before, now)
+
+    def _register(
+        self, job: Job, position: int, delta: float, now: float
+    ) -> Allocation:
+        gpu = self._gpus[position]
+        sequence = next(self._sequence)
+        expires_at = self._lease_deadline(now)
+        allocation = Allocation(
+            job.id, gpu.id, gpu.slices[job.profile].id, expires_at, self
+        )
+        self._leases[job.id] = _Lease(
+            allocation, position, job.profile, job.priority, delta, sequence, expires_at
+        )
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, sequence, job.id))
+        # Max-heap on priority value; newest first among equals (least work lost).
+        heapq.heappush(
+            self._victims.setdefault(job.profile, []),
+            (-job.priority, -sequence, job.id),
+        )
+        self._victims_live[job.profile] = self._victims_live.get(job.profile, 0) + 1
+        return allocation
+
+    def _compact_victims(self, profile: str) -> None:
+        # Same lazy-invalidation rule as ``_PlacementIndex``: rebuild once
+        # released jobs dominate the heap.
+        heap = []
+        for entry in self._victims[profile]:
+            lease = self._leases.get(entry[2])
+            if lease is not None and lease.sequence == -entry[1]:
+                heap.append(entry)
+        heapq.heapify(heap)
+        self._victims[profile] = heap
+
+    def _preempt_for(self, job: Job, now: float) -> Allocation | None:
+        heap = self._victims.get(job.profile)
+        if not heap:
+            return None
+        skipped: List[Tuple[int, int, str]] = []
+        allocation: Allocation | None = None
+        while heap:
+            entry = heap[0]
+            neg_priority, neg_sequence, victim_id = entry
+            lease = self._leases.get(victim_id)
+            if lease is None or lease.sequence != -neg_sequence:
+                heapq.heappop(heap)
+                continue
+            if -neg_priority <= job.priority:
+                break
+            heapq.heappop(heap)
+            gpu = self._gpus[lease.position]
+            if (
+                gpu.temperature >= self._config.max_temperature
+                or gpu.utilisation - lease.delta >= self._config.max_utilisation
+            ):
+                # Evicting this job would not make its GPU eligible.
+                skipped.append(entry)
+                continue
+            self.release(victim_id)
+            self._preempted.append(lease.allocation)
+            allocation = self._allocate(job, now)
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return allocation
+
+    def _lease_deadline(self, now: float) -> float | None:
+        lease_seconds = self._config.lease_seconds
+        return None if lease_seconds is None else now + lease_seconds
+
+
+def _check_unique(jobs: Sequence[Job]) -> None:
+    seen: set[str] = set()
+    for job in jobs:
+        if job.id in seen:
+            raise ValueError(f"Job '{job.id}' appears more than once")
+        seen.add(job.id)
+
+
+@dataclass
+class _Plan:
+    strategy: str
+    placements: List[
+        Tuple[int, int, float]
+    ]  # (job index, fleet position, utilisation added)
+    running: Dict[Tuple[int, str], int]
+    utilisation: List[float]
+
+    @property
+    def score(self) -> Tuple[int, int]:
+        used = sum(1 for value in self.utilisation if value > 0)
+        return len(self.placements), -used
+
+
+_LoadFn = Callable[[int], float]
+
+
+# Every fit ranks governor pressure first so hot devices are filled last.
+
+
+def _first_fit(
+    candidates: Sequence[int],
+    utilisation: Sequence[float],
+    pressure: Sequence[float],
+    load: _LoadFn,
+) -> int:
+    return min(candidates, key=lambda position: (pressure[position], position))
+
+
+def _best_fit(
+    candidates: Sequence[int],
+    utilisation: Sequence[float],
+    pressure: Sequence[float],
+    load: _LoadFn,
+) -> int:
+    # The fullest GPU first; fleet order breaks ties.
+    return max(
+        candidates,
+        key=lambda position: (-pressure[position], utilisation[position], -position),
+    )
+
+
+def _spread_fit(
+    candidates: Sequence[int],
+    utilisation: Sequence[float],
+    pressure: Sequence[float],
+    load: _LoadFn,
+) -> int:
+    # Same choice as greedy placement: least-loaded slice, then coolest GPU.
+    return min(
+        candidates,
+        key=lambda position: (
+            pressure[position],
+            load(position),
+            utilisation[position],
+            position,
+        ),
+    )
+
+
+_FITS = {"first": _first_fit, "best": _best_fit, "spread": _spread_fit}
+_ORDERS = ("decreasing", "increasing", "arrival")
+
+
+def _pack_jobs(
+    gpus: Sequence[Gpu],
+    config: SchedulerConfig,
+    jobs: Sequence[Job],
+    fit: str,
+    order: str,
+) -> _Plan:
+    choose = _FITS[fit]
+    sign = {"decreasing": -1.0, "increasing": 1.0, "arrival": 0.0}[order]
+    running = {
+        (position, profile): sl.running
+        for position, gpu in enumerate(gpus)
+        for profile, sl in gpu.slices.items()
+    }
+    utilisation = [gpu.utilisation for gpu in gpus]
+    pressure = [gpu.pressure for gpu in gpus]
+    by_profile: Dict[str, List[int]] = {}
+    for position, gpu in enumerate(gpus):
+        if gpu.temperature >= config.max_temperature:
+            continue
+        for profile, sl in gpu.slices.items():
+            if sl.capacity > 0:
+                by_profile.setdefault(profile, []).append(position)
+
+    def cost(profile: str) -> float:
+        positions = by_profile.get(profile)
+        if not positions:
+            return 0.0
+        return max(
+            1.0 / gpus[position].slices[profile].capacity for position in positions
+        )
+
+    supply = {
+        profile: sum(gpus[position].slices[profile].capacity for position in positions)
+        for profile, positions in by_profile.items()
+    }
+    ranked = sorted(
+        range(len(jobs)),
+        key=lambda index: (
+            sign * cost(jobs[index].profile),
+            supply.get(jobs[index].profile, 0) if sign else 0,
+            index,
+        ),
+    )
+    placements: List[Tuple[int, int, float]] = []
+    for index in ranked:
+        profile = jobs[index].profile
+        candidates = [
+            position
+            for position in by_profile.get(profile, ())
+            if utilisation[position] < config.max_utilisation
+            and running[(position, profile)] < gpus[position].slices[profile].capacity
+        ]
+        if not candidates:
+            continue
+        position = choose(
+            candidates,
+            utilisation,
+            pressure,
+            lambda position: (
+                running[(position, profile)] / gpus[position].slices[profile].capacity
+            ),
+        )
+        capacity = gpus[position].slices[profile].capacity
+        running[(position, profile)] += 1
+        before = utilisation[position]
+        utilisation[position] = min(1.0, before + 1.0 / max(capacity, 1))
+        placements.append((index, position, utilisation[position] - before))
+    placements.sort()
+    return _Plan(f"{fit}-fit/{order}", placements, running, utilisation)
 
 
 def build_gpu_fleet(config: Mapping[str, Mapping[str, int]]) -> list[Gpu]:
@@ -108,12 +663,15 @@ def build_gpu_fleet(config: Mapping[str, Mapping[str, int]]) -> list[Gpu]:
             profile: Slice(id=f"{gpu_id}:{profile}", profile=profile, capacity=capacity)
             for profile, capacity in slices.items()
         }
-        fleet.append(Gpu(id=gpu_id, utilisation=0.0, temperature=60.0, slices=gpu_slices))
+        fleet.append(
+            Gpu(id=gpu_id, utilisation=0.0, temperature=60.0, slices=gpu_slices)
+        )
     return fleet
 
 
 __all__ = [
     "Allocation",
+    "BatchPlacement",
     "Gpu",
     "Job",
     "JobScheduler",
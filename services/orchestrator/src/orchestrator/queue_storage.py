@@ -0,0 +1,443 @@
+"""Backends de almacenamiento para :class:`~orchestrator.queues.QueueManager`.
+
+``SegmentLogBackend`` persiste cada cola en un log append-only repartido en
+segmentos de tamaño fijo mapeados en memoria (``mmap``), por defecto bajo
+``storage/queues/`` (:data:`DEFAULT_DIRECTORY`):
+
+* ``enqueue`` escribe un registro ``ENQUEUE`` y ``dequeue`` un ``ACK``; el heap
+  del gestor sólo guarda una referencia ``(segmento, offset)`` al payload;
+* tras un reinicio, :meth:`SegmentLogBackend.recover` recorre los segmentos y
+  devuelve los registros sin ``ACK``; un registro truncado o con CRC inválido
+  marca el final del log;
+* los payloads ``bytes`` se devuelven como ``memoryview`` sobre el mapa, sin
+  copia; el resto se serializa como JSON;
+* los segmentos más antiguos sin registros vivos se eliminan; cuando el más
+  antiguo conserva como mucho ``compact_ratio`` de sus registros vivos,
+  :meth:`SegmentLogBackend.compact` (invocado también desde ``ack``) los
+  reescribe al final del log para poder liberarlo.
+
+Todas las operaciones del backend se serializan con un lock propio, así que
+``compact`` puede llamarse desde otro hilo mientras el gestor encola y
+desencola.
+
+Las escrituras van al page cache: sobreviven a la caída del proceso. Con
+``fsync=True`` cada escritura se sincroniza también con el disco.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from time import monotonic, time
+from typing import Any, Dict, Iterator, List, Protocol
+
+logger = logging.getLogger(__name__)
+
+# crc32, longitud del cuerpo, tipo, codec, secuencia, encolado (reloj del
+# llamante), encolado (reloj de pared), deadline, prioridad, longitud del nombre.
+DEFAULT_DIRECTORY = Path("storage/queues")
+
+_HEADER = struct.Struct("<IIBBQdddqH")
+_KIND_ENQUEUE = 1
+_KIND_ACK = 2
+_CODEC_JSON = 0
+_CODEC_BYTES = 1
+
+
+@dataclass(frozen=True)
+class StoredRecord:
+    """Registro recuperado del log, con los tiempos rebasados al reloj actual."""
+
+    queue: str
+    sequence: int
+    enqueued_at: float
+    priority: int
+    deadline: float | None
+    ref: "RecordRef"
+
+
+@dataclass
+class RecordRef:
+    """Ubicación de un payload persistido; se actualiza si se compacta."""
+
+    sequence: int
+    segment: int
+    record_offset: int
+    offset: int
+    length: int
+    codec: int
+
+
+class QueueBackend(Protocol):
+    def append(
+        self,
+        queue: str,
+        sequence: int,
+        payload: Any,
+        *,
+        enqueued_at: float,
+        priority: int,
+        deadline: float | None,
+    ) -> Any: ...
+
+    def read(self, ref: Any) -> Any: ...
+
+    def ack(self, ref: Any) -> None: ...
+
+    def recover(self) -> Iterator[StoredRecord]: ...
+
+    def clear(self) -> None: ...
+
+
+class _Segment:
+    def __init__(self, index: int, path: Path, size: int) -> None:
+        self.index = index
+        self.path = path
+        self.live = 0
+        self.records = 0  # registros escritos, ENQUEUE y ACK
+        self.write_offset = 0
+        with path.open("a+b") as fh:
+            if os.fstat(fh.fileno()).st_size < size:
+                fh.truncate(size)
+        self._fd = os.open(path, os.O_RDWR)
+        self.map = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+
+    @property
+    def size(self) -> int:
+        return len(self.map)
+
+    def close(self) -> bool:
+        try:
+            self.map.close()
+        except BufferError:
+            # Quedan memoryviews de lectores vivos: se reintenta más tarde.
+            return False
+        os.close(self._fd)
+        return True
+
+
+class SegmentLogBackend:
+    """Log segmentado y mapeado en memoria para las colas del orquestador."""
+
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_DIRECTORY,
+        *,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync: bool = False,
+        compact_ratio: float = 0.25,
+    ) -> None:
+        if segment_bytes <= _HEADER.size:
+            raise ValueError("segment_bytes is too small")
+        if not 0 < compact_ratio < 1:
+            raise ValueError("compact_ratio must be between 0 and 1")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._segment_bytes = segment_bytes
+        self._fsync = fsync
+        self._compact_ratio = compact_ratio
+        self._segments: Dict[int, _Segment] = {}
+        self._refs: Dict[int, RecordRef] = {}
+        self._closing: List[_Segment] = []
+        self._active: _Segment | None = None
+        self._lock = Lock()
+
+    # -- API del backend -------------------------------------------------
+
+    def append(
+        self,
+        queue: str,
+        sequence: int,
+        payload: Any,
+        *,
+        enqueued_at: float,
+        priority: int,
+        deadline: float | None,
+    ) -> RecordRef:
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            codec, body = _CODEC_BYTES, payload
+        else:
+            codec, body = (
+                _CODEC_JSON,
+                json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+            )
+        name = queue.encode("utf-8")
+        header_rest = _HEADER.pack(
+            0,
+            len(name) + len(body),
+            _KIND_ENQUEUE,
+            codec,
+            sequence,
+            enqueued_at,
+            time(),
+            math.nan if deadline is None else deadline,
+            priority,
+            len(name),
+        )[4:]
+        with self._lock:
+            segment, offset = self._write(header_rest, name, body)
+            segment.live += 1
+            segment.records += 1
+            ref = RecordRef(
+                sequence,
+                segment.index,
+                offset,
+                offset + _HEADER.size + len(name),
+                len(body),
+                codec,
+            )
+            self._refs[sequence] = ref
+        return ref
+
+    def read(self, ref: RecordRef) -> Any:
+        with self._lock:
+            segment = self._segments[ref.segment]
+            view = memoryview(segment.map)[ref.offset : ref.offset + ref.length]
+        if ref.codec == _CODEC_BYTES:
+            return view
+        try:
+            return json.loads(bytes(view))
+        finally:
+            view.release()
+
+    def ack(self, ref: RecordRef) -> None:
+        header_rest = _HEADER.pack(
+            0, 0, _KIND_ACK, 0, ref.sequence, 0.0, 0.0, math.nan, 0, 0
+        )[4:]
+        with self._lock:
+            if self._refs.pop(ref.sequence, None) is None:
+                return
+            segment, _ = self._write(header_rest, b"", b"")
+            segment.records += 1
+            self._segments[ref.segment].live -= 1
+            self._drop_dead_segments()
+            if self._head_is_sparse():
+                self._compact()
+
+    def recover(self) -> Iterator[StoredRecord]:
+        """Reabre los segmentos existentes y devuelve los registros pendientes."""
+
+        with self._lock:
+            records = self._recover()
+        yield from records
+
+    def _recover(self) -> List[StoredRecord]:
+        self._close_all()
+        live: Dict[int, tuple[str, float, float, int, float | None, RecordRef]] = {}
+        paths = sorted(self._directory.glob("segment-*.log"))
+        for path in paths:
+            index = int(path.stem.split("-", 1)[1])
+            if not path.stat().st_size:
+                path.unlink()
+                continue
+            segment = _Segment(index, path, 0)
+            self._segments[index] = segment
+            for kind, offset, fields, name in self._scan(segment):
+                sequence = fields[4]
+                segment.records += 1
+                if kind == _KIND_ACK:
+                    previous = live.pop(sequence, None)
+                    if previous is not None:
+                        self._segments[previous[5].segment].live -= 1
+                    continue
+                queue = name.decode("utf-8")
+                deadline = None if math.isnan(fields[7]) else fields[7]
+                ref = RecordRef(
+                    sequence,
+                    index,
+                    offset,
+                    offset + _HEADER.size + fields[9],
+                    fields[1] - fields[9],
+                    fields[3],
+                )
+                previous = live.get(sequence)
+                if previous is not None:
+                    # Copia hecha por una compactación interrumpida.
+                    self._segments[previous[5].segment].live -= 1
+                live[sequence] = (queue, fields[5], fields[6], fields[8], deadline, ref)
+                segment.live += 1
+        if self._segments:
+            self._active = self._segments[max(self._segments)]
+        clock_offset = monotonic() - time()
+        records: List[StoredRecord] = []
+        for sequence in sorted(live):
+            queue, enqueued_at, wall, priority, deadline, ref = live[sequence]
+            self._refs[sequence] = ref
+            rebased = wall + clock_offset
+            records.append(
+                StoredRecord(
+                    queue=queue,
+                    sequence=sequence,
+                    enqueued_at=rebased,
+                    priority=priority,
+                    deadline=None
+                    if deadline is None
+                    else deadline - enqueued_at + rebased,
+                    ref=ref,
+                )
+            )
+        self._drop_dead_segments()
+        return records
+
+    def clear(self) -> None:
+        with self._lock:
+            self._close_all()
+            for path in self._directory.glob("segment-*.log"):
+                path.unlink()
+
+    # -- mantenimiento ---------------------------------------------------
+
+    def compact(self) -> int:
+        """Reescribe los registros vivos de segmentos dispersos; devuelve cuántos."""
+
+        with self._lock:
+            return self._compact()
+
+    def _head_is_sparse(self) -> bool:
+        if not self._segments:
+            return False
+        head = self._segments[min(self._segments)]
+        return (
+            head is not self._active and head.live <= head.records * self._compact_ratio
+        )
+
+    def _compact(self) -> int:
+        moved = 0
+        for index in sorted(self._segments):
+            segment = self._segments[index]
+            if segment is self._active:
+                break
+            if (
+                not segment.records
+                or segment.live / segment.records > self._compact_ratio
+            ):
+                break
+            for ref in [ref for ref in self._refs.values() if ref.segment == index]:
+                data = segment.map
+                header = _HEADER.unpack_from(data, ref.record_offset)
+                name = data[ref.record_offset + _HEADER.size : ref.offset]
+                payload = data[ref.offset : ref.offset + ref.length]
+                target, offset = self._write(
+                    _HEADER.pack(0, *header[1:])[4:], name, payload
+                )
+                target.live += 1
+                target.records += 1
+                segment.live -= 1
+                ref.segment = target.index
+                ref.record_offset = offset
+                ref.offset = offset + _HEADER.size + len(name)
+                moved += 1
+        self._drop_dead_segments()
+        return moved
+
+    def sync(self) -> None:
+        with self._lock:
+            for segment in self._segments.values():
+                segment.map.flush()
+
+    def close(self) -> None:
+        self.sync()
+        with self._lock:
+            self._close_all()
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    # -- internos --------------------------------------------------------
+
+    def _write(
+        self, header_rest: bytes, name: bytes, body: bytes | bytearray | memoryview
+    ) -> tuple[_Segment, int]:
+        total = _HEADER.size + len(name) + len(body)
+        segment = self._active
+        # Se reserva un encabezado vacío tras cada registro como fin de log.
+        if (
+            segment is None
+            or segment.write_offset + total + _HEADER.size > segment.size
+        ):
+            segment = self._roll(total + _HEADER.size)
+        offset = segment.write_offset
+        crc = zlib.crc32(body, zlib.crc32(name, zlib.crc32(header_rest)))
+        data = segment.map
+        start = offset + _HEADER.size
+        data[start : start + len(name)] = name
+        data[start + len(name) : offset + total] = body
+        data[offset + 4 : start] = header_rest
+        # El CRC se escribe el último: un registro a medias nunca valida.
+        struct.pack_into("<I", data, offset, crc)
+        segment.write_offset = offset + total
+        if self._fsync:
+            data.flush()
+        return segment, offset
+
+    def _roll(self, needed: int) -> _Segment:
+        index = max(self._segments, default=-1) + 1
+        path = self._directory / f"segment-{index:08d}.log"
+        segment = _Segment(index, path, max(self._segment_bytes, needed))
+        self._segments[index] = segment
+        self._active = segment
+        return segment
+
+    def _scan(
+        self, segment: _Segment
+    ) -> Iterator[tuple[int, int, tuple[Any, ...], bytes]]:
+        data = segment.map
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            fields = _HEADER.unpack_from(data, offset)
+            kind, length = fields[2], fields[1]
+            end = offset + _HEADER.size + length
+            if kind not in (_KIND_ENQUEUE, _KIND_ACK) or end > len(data):
+                break
+            header_rest = bytes(data[offset + 4 : offset + _HEADER.size])
+            body = data[offset + _HEADER.size : end]
+            if zlib.crc32(body, zlib.crc32(header_rest)) != fields[0]:
+                logger.warning(
+                    "Truncated record in %s at offset %s", segment.path, offset
+                )
+                break
+            yield kind, offset, fields, body[: fields[9]]
+            offset = end
+        segment.write_offset = offset
+
+    def _drop_dead_segments(self) -> None:
+        # Sólo se eliminan segmentos desde la cabeza: los ACK de un segmento
+        # pueden referirse a registros de segmentos anteriores.
+        for index in sorted(self._segments):
+            segment = self._segments[index]
+            if segment is self._active or segment.live > 0:
+                break
+            del self._segments[index]
+            segment.path.unlink(missing_ok=True)
+            if not segment.close():
+                self._closing.append(segment)
+        self._closing = [segment for segment in self._closing if not segment.close()]
+
+    def _close_all(self) -> None:
+        for segment in list(self._segments.values()) + self._closing:
+            if not segment.close():
+                logger.warning(
+                    "Segment %s still has readers; leaving it mapped", segment.path
+                )
+        self._segments.clear()
+        self._closing.clear()
+        self._refs.clear()
+        self._active = None
+
+
+__all__ = [
+    "DEFAULT_DIRECTORY",
+    "QueueBackend",
+    "RecordRef",
+    "SegmentLogBackend",
+    "StoredRecord",
+]
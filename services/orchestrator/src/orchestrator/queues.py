@@ -1,18 +1,63 @@
-"""Gestión de colas con métricas de profundidad y antigüedad."""
+"""Gestión de colas con métricas de profundidad y antigüedad.
+
+Cada cola es un heap ordenado por ``(priority, deadline, orden de llegada)``:
+sin prioridad ni deadline se comporta como una FIFO. ``dequeue_next`` reparte
+el servicio entre colas con weighted fair queuing: cada cola activa tiene una
+etiqueta de fin virtual ``max(V, última) + 1/peso`` y se sirve la menor, de
+modo que una cola con peso 8 recibe ocho turnos por cada uno de una con peso 1
+aunque esta última esté inundada.
+
+Los consumidores pueden bloquearse en ``dequeue``/``dequeue_next`` con
+``timeout`` en lugar de sondear: cada cola tiene su propia
+``threading.Condition`` (más una global para ``dequeue_next``) y ``enqueue``
+despierta a un único consumidor. :class:`AsyncQueueManager` ofrece lo mismo
+para bucles asyncio.
+
+Las métricas se mantienen de forma incremental: contadores por cola, backlog
+total cacheado y antigüedad del elemento más viejo actualizada al encolar y
+desencolar. ``stats()`` y ``total_backlog()`` leen esos valores sin tomar el
+lock. Opcionalmente se registra la espera encolado→desencolado de las últimas
+``wait_samples`` muestras en un histograma logarítmico para consultar
+p50/p95/p99 sin recorrer las muestras.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import heapq
+import logging
+import math
+from array import array
 from collections import deque
 from dataclasses import dataclass
-from threading import Lock
+from itertools import count
+from math import inf
+from threading import Condition, Lock
 from time import monotonic
-from typing import Any, Deque, Dict, Iterable, List
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from .queue_storage import QueueBackend
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
 class QueueItem:
     payload: Any
     enqueued_at: float
+    priority: int = 0
+    deadline: float | None = None
 
 
 @dataclass(frozen=True)
@@ -22,73 +67,564 @@ class QueueSnapshot:
     total_enqueued: int
     total_dequeued: int
     oldest_age: float | None
+    total_expired: int = 0
+
+
+_HeapEntry = Tuple[int, float, int, QueueItem]
+_T = TypeVar("_T")
+
+
+class _WaitHistogram:
+    """Histograma log-lineal sobre un ring buffer de las últimas muestras.
+
+    Cada muestra se guarda en el ring buffer y suma uno a su bucket; al
+    sobrescribirse, su bucket se decrementa. Así los percentiles reflejan las
+    últimas ``capacity`` esperas y se calculan recorriendo sólo los buckets.
+    """
+
+    _MIN_SECONDS = 1e-6
+    _SUB_BUCKETS = 8  # por potencia de dos: error relativo < 9 %
+    _OCTAVES = 40  # hasta ~1e6 s
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self._ring = array("H", [0]) * capacity
+        self._size = 0
+        self._cursor = 0
+        self._counts = [0] * (self._OCTAVES * self._SUB_BUCKETS + 1)
+
+    def record(self, seconds: float) -> None:
+        bucket = self._bucket(seconds)
+        ring = self._ring
+        if self._size == len(ring):
+            self._counts[ring[self._cursor]] -= 1
+        else:
+            self._size += 1
+        ring[self._cursor] = bucket
+        self._counts[bucket] += 1
+        self._cursor = (self._cursor + 1) % len(ring)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self._size:
+            return None
+        rank = max(1, math.ceil(self._size * pct / 100.0))
+        seen = 0
+        for bucket, hits in enumerate(self._counts):
+            seen += hits
+            if seen >= rank:
+                return self._upper_bound(bucket)
+        return self._upper_bound(len(self._counts) - 1)  # pragma: no cover - defensa
+
+    def clear(self) -> None:
+        self._size = 0
+        self._cursor = 0
+        self._counts = [0] * len(self._counts)
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self._MIN_SECONDS:
+            return 0
+        scaled = math.log2(seconds / self._MIN_SECONDS) * self._SUB_BUCKETS
+        return min(len(self._counts) - 1, int(scaled) + 1)
+
+    def _upper_bound(self, bucket: int) -> float:
+        return self._MIN_SECONDS * 2.0 ** (bucket / self._SUB_BUCKETS)
 
 
 class QueueManager:
-    """Administra múltiples colas priorizadas."""
+    """Administra múltiples colas priorizadas.
 
-    def __init__(self, names: Iterable[str]) -> None:
+    ``priority`` menor se atiende antes; a igual prioridad gana el deadline
+    más cercano y después el orden de llegada. Los elementos cuyo
+    ``deadline`` ya pasó se descartan al desencolar y se contabilizan como
+    expirados.
+
+    Con ``backend`` (por ejemplo :class:`~orchestrator.queue_storage.SegmentLogBackend`)
+    los payloads se persisten fuera del heap y, al construir el gestor, se
+    recuperan los elementos pendientes de una ejecución anterior.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        *,
+        weights: Mapping[str, float] | None = None,
+        wait_samples: int | None = None,
+        backend: QueueBackend | None = None,
+    ) -> None:
         names_list = list(dict.fromkeys(names))
         if not names_list:
             raise ValueError("At least one queue must be declared")
-        self._queues: Dict[str, Deque[QueueItem]] = {name: deque() for name in names_list}
+        weights = weights or {}
+        unknown = set(weights) - set(names_list)
+        if unknown:
+            raise KeyError(f"Weights declared for unknown queues: {sorted(unknown)}")
+        self._weights: Dict[str, float] = {}
+        for name in names_list:
+            weight = float(weights.get(name, 1.0))
+            if weight <= 0:
+                raise ValueError("Queue weight must be > 0")
+            self._weights[name] = weight
+        self._queues: Dict[str, List[_HeapEntry]] = {name: [] for name in names_list}
         self._stats: Dict[str, Dict[str, int]] = {
-            name: {"enqueued": 0, "dequeued": 0} for name in names_list
+            name: {"enqueued": 0, "dequeued": 0, "expired": 0} for name in names_list
+        }
+        self._arrivals: Dict[str, Deque[Tuple[int, float]]] = {
+            name: deque() for name in names_list
         }
+        self._consumed: Dict[str, Set[int]] = {name: set() for name in names_list}
+        self._oldest: Dict[str, float | None] = dict.fromkeys(names_list)
+        self._backlog = 0
+        self._waits: Dict[str, _WaitHistogram] | None = (
+            {name: _WaitHistogram(wait_samples) for name in names_list}
+            if wait_samples
+            else None
+        )
+        self._sequence = count()
+        self._virtual_time = 0.0
+        self._finish: Dict[str, float] = {name: 0.0 for name in names_list}
+        self._ready: List[Tuple[float, int, str]] = []
+        self._in_ready: Set[str] = set()
         self._lock = Lock()
+        self._not_empty: Dict[str, Condition] = {
+            name: Condition(self._lock) for name in names_list
+        }
+        self._any_not_empty = Condition(self._lock)
+        self._backend = backend
+        if backend is not None:
+            self._recover(backend)
 
-    def enqueue(self, queue: str, payload: Any, *, now: float | None = None) -> None:
+    def enqueue(
+        self,
+        queue: str,
+        payload: Any,
+        *,
+        now: float | None = None,
+        priority: int = 0,
+        deadline: float | None = None,
+    ) -> None:
         now_monotonic = monotonic() if now is None else now
         with self._lock:
             self._ensure_queue(queue)
-            self._queues[queue].append(QueueItem(payload=payload, enqueued_at=now_monotonic))
-            self._stats[queue]["enqueued"] += 1
+            sequence = next(self._sequence)
+            if self._backend is not None:
+                payload = self._backend.append(
+                    queue,
+                    sequence,
+                    payload,
+                    enqueued_at=now_monotonic,
+                    priority=priority,
+                    deadline=deadline,
+                )
+            self._push(queue, sequence, payload, now_monotonic, priority, deadline)
+            self._not_empty[queue].notify()
+            self._any_not_empty.notify()
+
+    def dequeue(
+        self,
+        queue: str,
+        *,
+        now: float | None = None,
+        timeout: float | None = 0.0,
+    ) -> Any | None:
+        """Desencola de ``queue``.
+
+        Con ``timeout=0`` (por defecto) no bloquea; con un valor positivo
+        espera hasta ese número de segundos y con ``None`` espera sin límite.
+        Devuelve ``None`` si no llegó ningún elemento a tiempo.
+        """
 
-    def dequeue(self, queue: str) -> Any | None:
         with self._lock:
             self._ensure_queue(queue)
-            if not self._queues[queue]:
-                return None
-            item = self._queues[queue].popleft()
-            self._stats[queue]["dequeued"] += 1
-            return item.payload
+            item = self._wait_for(
+                self._not_empty[queue],
+                lambda current: self._pop(queue, current),
+                now,
+                timeout,
+            )
+            return None if item is None else item.payload
+
+    def dequeue_next(
+        self,
+        *,
+        now: float | None = None,
+        timeout: float | None = 0.0,
+    ) -> Tuple[str, Any] | None:
+        """Desencola el siguiente elemento global según los pesos de cada cola.
+
+        Devuelve ``(cola, payload)`` o ``None`` si todas están vacías. Coste
+        ``O(log n)``: un pop en el heap de colas activas y otro en la cola
+        elegida. ``timeout`` se interpreta como en :meth:`dequeue`.
+        """
 
-    def depth(self, queue: str) -> int:
         with self._lock:
-            self._ensure_queue(queue)
-            return len(self._queues[queue])
+            return self._wait_for(self._any_not_empty, self._pop_next, now, timeout)
 
-    def stats(self) -> List[QueueSnapshot]:
+    def dequeue_batch(
+        self,
+        max_items: int,
+        max_wait: float,
+        *,
+        queue: str | None = None,
+        now: float | None = None,
+    ) -> List[Tuple[str, Any]]:
+        """Agrupa hasta ``max_items`` elementos esperando como mucho ``max_wait``.
+
+        Devuelve en cuanto el lote está completo o vence el plazo, con los
+        elementos reunidos hasta entonces (posiblemente ninguno). Sin
+        ``queue`` se reparte entre colas como :meth:`dequeue_next`.
+        """
+
+        if max_items <= 0:
+            raise ValueError("max_items must be > 0")
+        if queue is not None:
+            self._ensure_queue(queue)
+        deadline = monotonic() + max(0.0, max_wait)
+        batch: List[Tuple[str, Any]] = []
         with self._lock:
-            snapshots: List[QueueSnapshot] = []
-            now = monotonic()
-            for name, queue in self._queues.items():
-                oldest_age: float | None = None
-                if queue:
-                    oldest_age = max(0.0, now - queue[0].enqueued_at)
-                stats = self._stats[name]
-                snapshots.append(
-                    QueueSnapshot(
-                        name=name,
-                        depth=len(queue),
-                        total_enqueued=stats["enqueued"],
-                        total_dequeued=stats["dequeued"],
-                        oldest_age=oldest_age,
+            while len(batch) < max_items:
+                remaining = max(0.0, deadline - monotonic())
+                if queue is None:
+                    entry = self._wait_for(
+                        self._any_not_empty, self._pop_next, now, remaining
+                    )
+                else:
+                    item = self._wait_for(
+                        self._not_empty[queue],
+                        lambda current: self._pop(queue, current),
+                        now,
+                        remaining,
                     )
+                    entry = None if item is None else (queue, item.payload)
+                if entry is None:
+                    break
+                batch.append(entry)
+        return batch
+
+    def depth(self, queue: str) -> int:
+        self._ensure_queue(queue)
+        return len(self._queues[queue])
+
+    def total_backlog(self) -> int:
+        """Elementos pendientes en todas las colas; O(1) y sin lock."""
+
+        return self._backlog
+
+    def wait_percentiles(
+        self,
+        queue: str,
+        percentiles: Iterable[float] = (50.0, 95.0, 99.0),
+    ) -> Dict[float, float | None]:
+        """Percentiles de espera (segundos) de las últimas muestras de ``queue``.
+
+        Requiere haber creado el gestor con ``wait_samples``.
+        """
+
+        self._ensure_queue(queue)
+        if self._waits is None:
+            raise RuntimeError("Wait time tracking is disabled; pass wait_samples")
+        histogram = self._waits[queue]
+        with self._lock:
+            return {pct: histogram.percentile(pct) for pct in percentiles}
+
+    def stats(self) -> List[QueueSnapshot]:
+        # Lectura sin lock: cada valor es coherente por sí mismo aunque el
+        # conjunto pueda mezclar operaciones concurrentes.
+        now = monotonic()
+        snapshots: List[QueueSnapshot] = []
+        for name, queue in self._queues.items():
+            oldest = self._oldest[name]
+            stats = self._stats[name]
+            snapshots.append(
+                QueueSnapshot(
+                    name=name,
+                    depth=len(queue),
+                    total_enqueued=stats["enqueued"],
+                    total_dequeued=stats["dequeued"],
+                    oldest_age=None if oldest is None else max(0.0, now - oldest),
+                    total_expired=stats["expired"],
                 )
-            return snapshots
+            )
+        return snapshots
 
     def clear(self) -> None:
         with self._lock:
             for queue in self._queues.values():
                 queue.clear()
+            if self._backend is not None:
+                self._backend.clear()
             for stats in self._stats.values():
                 stats["enqueued"] = 0
                 stats["dequeued"] = 0
+                stats["expired"] = 0
+            for name in self._queues:
+                self._arrivals[name].clear()
+                self._consumed[name].clear()
+                self._oldest[name] = None
+                if self._waits is not None:
+                    self._waits[name].clear()
+            self._backlog = 0
+            self._virtual_time = 0.0
+            self._finish = dict.fromkeys(self._finish, 0.0)
+            self._ready.clear()
+            self._in_ready.clear()
+
+    def _wait_for(
+        self,
+        condition: Condition,
+        attempt: Callable[[float], _T | None],
+        now: float | None,
+        timeout: float | None,
+    ) -> _T | None:
+        # Se llama con ``self._lock`` tomado.
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            result = attempt(monotonic() if now is None else now)
+            if result is not None:
+                return result
+            if deadline is None:
+                condition.wait()
+                continue
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return None
+            condition.wait(remaining)
+
+    def _pop_next(self, now: float) -> Tuple[str, Any] | None:
+        while self._ready:
+            tag, _, queue = heapq.heappop(self._ready)
+            self._in_ready.discard(queue)
+            item = self._pop(queue, now)
+            if item is None:
+                continue
+            self._virtual_time = tag
+            self._finish[queue] = tag
+            if self._queues[queue]:
+                self._activate(queue, next(self._sequence))
+            return queue, item.payload
+        return None
+
+    def _push(
+        self,
+        queue: str,
+        sequence: int,
+        payload: Any,
+        enqueued_at: float,
+        priority: int,
+        deadline: float | None,
+    ) -> None:
+        item = QueueItem(
+            payload=payload,
+            enqueued_at=enqueued_at,
+            priority=priority,
+            deadline=deadline,
+        )
+        heapq.heappush(
+            self._queues[queue],
+            (priority, inf if deadline is None else deadline, sequence, item),
+        )
+        self._stats[queue]["enqueued"] += 1
+        self._backlog += 1
+        arrivals = self._arrivals[queue]
+        arrivals.append((sequence, enqueued_at))
+        if len(arrivals) == 1:
+            self._oldest[queue] = enqueued_at
+        if queue not in self._in_ready:
+            self._activate(queue, sequence)
+
+    def _recover(self, backend: QueueBackend) -> None:
+        last_sequence = -1
+        for record in backend.recover():
+            if record.queue not in self._queues:
+                logger.warning(
+                    "Dropping recovered item %s for undeclared queue '%s'",
+                    record.sequence,
+                    record.queue,
+                )
+                backend.ack(record.ref)
+                continue
+            self._push(
+                record.queue,
+                record.sequence,
+                record.ref,
+                record.enqueued_at,
+                record.priority,
+                record.deadline,
+            )
+            last_sequence = max(last_sequence, record.sequence)
+        self._sequence = count(last_sequence + 1)
+
+    def _activate(self, queue: str, sequence: int) -> None:
+        tag = max(self._virtual_time, self._finish[queue]) + 1.0 / self._weights[queue]
+        heapq.heappush(self._ready, (tag, sequence, queue))
+        self._in_ready.add(queue)
+
+    def _pop(self, queue: str, now: float) -> QueueItem | None:
+        entries = self._queues[queue]
+        stats = self._stats[queue]
+        while entries:
+            _, _, sequence, item = heapq.heappop(entries)
+            self._backlog -= 1
+            self._forget_arrival(queue, sequence)
+            if self._backend is not None:
+                ref = item.payload
+                if item.deadline is None or item.deadline >= now:
+                    item.payload = self._backend.read(ref)
+                self._backend.ack(ref)
+            if item.deadline is not None and item.deadline < now:
+                stats["expired"] += 1
+                continue
+            stats["dequeued"] += 1
+            if self._waits is not None:
+                self._waits[queue].record(max(0.0, now - item.enqueued_at))
+            return item
+        return None
+
+    def _forget_arrival(self, queue: str, sequence: int) -> None:
+        # Borrado perezoso: el heap no sale en orden de llegada, así que se
+        # marca la secuencia y se purga la cabeza de ``arrivals`` (amortizado
+        # O(1)) para mantener la antigüedad del más viejo.
+        arrivals = self._arrivals[queue]
+        consumed = self._consumed[queue]
+        consumed.add(sequence)
+        while arrivals and arrivals[0][0] in consumed:
+            consumed.discard(arrivals.popleft()[0])
+        self._oldest[queue] = arrivals[0][1] if arrivals else None
 
     def _ensure_queue(self, queue: str) -> None:
         if queue not in self._queues:
             raise KeyError(f"Unknown queue '{queue}'")
 
 
-__all__ = ["QueueManager", "QueueSnapshot"]
+class AsyncQueueManager:
+    """Contraparte asyncio de :class:`QueueManager`.
+
+    Reutiliza un ``QueueManager`` para el orden y las métricas; los
+    consumidores esperan en futures del bucle en lugar de bloquear hilos.
+    ``put`` es seguro desde cualquier hilo: si se invoca fuera del bucle,
+    despierta al consumidor con ``call_soon_threadsafe``.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        *,
+        weights: Mapping[str, float] | None = None,
+        wait_samples: int | None = None,
+        backend: QueueBackend | None = None,
+    ) -> None:
+        self._manager = QueueManager(
+            names, weights=weights, wait_samples=wait_samples, backend=backend
+        )
+        self._waiters: Deque[Tuple[str | None, asyncio.Future[None]]] = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def manager(self) -> QueueManager:
+        return self._manager
+
+    def put(
+        self,
+        queue: str,
+        payload: Any,
+        *,
+        now: float | None = None,
+        priority: int = 0,
+        deadline: float | None = None,
+    ) -> None:
+        self._manager.enqueue(
+            queue, payload, now=now, priority=priority, deadline=deadline
+        )
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wake(queue)
+        else:
+            loop.call_soon_threadsafe(self._wake, queue)
+
+    async def get(
+        self, queue: str | None = None, *, timeout: float | None = None
+    ) -> Tuple[str, Any] | None:
+        """Espera el siguiente elemento de ``queue`` (o de cualquiera, con pesos).
+
+        Devuelve ``(cola, payload)`` o ``None`` si vence ``timeout``.
+        """
+
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            entry = self._try_get(queue)
+            if entry is not None:
+                return entry
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            waiter: asyncio.Future[None] = loop.create_future()
+            entry_key = (queue, waiter)
+            self._waiters.append(entry_key)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Nos despertaron pero no vamos a consumir: que reintente otro.
+                    self._wake_all()
+                raise
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+                try:
+                    self._waiters.remove(entry_key)
+                except ValueError:
+                    pass
+
+    async def get_batch(
+        self,
+        max_items: int,
+        max_wait: float,
+        *,
+        queue: str | None = None,
+    ) -> List[Tuple[str, Any]]:
+        """Versión asíncrona de :meth:`QueueManager.dequeue_batch`."""
+
+        if max_items <= 0:
+            raise ValueError("max_items must be > 0")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, max_wait)
+        batch: List[Tuple[str, Any]] = []
+        while len(batch) < max_items:
+            entry = await self.get(queue, timeout=max(0.0, deadline - loop.time()))
+            if entry is None:
+                break
+            batch.append(entry)
+        return batch
+
+    def _try_get(self, queue: str | None) -> Tuple[str, Any] | None:
+        if queue is None:
+            return self._manager.dequeue_next()
+        item = self._manager.dequeue(queue)
+        return None if item is None else (queue, item)
+
+    def _wake(self, queue: str) -> None:
+        for index, (wanted, waiter) in enumerate(self._waiters):
+            if waiter.done() or (wanted is not None and wanted != queue):
+                continue
+            del self._waiters[index]
+            waiter.set_result(None)
+            return
+
+    def _wake_all(self) -> None:
+        while self._waiters:
+            _, waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+__all__ = ["AsyncQueueManager", "QueueManager", "QueueSnapshot"]
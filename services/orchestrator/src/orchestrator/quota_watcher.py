@@ -0,0 +1,76 @@
+"""Recarga en caliente de ``tenants.quotas.yaml`` sobre un AdmissionController."""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Callable, Iterable, Mapping
+
+import yaml  # type: ignore[import-untyped]
+from core.watch import FileWatcher
+
+from .admission import AdmissionController, QuotaChanges
+
+logger = logging.getLogger(__name__)
+
+QuotaLoader = Callable[[Path], Iterable[Mapping[str, object]]]
+
+
+def load_quota_file(path: str | Path) -> list[Mapping[str, object]]:
+    """Lee el fichero de cuotas con la misma estructura que ``from_dict``."""
+
+    with Path(path).open("r", encoding="utf-8") as fh:
+        data = yaml.safe_load(fh) or []
+    if not isinstance(data, list):
+        raise TypeError(f"Quota file {path} must contain a list of tenants")
+    return data
+
+
+class QuotaFileWatcher:
+    """Vigila un fichero de cuotas y aplica los cambios de forma incremental.
+
+    ``reload()`` puede invocarse explícitamente (por ejemplo desde un
+    endpoint de administración); ``start()`` lanza además un hilo que compara
+    el ``mtime`` del fichero cada ``interval`` segundos. Un fichero inválido
+    se registra y se ignora: el controlador conserva la última tabla buena.
+    """
+
+    def __init__(
+        self,
+        controller: AdmissionController,
+        path: str | Path,
+        *,
+        interval: float = 5.0,
+        loader: QuotaLoader = load_quota_file,
+    ) -> None:
+        self._controller = controller
+        self._loader = loader
+        self._watcher = FileWatcher(
+            path, self._apply, interval=interval, name="quota-watcher"
+        )
+
+    def _apply(self, path: Path) -> QuotaChanges:
+        changes = self._controller.apply_config(self._loader(path))
+        if changes.changed:
+            logger.info(
+                "Quotas reloaded from %s: added=%s removed=%s resized=%s",
+                path,
+                len(changes.added),
+                len(changes.removed),
+                len(changes.resized),
+            )
+        return changes
+
+    def reload(self, *, force: bool = False) -> QuotaChanges | None:
+        """Aplica el fichero si cambió desde la última carga (o si ``force``)."""
+
+        return self._watcher.check(force=force)
+
+    def start(self) -> None:
+        self._watcher.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._watcher.stop(timeout)
+
+
+__all__ = ["QuotaFileWatcher", "load_quota_file"]
@@ -1,7 +1,7 @@
+from threading import Thread
 from time import monotonic
 
 import pytest
-
 from orchestrator.admission import AdmissionController, Quota
 
 
@@ -56,3 +56,131 @@ def test_snapshot_returns_tokens(controller: AdmissionController) -> None:
     assert "fast" in snapshot["default"]
     fast_view = snapshot["default"]["fast"]
     assert fast_view["tokens"] <= fast_view["max_tokens"]
+
+
+def test_allow_many_preserves_order_and_limits(controller: AdmissionController) -> None:
+    now = monotonic()
+    decisions = controller.allow_many(
+        [
+            ("default", "fast", 1),
+            ("default", "batch", 1),
+            ("default", "fast", 1),
+            ("default", "batch", 1),
+            ("default", "fast", 1),
+        ],
+        now=now,
+    )
+    assert [d.allowed for d in decisions] == [True, True, True, False, False]
+    assert decisions[3].reason == "max_inflight"
+    assert decisions[4].reason == "max_inflight"
+
+
+def test_concurrent_allow_never_exceeds_inflight() -> None:
+    controller = AdmissionController(
+        {
+            f"t{i}": {"fast": Quota(rate=1000, burst=1000, max_inflight=50)}
+            for i in range(4)
+        }
+    )
+    admitted = [0] * 4
+
+    def worker(index: int) -> None:
+        for _ in range(200):
+            if controller.allow(f"t{index}", "fast").allowed:
+                admitted[index] += 1
+
+    threads = [Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admitted == [50] * 4
+    snapshot = controller.snapshot()
+    assert all(snapshot[f"t{i}"]["fast"]["inflight"] == 50 for i in range(4))
+
+
+def test_snapshot_arrays_projects_refill_without_mutating(
+    controller: AdmissionController,
+) -> None:
+    now = monotonic()
+    assert controller.allow("default", "fast", weight=5, now=now).allowed
+    arrays = controller.snapshot_arrays(now=now + 0.2)
+    fast = arrays.keys.index(("default", "fast"))
+    assert arrays.tokens[fast] == pytest.approx(2.0)
+    assert arrays.inflight[fast] == 1
+    assert controller.snapshot_arrays(now=now).tokens[fast] == pytest.approx(0.0)
+
+
+def test_from_dict_builds_store_directly() -> None:
+    controller = AdmissionController.from_dict(
+        [
+            {"tenant": "a", "fast": {"rate": 1, "burst": 2, "max_inflight": 3}},
+            {"tenant": "b", "batch": {"rate": 1, "burst": 1, "max_inflight": 1}},
+        ]
+    )
+    arrays = controller.snapshot_arrays()
+    assert arrays.keys == (("a", "fast"), ("b", "batch"))
+    assert arrays.max_inflight.tolist() == [3, 1]
+    with pytest.raises(ValueError):
+        AdmissionController.from_dict([{"tenant": "empty"}])
+
+
+def test_apply_quotas_keeps_state_and_diffs(controller: AdmissionController) -> None:
+    now = monotonic()
+    assert controller.allow("default", "fast", weight=3, now=now).allowed
+    changes = controller.apply_quotas(
+        {
+            "default": {"fast": Quota(rate=10, burst=1, max_inflight=4)},
+            "other": {"batch": Quota(rate=1, burst=1, max_inflight=1)},
+        },
+        now=now,
+    )
+    assert changes.added == (("other", "batch"),)
+    assert changes.removed == (("default", "batch"),)
+    assert changes.resized == (("default", "fast"),)
+    fast = controller.snapshot()["default"]["fast"]
+    assert fast["inflight"] == 1
+    assert fast["max_inflight"] == 4
+    assert fast["tokens"] <= 1
+    assert "batch" not in controller.snapshot()["default"]
+    assert controller.allow("other", "batch", now=now).allowed
+    # Releasing work admitted before the bucket was retired is a no-op.
+    controller.release("default", "batch")
+    assert not controller.apply_quotas(
+        {
+            "default": {"fast": Quota(rate=10, burst=1, max_inflight=4)},
+            "other": {"batch": Quota(rate=1, burst=1, max_inflight=1)},
+        },
+        now=now,
+    ).changed
+
+
+def test_snapshot_keys_stay_aligned_during_reloads() -> None:
+    def table(extra: int) -> dict[str, dict[str, Quota]]:
+        quotas = {"base": {"q": Quota(rate=1, burst=1, max_inflight=1)}}
+        for index in range(extra):
+            quotas[f"t{index}"] = {"q": Quota(rate=1, burst=index + 2, max_inflight=1)}
+        return quotas
+
+    controller = AdmissionController(table(0))
+    done = False
+
+    def reload() -> None:
+        extra = 0
+        while not done:
+            extra = (extra + 7) % 40
+            controller.apply_quotas(table(extra))
+
+    worker = Thread(target=reload)
+    worker.start()
+    try:
+        for _ in range(300):
+            arrays = controller.snapshot_arrays()
+            expected = [
+                1 if tenant == "base" else int(tenant[1:]) + 2
+                for tenant, _ in arrays.keys
+            ]
+            assert arrays.max_tokens.tolist() == expected
+    finally:
+        done = True
+        worker.join()
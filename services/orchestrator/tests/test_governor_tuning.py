@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from orchestrator import GovernorConfig
+from orchestrator.governor_tuning import (
+    SearchSpace,
+    load_trace,
+    simulate,
+    synthetic_trace,
+    tune,
+)
+
+
+def test_synthetic_trace_is_deterministic() -> None:
+    assert synthetic_trace(seconds=30, seed=3) == synthetic_trace(seconds=30, seed=3)
+    assert synthetic_trace(seconds=30, seed=3) != synthetic_trace(seconds=30, seed=4)
+
+
+def test_simulate_scores_tracking_and_clamping() -> None:
+    trace = synthetic_trace(seconds=300, seed=1)
+    default = simulate(GovernorConfig(), trace)
+    sluggish = simulate(GovernorConfig(kp=0.05, ki=0.0, kd=0.0, kf=0.0), trace)
+    clamped = simulate(GovernorConfig(max_temperature=70.0), trace)
+    assert sluggish.mean_abs_error > default.mean_abs_error
+    assert default.clamp_loss == 0.0
+    assert clamped.clamp_loss > 0.0
+    assert clamped.score > default.score
+    assert default.gains == {"kp": 0.6, "ki": 0.25, "kd": 0.15, "kf": 0.4}
+
+
+def test_load_trace_round_trip(tmp_path) -> None:
+    samples = synthetic_trace(seconds=5)
+    path = tmp_path / "trace.jsonl"
+    with path.open("w", encoding="utf-8") as fh:
+        for sample in samples:
+            fh.write(
+                json.dumps({"timestamp": sample.timestamp, **sample.metrics.__dict__})
+                + "\n"
+            )
+    assert load_trace(path) == samples
+
+    path.write_text(
+        '{"timestamp": 0, "utilisation": 0.5}\n{"timestamp": 1}\n', encoding="utf-8"
+    )
+    with pytest.raises(ValueError):
+        load_trace(path)
+
+
+@pytest.mark.parametrize("method", ["grid", "random", "bayes"])
+def test_tune_never_recommends_worse_than_baseline(method: str) -> None:
+    trace = synthetic_trace(seconds=200, seed=2)
+    report = tune(trace, method=method, budget=16, workers=1, seed=0)
+    assert report.best.score <= report.baseline.score
+    assert report.recommended.kp == report.best.gains["kp"]
+    assert len(report.trials) == 16
+    assert [trial.score for trial in report.trials] == sorted(
+        trial.score for trial in report.trials
+    )
+    assert "baseline" in report.to_text()
+
+
+@pytest.mark.parametrize("budget", [1, 5])
+def test_grid_search_stays_within_budget(budget: int) -> None:
+    report = tune(
+        synthetic_trace(seconds=60, seed=1), method="grid", budget=budget, workers=1
+    )
+    assert len(report.trials) == budget
+    assert len({tuple(trial.gains.values()) for trial in report.trials}) == budget
+
+
+def test_tune_in_process_pool_matches_serial() -> None:
+    trace = synthetic_trace(seconds=100, seed=5)
+    space = SearchSpace(kd=(0.0, 0.0))
+    serial = tune(trace, method="random", budget=4, space=space, workers=1, seed=9)
+    pooled = tune(trace, method="random", budget=4, space=space, workers=2, seed=9)
+    assert serial.trials == pooled.trials
+
+
+def test_tune_rejects_unknown_method() -> None:
+    with pytest.raises(ValueError):
+        tune(synthetic_trace(seconds=10), method="anneal")
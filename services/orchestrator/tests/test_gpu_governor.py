@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import math
+import random
+from typing import Any, Dict
 
 import pytest
-
 from orchestrator import (
+    FleetGovernor,
+    GovernorConfig,
     GpuGovernor,
     GpuMetrics,
-    GovernorConfig,
+    Job,
+    JobScheduler,
+    build_gpu_fleet,
 )
 
 
@@ -82,3 +87,143 @@ def test_governor_requires_positive_backlog_target() -> None:
     )
     with pytest.raises(ValueError):
         governor.update(metrics)
+
+
+def _random_metrics(rng: random.Random) -> GpuMetrics:
+    return GpuMetrics(
+        utilisation=rng.random(),
+        memory_utilisation=rng.uniform(0.2, 0.95),
+        temperature=rng.uniform(50.0, 90.0),
+        backlog=rng.uniform(0, 100),
+        backlog_target=rng.uniform(1, 50),
+        concurrency=rng.randint(1, 16),
+        micro_batch=rng.randint(1, 8),
+        max_new_tokens=rng.choice([512, 1024, 2048]),
+    )
+
+
+def test_fleet_governor_matches_per_device_governors() -> None:
+    rng = random.Random(7)
+    ids = [f"gpu{index}" for index in range(6)]
+    fleet = FleetGovernor(ids)
+    singles = {gpu_id: GpuGovernor() for gpu_id in ids}
+    for step in range(12):
+        # Some devices skip steps, so their loops advance independently.
+        batch = {gpu_id: _random_metrics(rng) for gpu_id in ids if rng.random() < 0.8}
+        if not batch:
+            continue
+        result = fleet.update(batch, now=step * 0.5)
+        for gpu_id, metrics in batch.items():
+            expected = singles[gpu_id].update(metrics, now=step * 0.5)
+            actual = result.decisions[gpu_id]
+            assert math.isclose(
+                actual.concurrency_scale, expected.concurrency_scale, abs_tol=1e-9
+            )
+            assert (actual.micro_batch, actual.max_new_tokens) == (
+                expected.micro_batch,
+                expected.max_new_tokens,
+            )
+            assert actual.divert_to_cpu == expected.divert_to_cpu
+            assert actual.pause_queues == expected.pause_queues
+
+
+def test_fleet_governor_summary_and_pressure() -> None:
+    cfg = GovernorConfig(max_temperature=82.0, thermal_margin=4.0)
+    fleet = FleetGovernor(["gpu0", "gpu1", "gpu2"], cfg)
+    base: Dict[str, Any] = dict(
+        memory_utilisation=0.3,
+        backlog=10,
+        backlog_target=10,
+        concurrency=4,
+        micro_batch=2,
+        max_new_tokens=1024,
+    )
+    result = fleet.update(
+        {
+            "gpu0": GpuMetrics(utilisation=0.6, temperature=60.0, **base),
+            "gpu1": GpuMetrics(utilisation=0.8, temperature=80.0, **base),
+            "gpu2": GpuMetrics(utilisation=0.9, temperature=85.0, **base),
+        },
+        now=0.0,
+    )
+    assert result.pressure == {"gpu0": 0.0, "gpu1": pytest.approx(0.5), "gpu2": 1.0}
+    assert result.summary.devices == 3
+    assert result.summary.hottest == "gpu2"
+    assert result.summary.diverted == ("gpu2",)
+    assert result.summary.pressured == ("gpu1", "gpu2")
+    assert result.summary.total_backlog == pytest.approx(30.0)
+    with pytest.raises(KeyError):
+        fleet.update({"gpu9": GpuMetrics(utilisation=0.5, temperature=60.0, **base)})
+
+
+def test_fleet_governor_deprioritises_warm_gpus_in_scheduler() -> None:
+    scheduler = JobScheduler(
+        build_gpu_fleet({"gpu0": {"fast": 2}, "gpu1": {"fast": 2}})
+    )
+    fleet = FleetGovernor(["gpu0", "gpu1"], GovernorConfig(thermal_margin=6.0))
+    base: Dict[str, Any] = dict(
+        memory_utilisation=0.3,
+        backlog=0,
+        backlog_target=10,
+        concurrency=1,
+        micro_batch=1,
+        max_new_tokens=512,
+    )
+    fleet.update(
+        {
+            # gpu0 is emptier but close to the thermal clamp.
+            "gpu0": GpuMetrics(utilisation=0.1, temperature=79.0, **base),
+            "gpu1": GpuMetrics(utilisation=0.4, temperature=60.0, **base),
+        },
+        now=0.0,
+        scheduler=scheduler,
+    )
+    allocations = scheduler.schedule(
+        [Job(id="job-1", profile="fast"), Job(id="job-2", profile="fast")]
+    )
+    assert [alloc.gpu_id for alloc in allocations] == ["gpu1", "gpu1"]
+
+
+def test_fleet_governor_leaves_scheduler_accounting_alone() -> None:
+    gpus = build_gpu_fleet({"gpu0": {"fast": 2}})
+    scheduler = JobScheduler(gpus)
+    scheduler.schedule([Job(id="job-1", profile="fast")])
+    placed = gpus[0].utilisation
+    base: Dict[str, Any] = dict(
+        memory_utilisation=0.3,
+        backlog=0,
+        backlog_target=10,
+        concurrency=1,
+        micro_batch=1,
+        max_new_tokens=512,
+    )
+    FleetGovernor(["gpu0"]).update(
+        {"gpu0": GpuMetrics(utilisation=0.95, temperature=70.0, **base)},
+        now=0.0,
+        scheduler=scheduler,
+    )
+    assert gpus[0].utilisation == placed
+    assert gpus[0].temperature == 70.0
+
+
+def test_fleet_governor_rejects_gpu_unknown_to_scheduler_before_updating() -> None:
+    scheduler = JobScheduler(build_gpu_fleet({"gpu0": {"fast": 1}}))
+    fleet = FleetGovernor(["gpu0", "gpu1"])
+    base: Dict[str, Any] = dict(
+        memory_utilisation=0.3,
+        backlog=5,
+        backlog_target=10,
+        concurrency=1,
+        micro_batch=4,
+        max_new_tokens=1024,
+    )
+    metrics = {
+        "gpu0": GpuMetrics(utilisation=0.5, temperature=60.0, **base),
+        "gpu1": GpuMetrics(utilisation=0.2, temperature=60.0, **base),
+    }
+    with pytest.raises(KeyError):
+        fleet.update(metrics, now=0.0, scheduler=scheduler)
+    # The failed step left no trace: the next one is still a first sample.
+    assert fleet.update(metrics, now=5.0) == FleetGovernor(["gpu0", "gpu1"]).update(
+        metrics, now=5.0
+    )
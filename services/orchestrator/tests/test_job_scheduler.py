@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import random
+
+import pytest
 from orchestrator import (
     Allocation,
     Job,
@@ -26,7 +29,9 @@ def test_scheduler_respects_capacity() -> None:
     jobs = [Job(id="job-1", profile="fast"), Job(id="job-2", profile="fast")]
     assignments = scheduler.schedule(jobs)
     assert len(assignments) == 1
-    assert assignments[0] == Allocation(job_id="job-1", gpu_id="gpu0", slice_id="gpu0:fast")
+    assert assignments[0] == Allocation(
+        job_id="job-1", gpu_id="gpu0", slice_id="gpu0:fast"
+    )
 
 
 def test_scheduler_skips_hot_gpu() -> None:
@@ -36,3 +41,203 @@ def test_scheduler_skips_hot_gpu() -> None:
     assignments = scheduler.schedule([Job(id="job-1", profile="fast")])
     assert len(assignments) == 1
     assert assignments[0].gpu_id == "gpu1"
+
+
+def _reference_allocate(fleet, config: SchedulerConfig, job: Job):
+    candidates = []
+    for gpu in fleet:
+        if (
+            gpu.temperature >= config.max_temperature
+            or gpu.utilisation >= config.max_utilisation
+        ):
+            continue
+        sl = gpu.slices.get(job.profile)
+        if sl and sl.has_capacity():
+            candidates.append((sl.running / sl.capacity, gpu.utilisation, gpu, sl))
+    if not candidates:
+        return None
+    candidates.sort(key=lambda item: (item[0], item[1]))
+    _, _, gpu, sl = candidates[0]
+    sl.running += 1
+    gpu.utilisation = min(1.0, gpu.utilisation + 1.0 / max(sl.capacity, 1))
+    return Allocation(job.id, gpu.id, sl.id)
+
+
+def test_indexed_placement_matches_full_scan() -> None:
+    rng = random.Random(7)
+    layout = {
+        f"gpu{i}": {
+            "fast": rng.randint(1, 4),
+            "verify": rng.randint(0, 2),
+            "expert": rng.randint(0, 1),
+        }
+        for i in range(30)
+    }
+    layout = {
+        gpu: {p: c for p, c in slices.items() if c} for gpu, slices in layout.items()
+    }
+    config = SchedulerConfig(max_utilisation=2.5)
+    jobs = [
+        Job(id=f"job-{n}", profile=rng.choice(["fast", "verify", "expert"]))
+        for n in range(150)
+    ]
+    reference_fleet = build_gpu_fleet(layout)
+    expected = [
+        a
+        for a in (_reference_allocate(reference_fleet, config, job) for job in jobs)
+        if a
+    ]
+    assert JobScheduler(build_gpu_fleet(layout), config).schedule(jobs) == expected
+
+
+def test_update_gpu_reindexes_thermal_state() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 4}, "gpu1": {"fast": 4}})
+    scheduler = JobScheduler(fleet, SchedulerConfig(max_temperature=80.0))
+    scheduler.update_gpu("gpu0", temperature=85.0)
+    assert {
+        a.gpu_id for a in scheduler.schedule([Job("a", "fast"), Job("b", "fast")])
+    } == {"gpu1"}
+    scheduler.update_gpu("gpu0", temperature=60.0)
+    assert scheduler.schedule([Job("c", "fast")])[0].gpu_id == "gpu0"
+    with pytest.raises(KeyError):
+        scheduler.update_gpu("gpu9", utilisation=0.1)
+
+
+def test_schedule_batch_avoids_stranding_capacity() -> None:
+    layout = {"gpu0": {"fast": 2, "verify": 1}, "gpu1": {"fast": 2, "verify": 1}}
+    jobs = [Job("v1", "verify"), Job("v2", "verify")] + [
+        Job(f"f{i}", "fast") for i in range(4)
+    ]
+    greedy = JobScheduler(build_gpu_fleet(layout)).schedule(jobs)
+    batch = JobScheduler(build_gpu_fleet(layout)).schedule_batch(jobs)
+    assert len(greedy) == 2
+    assert len(batch.allocations) == 4
+    assert batch.placed_ratio == pytest.approx(4 / 6)
+    assert set(batch.unplaced) == {"v1", "v2"}
+
+
+def test_schedule_batch_best_fit_consolidates() -> None:
+    scheduler = JobScheduler(
+        build_gpu_fleet({f"gpu{i}": {"fast": 4} for i in range(3)})
+    )
+    placement = scheduler.schedule_batch([Job(f"f{i}", "fast") for i in range(3)])
+    assert placement.gpus_used == 1
+    assert placement.strategy == "first-fit/decreasing"
+    assert placement.slot_efficiency == pytest.approx(0.75)
+    # The incremental index sees the committed plan.
+    assert scheduler.schedule([Job("next", "fast")])[0].gpu_id == "gpu1"
+
+
+def test_schedule_batch_rejects_unknown_strategy() -> None:
+    scheduler = JobScheduler(build_gpu_fleet({"gpu0": {"fast": 1}}))
+    with pytest.raises(ValueError):
+        scheduler.schedule_batch([Job("a", "fast")], fit="worst")
+
+
+def test_release_frees_slice_and_restores_utilisation() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 1}})
+    scheduler = JobScheduler(fleet)
+    (allocation,) = scheduler.schedule([Job(id="job-1", profile="fast")])
+    assert scheduler.schedule([Job(id="job-2", profile="fast")]) == []
+
+    assert allocation.release() is True
+    assert allocation.release() is False
+    assert fleet[0].utilisation == pytest.approx(0.0)
+    assert fleet[0].slices["fast"].running == 0
+    assert [
+        alloc.job_id for alloc in scheduler.schedule([Job(id="job-2", profile="fast")])
+    ] == ["job-2"]
+
+
+def test_running_job_cannot_be_scheduled_twice() -> None:
+    scheduler = JobScheduler(build_gpu_fleet({"gpu0": {"fast": 2}}))
+    scheduler.schedule([Job(id="job-1", profile="fast")])
+    with pytest.raises(ValueError):
+        scheduler.schedule([Job(id="job-1", profile="fast")])
+
+
+def test_duplicate_ids_are_rejected_before_placing_anything() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 4}})
+    scheduler = JobScheduler(fleet)
+    scheduler.schedule([Job(id="running", profile="fast")])
+    batches = [
+        [Job(id="a", profile="fast"), Job(id="a", profile="fast")],
+        [Job(id="b", profile="fast"), Job(id="running", profile="fast")],
+    ]
+    for jobs in batches:
+        with pytest.raises(ValueError):
+            scheduler.schedule(jobs)
+        with pytest.raises(ValueError):
+            scheduler.schedule_batch(jobs)
+    assert [alloc.job_id for alloc in scheduler.running()] == ["running"]
+    assert fleet[0].slices["fast"].running == 1
+
+
+def test_leases_expire_unless_renewed() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 2}})
+    scheduler = JobScheduler(fleet, SchedulerConfig(lease_seconds=10.0))
+    first, second = scheduler.schedule(
+        [Job(id="job-1", profile="fast"), Job(id="job-2", profile="fast")], now=0.0
+    )
+    assert first.expires_at == 10.0
+
+    assert scheduler.renew("job-2", now=8.0).expires_at == 18.0
+    expired = scheduler.expire(now=12.0)
+    assert [alloc.job_id for alloc in expired] == ["job-1"]
+    assert [alloc.job_id for alloc in scheduler.running()] == ["job-2"]
+    assert scheduler.expire(now=18.0)[0].job_id == "job-2"
+    assert fleet[0].slices["fast"].running == 0
+    with pytest.raises(KeyError):
+        scheduler.renew("job-2", now=20.0)
+
+
+def test_preemption_evicts_least_important_job() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 1}, "gpu1": {"fast": 1}})
+    scheduler = JobScheduler(fleet)
+    scheduler.schedule(
+        [
+            Job(id="batch", profile="fast", priority=5),
+            Job(id="eval", profile="fast", priority=1),
+        ]
+    )
+
+    (allocation,) = scheduler.schedule([Job(id="urgent", profile="fast", priority=0)])
+    assert [alloc.job_id for alloc in scheduler.drain_preempted()] == ["batch"]
+    assert allocation.job_id == "urgent"
+    assert scheduler.drain_preempted() == []
+    # Nothing strictly less important is left to evict.
+    assert scheduler.schedule([Job(id="peer", profile="fast", priority=1)]) == []
+
+
+def test_preemption_skips_hot_gpu() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 1}})
+    scheduler = JobScheduler(fleet, SchedulerConfig(max_temperature=80.0))
+    scheduler.schedule([Job(id="batch", profile="fast", priority=5)])
+    scheduler.update_gpu("gpu0", utilisation=1.0, temperature=90.0)
+
+    assert scheduler.schedule([Job(id="urgent", profile="fast")]) == []
+    assert scheduler.drain_preempted() == []
+
+
+def test_schedule_batch_registers_leases() -> None:
+    fleet = build_gpu_fleet({"gpu0": {"fast": 2}})
+    scheduler = JobScheduler(fleet)
+    placement = scheduler.schedule_batch(
+        [Job(id="job-1", profile="fast"), Job(id="job-2", profile="fast")]
+    )
+    assert len(placement.allocations) == 2
+    for allocation in placement.allocations:
+        assert allocation.release() is True
+    assert fleet[0].utilisation == pytest.approx(0.0)
+
+
+def test_victim_heap_stays_bounded_across_release_cycles() -> None:
+    scheduler = JobScheduler(build_gpu_fleet({"gpu0": {"fast": 2}}))
+    scheduler.schedule([Job(id="resident", profile="fast", priority=5)])
+    for cycle in range(10_000):
+        (allocation,) = scheduler.schedule([Job(id=f"job-{cycle}", profile="fast")])
+        allocation.release()
+    assert len(scheduler._victims["fast"]) <= 2 * 1 + 16
+    (allocation,) = scheduler.schedule([Job(id="urgent", profile="fast", priority=0)])
+    assert scheduler.schedule([Job(id="urgent-2", profile="fast", priority=0)])
+    assert [alloc.job_id for alloc in scheduler.drain_preempted()] == ["resident"]
@@ -0,0 +1,118 @@
+import threading
+from pathlib import Path
+
+import pytest
+from orchestrator.queue_storage import SegmentLogBackend
+from orchestrator.queues import QueueManager
+
+
+def test_backlog_survives_restart(tmp_path: Path) -> None:
+    manager = QueueManager(["fast", "batch"], backend=SegmentLogBackend(tmp_path))
+    manager.enqueue("batch", {"id": 1})
+    manager.enqueue("batch", {"id": 2}, priority=-1)
+    manager.enqueue("fast", {"id": 3})
+    assert manager.dequeue("fast") == {"id": 3}
+
+    recovered = QueueManager(["fast", "batch"], backend=SegmentLogBackend(tmp_path))
+    assert recovered.total_backlog() == 2
+    assert recovered.depth("fast") == 0
+    assert recovered.dequeue("batch") == {"id": 2}
+    recovered.enqueue("batch", {"id": 4})
+    assert recovered.dequeue("batch") == {"id": 1}
+    assert recovered.dequeue("batch") == {"id": 4}
+
+
+def test_default_directory_is_storage_queues(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    backend = SegmentLogBackend()
+    QueueManager(["fast"], backend=backend).enqueue("fast", {"id": 1})
+    backend.close()
+    assert any((tmp_path / "storage" / "queues").iterdir())
+
+
+def test_bytes_payloads_are_zero_copy(tmp_path: Path) -> None:
+    manager = QueueManager(["fast"], backend=SegmentLogBackend(tmp_path))
+    manager.enqueue("fast", b"tensor-bytes")
+    payload = manager.dequeue("fast")
+    assert isinstance(payload, memoryview)
+    assert payload.tobytes() == b"tensor-bytes"
+    payload.release()
+
+
+def test_torn_tail_is_ignored_on_recovery(tmp_path: Path) -> None:
+    backend = SegmentLogBackend(tmp_path, segment_bytes=4096)
+    manager = QueueManager(["fast"], backend=backend)
+    manager.enqueue("fast", {"id": 1})
+    manager.enqueue("fast", {"id": 2})
+    backend.close()
+    segment = next(tmp_path.glob("segment-*.log"))
+    data = bytearray(segment.read_bytes())
+    data[data.index(b'{"id":2}')] ^= 0xFF  # corrupt the second record's payload
+    segment.write_bytes(bytes(data))
+
+    recovered = QueueManager(
+        ["fast"], backend=SegmentLogBackend(tmp_path, segment_bytes=4096)
+    )
+    assert recovered.dequeue("fast") == {"id": 1}
+    assert recovered.dequeue("fast") is None
+    recovered.enqueue("fast", {"id": 3})
+    again = QueueManager(
+        ["fast"], backend=SegmentLogBackend(tmp_path, segment_bytes=4096)
+    )
+    assert again.dequeue("fast") == {"id": 3}
+
+
+def test_dead_segments_removed_and_sparse_ones_compacted(tmp_path: Path) -> None:
+    backend = SegmentLogBackend(tmp_path, segment_bytes=512)
+    manager = QueueManager(["batch"], backend=backend)
+    # The oldest item is served last, so its segment pins the head of the log.
+    manager.enqueue("batch", {"id": "keep"}, priority=10)
+    for index in range(40):
+        manager.enqueue("batch", {"id": index, "pad": "x" * 40})
+    assert backend.segment_count > 4
+    for _ in range(40):
+        manager.dequeue("batch")
+    # Acking past the ratio compacted the pinned head without an explicit call.
+    assert backend.segment_count <= 2
+    assert backend.compact() == 0
+    recovered = QueueManager(
+        ["batch"], backend=SegmentLogBackend(tmp_path, segment_bytes=512)
+    )
+    assert recovered.dequeue("batch") == {"id": "keep"}
+
+
+def test_compact_is_safe_alongside_queue_traffic(tmp_path: Path) -> None:
+    backend = SegmentLogBackend(tmp_path, segment_bytes=1024, compact_ratio=0.5)
+    manager = QueueManager(["batch"], backend=backend)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def compact_loop() -> None:
+        while not stop.is_set():
+            try:
+                backend.compact()
+            except BaseException as exc:  # noqa: BLE001 - se comprueba abajo
+                errors.append(exc)
+                return
+
+    worker = threading.Thread(target=compact_loop)
+    worker.start()
+    try:
+        for index in range(2000):
+            manager.enqueue("batch", {"id": index, "pad": "x" * 20}, priority=index % 3)
+            if index % 3:
+                manager.dequeue("batch")
+    finally:
+        stop.set()
+        worker.join()
+    assert not errors
+    pending = manager.total_backlog()
+    backend.close()
+    recovered = QueueManager(
+        ["batch"], backend=SegmentLogBackend(tmp_path, segment_bytes=1024)
+    )
+    assert recovered.total_backlog() == pending
+    drained = [recovered.dequeue("batch") for _ in range(pending)]
+    assert all(item is not None and item["pad"] == "x" * 20 for item in drained)
@@ -1,8 +1,9 @@
+import asyncio
+import threading
 import time
 
 import pytest
-
-from orchestrator.queues import QueueManager
+from orchestrator.queues import AsyncQueueManager, QueueManager
 
 
 @pytest.fixture
@@ -40,3 +41,146 @@ def test_clear_resets_counters(manager: QueueManager) -> None:
     assert snapshot["fast"].depth == 0
     assert snapshot["fast"].total_enqueued == 0
     assert snapshot["fast"].total_dequeued == 0
+
+
+def test_priority_then_deadline_order_within_queue(manager: QueueManager) -> None:
+    manager.enqueue("fast", "low", priority=5)
+    manager.enqueue("fast", "late", priority=0, deadline=time.monotonic() + 100)
+    manager.enqueue("fast", "soon", priority=0, deadline=time.monotonic() + 10)
+    assert [manager.dequeue("fast") for _ in range(3)] == ["soon", "late", "low"]
+
+
+def test_expired_items_are_dropped(manager: QueueManager) -> None:
+    manager.enqueue("fast", "stale", deadline=1.0)
+    manager.enqueue("fast", "fresh")
+    assert manager.dequeue("fast", now=2.0) == "fresh"
+    snapshot = {s.name: s for s in manager.stats()}
+    assert snapshot["fast"].total_expired == 1
+    assert snapshot["fast"].total_dequeued == 1
+
+
+def test_dequeue_next_weighted_fair_share() -> None:
+    manager = QueueManager(["fast", "batch"], weights={"fast": 3, "batch": 1})
+    for index in range(40):
+        manager.enqueue("batch", f"b{index}")
+    for index in range(12):
+        manager.enqueue("fast", f"f{index}")
+    served = [manager.dequeue_next() for _ in range(16)]
+    queues = [entry[0] for entry in served if entry]
+    assert queues.count("fast") == 12
+    assert queues.count("batch") == 4
+    assert manager.dequeue_next() == ("batch", "b4")
+
+
+def test_dequeue_next_idle_queue_gets_no_credit() -> None:
+    manager = QueueManager(["fast", "batch"])
+    for index in range(10):
+        manager.enqueue("batch", index)
+    for _ in range(10):
+        manager.dequeue_next()
+    manager.enqueue("batch", "b")
+    manager.enqueue("fast", "f")
+    first, second = manager.dequeue_next(), manager.dequeue_next()
+    assert first is not None and second is not None
+    assert {first[0], second[0]} == {"fast", "batch"}
+    assert manager.dequeue_next() is None
+
+
+def test_unknown_weight_rejected() -> None:
+    with pytest.raises(KeyError):
+        QueueManager(["fast"], weights={"batch": 1})
+
+
+def test_blocking_dequeue_wakes_on_enqueue(manager: QueueManager) -> None:
+    timer = threading.Timer(0.05, manager.enqueue, args=("fast", "late"))
+    timer.start()
+    started = time.monotonic()
+    assert manager.dequeue("fast", timeout=5) == "late"
+    assert time.monotonic() - started < 1
+    timer.join()
+
+
+def test_blocking_dequeue_times_out(manager: QueueManager) -> None:
+    assert manager.dequeue("fast", timeout=0.01) is None
+    assert manager.dequeue_next(timeout=0.01) is None
+
+
+def test_dequeue_batch_collects_until_full_or_timeout(manager: QueueManager) -> None:
+    for index in range(3):
+        manager.enqueue("batch", index)
+    assert manager.dequeue_batch(2, 0.0, queue="batch") == [("batch", 0), ("batch", 1)]
+    started = time.monotonic()
+    assert manager.dequeue_batch(5, 0.05) == [("batch", 2)]
+    assert time.monotonic() - started >= 0.04
+
+
+def test_async_get_wakes_from_other_thread() -> None:
+    async def scenario() -> tuple:
+        queues = AsyncQueueManager(["fast", "batch"])
+        loop = asyncio.get_running_loop()
+        loop.call_later(
+            0.01,
+            lambda: threading.Thread(target=queues.put, args=("batch", "x")).start(),
+        )
+        first = await queues.get(timeout=5)
+        missing = await queues.get("fast", timeout=0.01)
+        queues.put("fast", 1)
+        queues.put("fast", 2)
+        batch = await queues.get_batch(5, 0.01, queue="fast")
+        return first, missing, batch
+
+    first, missing, batch = asyncio.run(scenario())
+    assert first == ("batch", "x")
+    assert missing is None
+    assert batch == [("fast", 1), ("fast", 2)]
+
+
+def test_async_waiter_for_other_queue_not_woken() -> None:
+    async def scenario() -> tuple:
+        queues = AsyncQueueManager(["fast", "batch"])
+        fast_waiter = asyncio.create_task(queues.get("fast", timeout=1))
+        any_waiter = asyncio.create_task(queues.get(timeout=1))
+        await asyncio.sleep(0)
+        queues.put("batch", "b")
+        queues.put("fast", "f")
+        return await fast_waiter, await any_waiter
+
+    fast, other = asyncio.run(scenario())
+    assert fast == ("fast", "f")
+    assert other == ("batch", "b")
+
+
+def test_oldest_age_tracks_arrival_order_across_priorities() -> None:
+    manager = QueueManager(["fast"])
+    now = time.monotonic()
+    manager.enqueue("fast", "old", now=now - 10, priority=9)
+    manager.enqueue("fast", "urgent", now=now - 1, priority=0)
+    assert manager.dequeue("fast") == "urgent"
+    (snapshot,) = manager.stats()
+    assert snapshot.oldest_age is not None and snapshot.oldest_age >= 10
+    assert manager.dequeue("fast") == "old"
+    assert manager.stats()[0].oldest_age is None
+
+
+def test_total_backlog_is_incremental(manager: QueueManager) -> None:
+    manager.enqueue("fast", 1)
+    manager.enqueue("batch", 2)
+    manager.enqueue("batch", 3, deadline=0.0)
+    assert manager.total_backlog() == 3
+    manager.dequeue("batch", now=1.0)
+    assert manager.total_backlog() == 1
+    manager.clear()
+    assert manager.total_backlog() == 0
+
+
+def test_wait_percentiles_from_ring_buffer() -> None:
+    manager = QueueManager(["fast"], wait_samples=100)
+    for index in range(200):
+        manager.enqueue("fast", index, now=0.0)
+        manager.dequeue("fast", now=0.001 if index < 100 else 0.5)
+    percentiles = manager.wait_percentiles("fast")
+    # Only the last 100 samples (0.5 s) remain in the window.
+    assert percentiles[50.0] == pytest.approx(0.5, rel=0.1)
+    assert percentiles[99.0] == pytest.approx(0.5, rel=0.1)
+    with pytest.raises(RuntimeError):
+        QueueManager(["fast"]).wait_percentiles("fast")
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from orchestrator import AdmissionController
+from orchestrator.quota_watcher import QuotaFileWatcher, load_quota_file
+
+QUOTAS = """
+- tenant: default
+  fast:
+    rate: 10
+    burst: 5
+    max_inflight: 2
+"""
+
+
+def test_load_quota_file_reads_repo_config() -> None:
+    path = Path(__file__).resolve().parents[3] / "configs/policies/tenants.quotas.yaml"
+    controller = AdmissionController.from_dict(load_quota_file(path))
+    assert set(controller.snapshot()["default"]) == {
+        "fast",
+        "realtime",
+        "batch",
+        "eval",
+    }
+
+
+def test_watcher_reloads_only_on_change(tmp_path: Path) -> None:
+    path = tmp_path / "quotas.yaml"
+    path.write_text(QUOTAS)
+    controller = AdmissionController.from_dict(load_quota_file(path))
+    assert controller.allow("default", "fast").allowed
+    watcher = QuotaFileWatcher(controller, path)
+    assert watcher.reload() is not None
+    assert watcher.reload() is None
+
+    path.write_text(QUOTAS.replace("max_inflight: 2", "max_inflight: 8"))
+    changes = watcher.reload(force=True)
+    assert changes is not None
+    assert changes.resized == (("default", "fast"),)
+    fast = controller.snapshot()["default"]["fast"]
+    assert fast["max_inflight"] == 8
+    assert fast["inflight"] == 1